@@ -0,0 +1,4 @@
+from aquarium_adventures.runtime import configure_environment
+
+# Size the Polars and Numba thread pools from AQUARIUM_NUM_CORES before either is imported.
+configure_environment()
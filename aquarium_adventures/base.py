@@ -16,3 +16,20 @@ class BaseAquariumAnalyzer(ABC):
 
         """
         pass
+
+    def side_outputs(self) -> dict:
+        """
+        Tables computed by the last run besides the returned DataFrame, cached with the stage output.
+
+        Returns:
+            dict[str, pl.DataFrame]: The tables by name; none by default.
+        """
+        return {}
+
+    def restore_side_outputs(self, side_outputs: dict) -> None:
+        """
+        Restores the tables of `side_outputs` when the stage output is read from the cache.
+
+        Args:
+            side_outputs (dict[str, pl.DataFrame]): The tables by name, as returned by `side_outputs`.
+        """
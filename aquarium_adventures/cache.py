@@ -0,0 +1,290 @@
+import hashlib
+import os
+import types
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+CACHE_VERSION = 1
+HASH_CHUNK_BYTES = 1 << 20
+
+
+class StageCache:
+    """
+    On-disk cache of pipeline stage outputs, stored as Parquet files named by their key.
+
+    The cache is bounded to `max_bytes`; when it grows past it, the least recently used
+    entries are removed. Reads refresh the modification time of an entry, which is what
+    the LRU order is based on.
+    """
+
+    def __init__(self, directory, max_bytes=2 * 1024**3):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key, side_output=None) -> Path:
+        if side_output is not None:
+            return self.directory / f"{key}.{side_output}.parquet"
+        return self.directory / f"{key}.parquet"
+
+    def __contains__(self, key) -> bool:
+        return self.path(key).exists()
+
+    def get(self, key):
+        """
+        Returns the cached DataFrame for `key`, or None on a miss.
+
+        Args:
+            key (str): The entry key.
+        Returns:
+            pl.DataFrame | None: The cached output.
+        """
+        path = self.path(key)
+        try:
+            df = pl.read_parquet(path)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return df
+
+    def get_side_outputs(self, key) -> dict:
+        """
+        Returns the side outputs stored with the entry `key`.
+
+        Args:
+            key (str): The entry key.
+        Returns:
+            dict[str, pl.DataFrame]: The side outputs by name, empty if there are none.
+        """
+        side_outputs = {}
+        for path in self.directory.glob(f"{key}.*.parquet"):
+            side_outputs[path.name[len(key) + 1 : -len(".parquet")]] = pl.read_parquet(path)
+        return side_outputs
+
+    def put(self, key, df: pl.DataFrame, side_outputs=None) -> None:
+        """
+        Stores a DataFrame under `key`, then evicts entries until the cache fits its size bound.
+
+        Args:
+            key (str): The entry key.
+            df (pl.DataFrame): The stage output.
+            side_outputs (dict[str, pl.DataFrame], optional): Tables stored and evicted with the entry.
+        """
+        # Side outputs are written first: an entry is only visible once it is complete.
+        for name, side_df in (side_outputs or {}).items():
+            self._write(self.path(key, name), side_df)
+        self._write(self.path(key), df)
+        self.evict(keep=key)
+
+    def evict(self, keep=None) -> None:
+        """
+        Removes the least recently used entries until the cache is at most `max_bytes`.
+
+        An entry and its side outputs are removed together.
+
+        Args:
+            keep (str, optional): The key of an entry that must not be evicted, usually the one just written.
+        """
+        entries = {}
+        for path in self.directory.glob("*.parquet"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            key = path.name.split(".", 1)[0]
+            mtime_ns, size = entries.get(key, (0, 0))
+            entries[key] = (max(mtime_ns, stat.st_mtime_ns), size + stat.st_size)
+
+        total = sum(size for _, size in entries.values())
+        for (_, size), key in sorted((entry, key) for key, entry in entries.items()):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            self.invalidate(key)
+            total -= size
+
+    def invalidate(self, key=None) -> None:
+        """
+        Removes one entry with its side outputs, or every entry when `key` is None.
+
+        Args:
+            key (str, optional): The entry to remove.
+        """
+        if key is None:
+            paths = list(self.directory.glob("*.parquet"))
+        else:
+            paths = [self.path(key), *self.directory.glob(f"{key}.*.parquet")]
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _write(path, df: pl.DataFrame) -> None:
+        tmp_path = path.with_suffix(".tmp")
+        df.write_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    def size_bytes(self) -> int:
+        return sum(path.stat().st_size for path in self.directory.glob("*.parquet"))
+
+
+def file_fingerprint(path, content_hash=False) -> str:
+    """
+    Fingerprint of an input file, from its path, size and modification time, or from its content.
+
+    Args:
+        path (str | Path): The file.
+        content_hash (bool): Hash the file content instead of trusting its size and mtime.
+    Returns:
+        str: The fingerprint.
+    """
+    path = Path(path)
+    if content_hash:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        return f"sha256:{digest.hexdigest()}"
+
+    stat = path.stat()
+    return f"file:{path.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def dataframe_fingerprint(df: pl.DataFrame) -> str:
+    """
+    Fingerprint of a DataFrame content, from its schema and row hashes.
+
+    Args:
+        df (pl.DataFrame): The DataFrame.
+    Returns:
+        str: The fingerprint.
+    """
+    digest = hashlib.sha256(repr(df.schema).encode())
+    digest.update(str(df.height).encode())
+    if df.height and df.width:
+        row_hashes = df.hash_rows()
+        digest.update(row_hashes.to_numpy().tobytes())
+    return f"df:{digest.hexdigest()}"
+
+
+def analyzer_fingerprint(analyzer):
+    """
+    Fingerprint of an analyzer configuration: its class, its upper-case class constants
+    (such as `STANDARD_TEMPERATURE`) and its public instance attributes.
+
+    Functions are identified by their code, the values of their closure cells and the globals
+    they reference, so two closures over different values differ.
+
+    Args:
+        analyzer (BaseAquariumAnalyzer): The analyzer.
+    Returns:
+        str | None: The fingerprint, or None when an attribute cannot be fingerprinted
+            reliably, such as an object only identified by its address.
+    """
+    cls = type(analyzer)
+    parts = [f"{cls.__module__}.{cls.__qualname__}"]
+    try:
+        for klass in reversed(cls.__mro__):
+            for name, value in sorted(vars(klass).items()):
+                if name.isupper():
+                    parts.append(f"{klass.__qualname__}.{name}={_value_fingerprint(value)}")
+        for name, value in sorted(vars(analyzer).items()):
+            if name.startswith("_"):
+                continue
+            parts.append(f"{name}={_value_fingerprint(value)}")
+    except _UnreliableFingerprint:
+        return None
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def stage_key(previous_key, analyzer):
+    """
+    Cache key of a stage output, chained from the key of its input.
+
+    Args:
+        previous_key (str | None): Key or fingerprint of the stage input.
+        analyzer (BaseAquariumAnalyzer): The stage analyzer.
+    Returns:
+        str | None: The key, or None when the input key or the analyzer fingerprint is
+            unknown, in which case the stage output must not be cached.
+    """
+    fingerprint = analyzer_fingerprint(analyzer)
+    if previous_key is None or fingerprint is None:
+        return None
+    digest = hashlib.sha256(f"v{CACHE_VERSION}:{pl.__version__}".encode())
+    digest.update(previous_key.encode())
+    digest.update(fingerprint.encode())
+    return digest.hexdigest()
+
+
+class _UnreliableFingerprint(Exception):
+    pass
+
+
+def _value_fingerprint(value, seen=None) -> str:
+    if isinstance(value, pl.DataFrame):
+        return dataframe_fingerprint(value)
+    if isinstance(value, pl.Expr):
+        return str(value)
+    if isinstance(value, np.ndarray):
+        digest = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return f"ndarray:{value.dtype}:{value.shape}:{digest[:16]}"
+    if isinstance(value, types.ModuleType):
+        return f"module:{value.__name__}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(_value_fingerprint(item, seen) for item in value) + "]"
+    if isinstance(value, dict):
+        return (
+            "{"
+            + ",".join(f"{k!r}:{_value_fingerprint(v, seen)}" for k, v in sorted(value.items()))
+            + "}"
+        )
+    # Numba dispatchers wrap the Python function; its code, not its address, identifies it.
+    function = getattr(value, "py_func", value)
+    if isinstance(function, types.FunctionType):
+        return _function_fingerprint(function, set() if seen is None else seen)
+    text = repr(value)
+    if " at 0x" in text:
+        # The default repr only tells the object address, which says nothing of its state.
+        raise _UnreliableFingerprint(text)
+    return text
+
+
+def _function_fingerprint(function, seen) -> str:
+    name = f"{function.__module__}.{function.__qualname__}"
+    if id(function) in seen:
+        # Recursive or mutually recursive functions: the first visit covers the code.
+        return name
+    seen.add(id(function))
+
+    code = function.__code__
+    digest = hashlib.sha256(_code_fingerprint(code).encode())
+    for free_name, cell in zip(code.co_freevars, function.__closure__ or ()):
+        try:
+            contents = cell.cell_contents
+        except ValueError as error:
+            raise _UnreliableFingerprint(f"{name} has an empty closure cell") from error
+        digest.update(f"{free_name}={_value_fingerprint(contents, seen)}".encode())
+    for global_name in sorted(_global_names(code)):
+        if global_name in function.__globals__:
+            value = function.__globals__[global_name]
+            digest.update(f"{global_name}={_value_fingerprint(value, seen)}".encode())
+    return f"{name}:{digest.hexdigest()[:16]}"
+
+
+def _code_fingerprint(code) -> str:
+    consts = [
+        _code_fingerprint(const) if isinstance(const, types.CodeType) else repr(const)
+        for const in code.co_consts
+    ]
+    return f"{code.co_code.hex()}|{consts}|{code.co_names}|{code.co_freevars}"
+
+
+def _global_names(code) -> set:
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _global_names(const)
+    return names
@@ -1,13 +1,115 @@
-import numba
+import os
+import time
+from dataclasses import dataclass
+from statistics import NormalDist
+
 import numpy as np
 import polars as pl
 from aquarium_adventures.base import BaseAquariumAnalyzer
 from aquarium_adventures.transformations import AquariumTransformer
 
+# Ahead-of-time compiled kernels, built by `python -m aquarium_adventures.warmup --build-aot`.
+try:
+    if os.environ.get("AQUARIUM_DISABLE_AOT"):
+        raise ImportError("AOT kernels disabled by AQUARIUM_DISABLE_AOT")
+    from aquarium_adventures import _aot_kernels
+except ImportError:
+    _aot_kernels = None
+
+# The Numba kernels live in `kernels` and are imported on first use, so that importing
+# this module, or running with the AOT kernels only, never pays for Numba.
+KERNEL_NAMES = (
+    "pairwise_stress_function",
+    "serial_pairwise_stress_function",
+    "sorted_stress_function",
+    "weighted_abs_diff_sum",
+    "weighted_abs_diff_sum_counts",
+    "grouped_stress_function",
+    "serial_grouped_stress_function",
+    "default_pair_stress",
+    "tiled_stress_function",
+    "serial_tiled_stress_function",
+    "cross_group_stress_matrix",
+)
+
+
+def __getattr__(name):
+    if name in KERNEL_NAMES:
+        from aquarium_adventures import kernels
+
+        return getattr(kernels, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@dataclass
+class StressEstimate:
+    """
+    A stress score estimated from samples, with its confidence interval.
+
+    `exact` is set when the data was small enough to be scored exactly, in which case the
+    interval is reduced to the score.
+    """
+
+    stress_score: float
+    ci_low: float
+    ci_high: float
+    confidence: float
+    num_samples: int = 0
+    exact: bool = False
+
+    @property
+    def relative_error(self) -> float:
+        """
+        Half width of the confidence interval relative to the estimate.
+        """
+        half_width = (self.ci_high - self.ci_low) / 2
+        if half_width == 0:
+            return 0.0
+        return half_width / abs(self.stress_score) if self.stress_score else float("inf")
+
 
 class AquariumHPCComputations(BaseAquariumAnalyzer):
-    def __init__(self):
-        pass
+    ENGINES = ("sorted", "pairwise", "tiled", "approximate")
+    TILE_SIZE = 1024
+    # Rows per sample of the "approximate" engine, and samples drawn before checking the error.
+    SAMPLE_SIZE = 4096
+    MIN_SAMPLES = 8
+
+    def __init__(
+        self,
+        engine="sorted",
+        group_by=None,
+        parallel=True,
+        pair_function=None,
+        target_rel_error=0.01,
+        time_budget=None,
+        confidence=0.95,
+        seed=0,
+    ):
+        if engine not in self.ENGINES:
+            raise ValueError(
+                f"Unknown stress engine {engine!r}, expected one of {self.ENGINES}"
+            )
+        if pair_function is not None and engine != "tiled":
+            raise ValueError("pair_function is only supported by the 'tiled' engine")
+        if target_rel_error <= 0:
+            raise ValueError(f"target_rel_error must be positive, got {target_rel_error}")
+        if time_budget is not None and time_budget <= 0:
+            raise ValueError(f"time_budget must be positive, got {time_budget}")
+        if not 0 < confidence < 1:
+            raise ValueError(f"confidence must be in (0, 1), got {confidence}")
+        self.engine = engine
+        self.parallel = parallel
+        self.pair_function = pair_function
+        self.target_rel_error = target_rel_error
+        self.time_budget = time_budget
+        self.confidence = confidence
+        self.seed = seed
+        self._last_estimate = None
+
+        if isinstance(group_by, (str, pl.Expr)):
+            group_by = [group_by]
+        self.group_by = list(group_by) if group_by else None
 
     def analyze_data(self, df: pl.DataFrame) -> pl.DataFrame:
         """
@@ -17,59 +119,632 @@ class AquariumHPCComputations(BaseAquariumAnalyzer):
             df (pl.DataFrame): The input DataFrame containing columns "pH", "temp", and "quantity_liters".
         Returns:
             pl.DataFrame: A DataFrame with an additional column "stress_score" containing the computed stress score.
+                When `group_by` is set, the column is named after the keys (e.g. "stress_score_per_tank_id")
+                and holds the stress score of the group the row belongs to. The "approximate" engine adds
+                the bounds of the confidence interval as "<column>_ci_low" and "<column>_ci_high".
         """
 
-        pH_vals = df["pH"].to_numpy()
-        temp_vals = df["temp"].to_numpy()
-        quantity_vals = df["quantity_liters"].to_numpy()
+        pH_vals = _column_as_float(df, "pH")
+        temp_vals = _column_as_float(df, "temp")
+        quantity_vals = _column_as_float(df, "quantity_liters")
+
+        if self.group_by is not None:
+            return self.add_grouped_stress(df, pH_vals, temp_vals, quantity_vals)
 
-        stress_score = pairwise_stress_function(pH_vals, temp_vals, quantity_vals)
+        if self.engine == "approximate":
+            estimate = self.estimate_stress(pH_vals, temp_vals, quantity_vals)
+            return df.with_columns(
+                pl.lit(estimate.stress_score).alias(self.output_column),
+                pl.lit(estimate.ci_low).alias(f"{self.output_column}_ci_low"),
+                pl.lit(estimate.ci_high).alias(f"{self.output_column}_ci_high"),
+            )
 
-        result_df = df.with_columns(pl.lit(stress_score).alias("stress_score"))
+        stress_score = self.compute_stress(pH_vals, temp_vals, quantity_vals)
+
+        result_df = df.with_columns(pl.lit(stress_score).alias(self.output_column))
 
         return result_df
 
+    @property
+    def last_estimate(self):
+        """
+        The `StressEstimate` of the last score computed by the "approximate" engine, or None.
+        """
+        return self._last_estimate
+
+    def compute_stress(
+        self, pH_vals: np.array, temp_vals: np.array, quantity_vals: np.array
+    ) -> float:
+        """
+        Compute the stress score with the configured engine.
+
+        The "tiled" engine sums `pair_function` over all ordered pairs of valid readings,
+        which defaults to the formula of the other engines. A custom pair function is
+        compiled into the kernel once per process.
+
+        Args:
+            pH_vals (np.array): Array of pH values.
+            temp_vals (np.array): Array of temperature values.
+            quantity_vals (np.array): Array of water quantities in liters.
+        Returns:
+            float: The computed stress score.
+        """
+        if self.engine == "approximate":
+            return self.estimate_stress(pH_vals, temp_vals, quantity_vals).stress_score
+
+        if self.engine == "tiled":
+            from aquarium_adventures import kernels
+
+            if self.pair_function is None:
+                kernel = (
+                    kernels.tiled_stress_function
+                    if self.parallel
+                    else kernels.serial_tiled_stress_function
+                )
+                return kernel(pH_vals, temp_vals, quantity_vals, self.TILE_SIZE)
+
+            kernel = kernels.make_tiled_stress_function(self.pair_function, self.parallel)
+            return kernel(pH_vals, temp_vals, quantity_vals, self.TILE_SIZE)
+
+        name = "sorted_stress_function"
+        if self.engine == "pairwise":
+            name = "pairwise_stress_function" if self.parallel else "serial_pairwise_stress_function"
+
+        kernel = aot_kernel(name, pH_vals, temp_vals, quantity_vals)
+        if kernel is None:
+            from aquarium_adventures import kernels
+
+            kernel = getattr(kernels, name)
+        return kernel(pH_vals, temp_vals, quantity_vals)
+
+    def estimate_stress(
+        self, pH_vals: np.array, temp_vals: np.array, quantity_vals: np.array
+    ) -> StressEstimate:
+        """
+        Estimate the stress score from random samples of rows, with a confidence interval.
+
+        Each sample draws `SAMPLE_SIZE` distinct rows and scores all their pairs exactly, which
+        is an unbiased estimate of the mean pair stress. Samples are drawn until the interval
+        half width falls below `target_rel_error` of the estimate or `time_budget` seconds have
+        passed, with at least `MIN_SAMPLES` samples unless the budget runs out first. The draws
+        only depend on `seed`, so a run stopped by the target error is reproducible. When the
+        samples would cover as many rows as the data holds, the score is computed exactly.
+
+        Args:
+            pH_vals (np.array): Array of pH values.
+            temp_vals (np.array): Array of temperature values.
+            quantity_vals (np.array): Array of water quantities in liters.
+        Returns:
+            StressEstimate: The estimate, also kept as `last_estimate`.
+        """
+        from aquarium_adventures import kernels
+
+        n = len(pH_vals)
+        sample_size = self.SAMPLE_SIZE
+        if n <= sample_size * self.MIN_SAMPLES:
+            return self._exact_estimate(pH_vals, temp_vals, quantity_vals)
+
+        # A sample scores its k^2 ordered pairs normalized by k^2; rescale it to the mean over
+        # the k(k - 1) distinct pairs, then to the n(n - 1) / n^2 of the full score.
+        scale = sample_size / (sample_size - 1) * (n - 1) / n
+        z = NormalDist().inv_cdf((1 + self.confidence) / 2)
+        rng = np.random.default_rng(self.seed)
+        start = time.perf_counter()
+
+        samples = []
+        while True:
+            rows = rng.choice(n, size=sample_size, replace=False)
+            samples.append(
+                scale
+                * kernels.sorted_stress_function(
+                    pH_vals[rows], temp_vals[rows], quantity_vals[rows]
+                )
+            )
+
+            num_samples = len(samples)
+            if num_samples * sample_size >= n:
+                # As many rows as an exact pass would read.
+                return self._exact_estimate(pH_vals, temp_vals, quantity_vals)
+            out_of_time = (
+                self.time_budget is not None
+                and time.perf_counter() - start >= self.time_budget
+            )
+            if num_samples < 2 or (num_samples < self.MIN_SAMPLES and not out_of_time):
+                continue
+
+            mean = float(np.mean(samples))
+            half_width = z * float(np.std(samples, ddof=1)) / num_samples**0.5
+            if out_of_time or half_width <= self.target_rel_error * abs(mean):
+                break
+
+        self._last_estimate = StressEstimate(
+            mean, mean - half_width, mean + half_width, self.confidence, num_samples
+        )
+        return self._last_estimate
+
+    def _exact_estimate(self, pH_vals, temp_vals, quantity_vals) -> StressEstimate:
+        from aquarium_adventures import kernels
+
+        stress_score = kernels.sorted_stress_function(pH_vals, temp_vals, quantity_vals)
+        self._last_estimate = StressEstimate(
+            stress_score, stress_score, stress_score, self.confidence, exact=True
+        )
+        return self._last_estimate
+
+    def add_grouped_stress(
+        self,
+        df: pl.DataFrame,
+        pH_vals: np.array,
+        temp_vals: np.array,
+        quantity_vals: np.array,
+    ) -> pl.DataFrame:
+        """
+        Compute the stress score inside each group of `group_by` and add it as a column.
+
+        All groups are scored in a single parallel kernel call, each group normalized by its own size.
+
+        Args:
+            df (pl.DataFrame): The input DataFrame.
+            pH_vals (np.array): Array of pH values.
+            temp_vals (np.array): Array of temperature values.
+            quantity_vals (np.array): Array of water quantities in liters.
+        Returns:
+            pl.DataFrame: A DataFrame with an additional per-group stress score column.
+        """
+        groups = (
+            df.with_row_index("__row")
+            .group_by(self.group_by)
+            .agg(pl.col("__row"))
+        )
+        group_sizes = groups["__row"].list.len().to_numpy()
+        offsets = np.zeros(len(group_sizes) + 1, dtype=np.int64)
+        np.cumsum(group_sizes, out=offsets[1:])
+        rows = groups["__row"].explode().to_numpy().astype(np.int64)
+
+        group_bounds = None
+        if self.engine == "approximate":
+            estimates = [
+                self.estimate_stress(
+                    pH_vals[group_rows], temp_vals[group_rows], quantity_vals[group_rows]
+                )
+                for group_rows in np.split(rows, offsets[1:-1])
+            ]
+            group_scores = np.array([e.stress_score for e in estimates], dtype=np.float64)
+            group_bounds = {
+                "ci_low": np.array([e.ci_low for e in estimates], dtype=np.float64),
+                "ci_high": np.array([e.ci_high for e in estimates], dtype=np.float64),
+            }
+        elif self.engine == "tiled":
+            # Groups are scored one by one, each spreading its tiles across cores.
+            group_scores = np.array(
+                [
+                    self.compute_stress(
+                        pH_vals[group_rows], temp_vals[group_rows], quantity_vals[group_rows]
+                    )
+                    for group_rows in np.split(rows, offsets[1:-1])
+                ],
+                dtype=np.float64,
+            )
+        else:
+            from aquarium_adventures import kernels
+
+            kernel = (
+                kernels.grouped_stress_function
+                if self.parallel
+                else kernels.serial_grouped_stress_function
+            )
+            group_scores = kernel(
+                pH_vals, temp_vals, quantity_vals, rows, offsets, self.engine == "pairwise"
+            )
+
+        # Scatter each group's score back onto its rows, which keeps the input row order.
+        def scatter(name, values):
+            row_values = np.empty(df.height, dtype=np.float64)
+            row_values[rows] = np.repeat(values, group_sizes)
+            return pl.Series(name, row_values)
+
+        columns = [scatter(self.output_column, group_scores)]
+        for suffix, values in (group_bounds or {}).items():
+            columns.append(scatter(f"{self.output_column}_{suffix}", values))
+        return df.with_columns(columns)
+
+    @property
+    def output_column(self) -> str:
+        """
+        Name of the column the stress score is written to.
+        """
+        if self.group_by is None:
+            return "stress_score"
+        keys = [
+            key if isinstance(key, str) else key.meta.output_name()
+            for key in self.group_by
+        ]
+        return "stress_score_per_" + "_".join(keys)
+
+
+class AquariumCrossTankComputations(BaseAquariumAnalyzer):
+    # Largest n_tanks * n_distinct_values for which the per-tank histograms are built densely.
+    DENSE_MAX_ENTRIES = 1 << 23
+
+    def __init__(self, key="tank_id"):
+        self.key = key
+        self._stress_matrix = None
+
+    def analyze_data(self, df: pl.DataFrame) -> pl.DataFrame:
+        """
+        Compute the cross-tank stress matrix of the data, available as `stress_matrix` afterwards.
+
+        Args:
+            df (pl.DataFrame): The input DataFrame containing the key, "pH", "temp" and "quantity_liters" columns.
+        Returns:
+            pl.DataFrame: The input DataFrame, unchanged.
+        """
+        tank_ids, cells = self.compute_matrix(df)
+        rows, cols = np.triu_indices(len(tank_ids))
+        self._stress_matrix = pl.DataFrame(
+            {
+                f"{self.key}_a": tank_ids[rows],
+                f"{self.key}_b": tank_ids[cols],
+                "cross_stress": cells,
+            }
+        )
+        return df
+
+    @property
+    def stress_matrix(self) -> pl.DataFrame:
+        """
+        The upper triangle of the matrix computed by the last run, one row per pair of tanks
+        a <= b with their "cross_stress", or None.
+        """
+        return self._stress_matrix
+
+    def compute_matrix(self, df: pl.DataFrame) -> tuple:
+        """
+        Compute the stress between the readings of every pair of tanks.
+
+        Cell (A, B) sums the pair stress of every reading of A with every reading of B and divides
+        it by n_A * n_B, so the diagonal holds the stress score of each tank alone. Each tank is
+        summarized once as sorted value-count tables. When the values fall on a small grid, as
+        rounded sensor readings do, all cells come from a few matrix products; otherwise each cell
+        merges two tables in linear time. Neither visits the n_A * n_B pairs.
+
+        Args:
+            df (pl.DataFrame): The input DataFrame containing the key, "pH", "temp" and "quantity_liters" columns.
+        Returns:
+            tuple[np.array, np.array]: The sorted tank ids, and the cells (A, B) with A <= B row by row,
+                of length n_tanks * (n_tanks + 1) / 2. `square_matrix` expands them.
+        """
+        readings = df.select(
+            pl.col(self.key),
+            pl.col("pH").cast(pl.Float64).fill_nan(None),
+            pl.col("temp").cast(pl.Float64).fill_nan(None),
+            (500.0 / pl.col("quantity_liters").cast(pl.Float64).fill_nan(None)).alias("weight"),
+        ).filter(pl.col(self.key).is_not_null())
+
+        num_readings = readings.group_by(self.key).len().sort(self.key)
+        tank_ids = num_readings[self.key].to_numpy()
+        valid = readings.drop_nulls()
+
+        tables = []
+        for column in ("pH", "temp"):
+            # Values are shifted by their minimum to keep the sums small.
+            tables.append(
+                valid.group_by(self.key, column)
+                .agg(pl.len().cast(pl.Float64).alias("count"), pl.col("weight").sum())
+                .sort(self.key, column)
+                .with_columns(pl.col(column) - pl.col(column).min())
+            )
+        num_readings = num_readings["len"].to_numpy().astype(np.float64)
+
+        if all(
+            len(tank_ids) * table[column].n_unique() <= self.DENSE_MAX_ENTRIES
+            for table, column in zip(tables, ("pH", "temp"))
+        ):
+            pair_sums = self._dense_cross_sums(tables[0], "pH", tank_ids) + 2.0 * (
+                self._dense_cross_sums(tables[1], "temp", tank_ids)
+            )
+            rows, cols = np.triu_indices(len(tank_ids))
+            cells = pair_sums[rows, cols] / (num_readings[rows] * num_readings[cols])
+            return tank_ids, cells
+
+        kernel_args = []
+        for table, column in zip(tables, ("pH", "temp")):
+            offsets = np.searchsorted(table[self.key].to_numpy(), tank_ids, side="left")
+            kernel_args += [
+                table[column].to_numpy(),
+                table["count"].to_numpy(),
+                table["weight"].to_numpy(),
+                np.append(offsets, table.height).astype(np.int64),
+            ]
+
+        from aquarium_adventures.kernels import cross_group_stress_matrix
+
+        return tank_ids, cross_group_stress_matrix(*kernel_args, num_readings)
+
+    def _dense_cross_sums(self, table: pl.DataFrame, column: str, tank_ids: np.array) -> np.array:
+        """
+        Cross sums of every pair of tanks for one column, when the values fall on a small grid.
+
+        With C and W the per-tank histograms of reading counts and weights over the distinct
+        values x and D the matrix |x_k - x_l|, the sum of |x_i - x_j| * (w_i + w_j) over the
+        readings i of A and j of B is W_A·D·C_B + C_A·D·W_B, so all cells come from matrix products.
+        """
+        grid, value_index = np.unique(table[column].to_numpy(), return_inverse=True)
+        tank_index = np.searchsorted(tank_ids, table[self.key].to_numpy())
+        counts = np.zeros((len(tank_ids), len(grid)))
+        weights = np.zeros((len(tank_ids), len(grid)))
+        counts[tank_index, value_index] = table["count"].to_numpy()
+        weights[tank_index, value_index] = table["weight"].to_numpy()
+
+        # D is never built: its products with the histograms come from cumulative sums, in
+        # O(n_tanks * n_distinct_values) memory however many distinct values there are.
+        return (
+            weights @ _distance_products(counts, grid).T
+            + counts @ _distance_products(weights, grid).T
+        )
+
+    @staticmethod
+    def square_matrix(cells: np.array) -> np.array:
+        """
+        Expand the condensed upper triangle of `compute_matrix` to a symmetric square matrix.
+
+        Args:
+            cells (np.array): The condensed cells.
+        Returns:
+            np.array: The n_tanks x n_tanks matrix.
+        """
+        n = int((np.sqrt(8 * len(cells) + 1) - 1) // 2)
+        matrix = np.zeros((n, n), dtype=cells.dtype)
+        rows, cols = np.triu_indices(n)
+        matrix[rows, cols] = cells
+        matrix[cols, rows] = cells
+        return matrix
+
+
+class StreamingStressAccumulator:
+    """
+    Keeps the exact pairwise stress score of a growing set of readings.
 
-@numba.njit(parallel=True)
-def pairwise_stress_function(
-    pH_vals: np.array, temp_vals: np.array, quantity_vals: np.array
-) -> float:
+    Readings are kept in sorted blocks whose sizes follow a binary counter, so a micro-batch
+    is scored against the history with binary searches and prefix sums in O(batch * log² n),
+    and each reading is re-sorted only O(log n) times over its lifetime.
     """
-    Compute the stress score based on pairwise differences in pH, temperature, and quantity of water.
+
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self):
+        self.num_readings = 0
+        self.stress_sum = 0.0
+        self.blocks = []
+
+    @property
+    def stress_score(self) -> float:
+        """
+        The stress score of all readings seen so far, as `pairwise_stress_function` would compute it.
+        """
+        if self.num_readings == 0:
+            return 0.0
+        return self.stress_sum / (self.num_readings * self.num_readings)
+
+    def update(
+        self, pH_vals: np.array, temp_vals: np.array, quantity_vals: np.array
+    ) -> float:
+        """
+        Add a micro-batch of readings and update the stress score.
+
+        Args:
+            pH_vals (np.array): Array of pH values.
+            temp_vals (np.array): Array of temperature values.
+            quantity_vals (np.array): Array of water quantities in liters.
+        Returns:
+            float: The stress score including the new readings.
+        """
+        pH_vals = np.asarray(pH_vals, dtype=np.float64)
+        temp_vals = np.asarray(temp_vals, dtype=np.float64)
+        quantity_vals = np.asarray(quantity_vals, dtype=np.float64)
+
+        self.num_readings += len(pH_vals)
+
+        valid = ~(np.isnan(pH_vals) | np.isnan(temp_vals) | np.isnan(quantity_vals))
+        if valid.any():
+            self._add_valid(pH_vals[valid], temp_vals[valid], 500.0 / quantity_vals[valid])
+
+        return self.stress_score
+
+    def update_from_df(self, df: pl.DataFrame) -> float:
+        """
+        Add the readings of a DataFrame with "pH", "temp" and "quantity_liters" columns.
+
+        Args:
+            df (pl.DataFrame): The new readings.
+        Returns:
+            float: The stress score including the new readings.
+        """
+        return self.update(
+            _column_as_float(df, "pH"),
+            _column_as_float(df, "temp"),
+            _column_as_float(df, "quantity_liters"),
+        )
+
+    def _add_valid(self, pH_vals, temp_vals, weights):
+        batch = _SortedBlock(pH_vals, temp_vals, weights)
+
+        pair_sum = batch.pair_sum()
+        for block in self.blocks:
+            # Cross pairs are counted in both orders, as in the n² kernel.
+            pair_sum += 2.0 * block.cross_sum(pH_vals, temp_vals, weights)
+        self.stress_sum += pair_sum
+
+        self.blocks.append(batch)
+        while len(self.blocks) > 1 and self.blocks[-2].size <= 2 * self.blocks[-1].size:
+            last = self.blocks.pop()
+            self.blocks[-1] = self.blocks[-1].merge(last)
+
+    def snapshot(self, path) -> None:
+        """
+        Save the accumulator state so a restarted process can resume without replaying the history.
+
+        The file is written next to `path` first and moved in place, so a crash never leaves a partial snapshot.
+
+        Args:
+            path (str | Path): Destination ".npz" file.
+        """
+        pH_vals, temp_vals, weights = _SortedBlock.concat_rows(self.blocks)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=self.SNAPSHOT_VERSION,
+                num_readings=self.num_readings,
+                stress_sum=self.stress_sum,
+                pH=pH_vals,
+                temp=temp_vals,
+                weights=weights,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def restore(cls, path) -> "StreamingStressAccumulator":
+        """
+        Load an accumulator saved with `snapshot`.
+
+        Args:
+            path (str | Path): The snapshot file.
+        Returns:
+            StreamingStressAccumulator: The restored accumulator.
+        """
+        with np.load(path) as state:
+            if int(state["version"]) != cls.SNAPSHOT_VERSION:
+                raise ValueError(
+                    f"Unsupported snapshot version {int(state['version'])} in {path}"
+                )
+            accumulator = cls()
+            accumulator.num_readings = int(state["num_readings"])
+            accumulator.stress_sum = float(state["stress_sum"])
+            if len(state["weights"]):
+                accumulator.blocks.append(
+                    _SortedBlock(state["pH"], state["temp"], state["weights"])
+                )
+        return accumulator
+
+
+class _SortedBlock:
+    """
+    Valid readings sorted by pH and by temperature, with prefix sums of w, x and x * w.
+    """
+
+    def __init__(self, pH_vals, temp_vals, weights):
+        self.pH_vals = pH_vals
+        self.temp_vals = temp_vals
+        self.weights = weights
+        self.size = len(weights)
+        self.pH = _SortedPrefix(pH_vals, weights)
+        self.temp = _SortedPrefix(temp_vals, weights)
+
+    def pair_sum(self) -> float:
+        from aquarium_adventures.kernels import weighted_abs_diff_sum
+
+        return weighted_abs_diff_sum(self.pH_vals, self.weights) + 2.0 * (
+            weighted_abs_diff_sum(self.temp_vals, self.weights)
+        )
+
+    def cross_sum(self, pH_vals, temp_vals, weights) -> float:
+        return self.pH.cross_sum(pH_vals, weights) + 2.0 * self.temp.cross_sum(
+            temp_vals, weights
+        )
+
+    def merge(self, other: "_SortedBlock") -> "_SortedBlock":
+        return _SortedBlock(*self.concat_rows([self, other]))
+
+    @staticmethod
+    def concat_rows(blocks):
+        if not blocks:
+            empty = np.empty(0, dtype=np.float64)
+            return empty, empty, empty
+        return (
+            np.concatenate([block.pH_vals for block in blocks]),
+            np.concatenate([block.temp_vals for block in blocks]),
+            np.concatenate([block.weights for block in blocks]),
+        )
+
+
+class _SortedPrefix:
+    """
+    One column of a `_SortedBlock`, sorted, shifted by its minimum, with exclusive prefix sums.
+    """
+
+    def __init__(self, x_vals, weights):
+        order = np.argsort(x_vals, kind="stable")
+        self.offset = x_vals[order[0]] if len(order) else 0.0
+        self.x = x_vals[order] - self.offset
+        w = weights[order]
+        self.sum_w = np.concatenate(([0.0], np.cumsum(w)))
+        self.sum_x = np.concatenate(([0.0], np.cumsum(self.x)))
+        self.sum_xw = np.concatenate(([0.0], np.cumsum(self.x * w)))
+
+    def cross_sum(self, x_vals, weights) -> float:
+        """
+        Sum of |x_q - x_b| * (w_q + w_b) over every query q and every element b of the block.
+        """
+        x = x_vals - self.offset
+        below = np.searchsorted(self.x, x)
+        count_lo = below
+        count_hi = len(self.x) - below
+        w_lo, x_lo, xw_lo = self.sum_w[below], self.sum_x[below], self.sum_xw[below]
+        w_hi = self.sum_w[-1] - w_lo
+        x_hi = self.sum_x[-1] - x_lo
+        xw_hi = self.sum_xw[-1] - xw_lo
+        lo = count_lo * x * weights + x * w_lo - weights * x_lo - xw_lo
+        hi = count_hi * x * weights + x * w_hi - weights * x_hi - xw_hi
+        return float(np.sum(lo - hi))
+
+
+def aot_kernel(name: str, *arrays):
+    """
+    Return the ahead-of-time compiled variant of a kernel for these arrays, if it was built.
+
+    AOT kernels are compiled for one exact signature and do not check their arguments,
+    so they are only used for C-contiguous arrays that all share one of `AOT_DTYPES`.
 
     Args:
-        pH_vals (np.array): Array of pH values.
-        temp_vals (np.array): Array of temperature values.
-        quantity_vals (np.array): Array of water quantities in liters.
+        name (str): Name of the JIT kernel.
+        *arrays (np.array): The kernel arguments.
     Returns:
-        float: The computed stress score.
-
+        callable | None: The AOT kernel, or None when the JIT kernel must be used.
     """
+    if _aot_kernels is None:
+        return None
+    dtype = arrays[0].dtype
+    if dtype not in AOT_DTYPES or not all(
+        array.dtype == dtype and array.ndim == 1 and array.flags.c_contiguous
+        for array in arrays
+    ):
+        return None
+    return getattr(_aot_kernels, f"{name}_{dtype.name}", None)
 
-    n = len(pH_vals)
 
-    if n == 0:
-        return 0.0
+AOT_DTYPES = (np.dtype(np.float32), np.dtype(np.float64))
 
-    stress_sum = 0.0
 
-    for i in numba.prange(0, n):
-        for j in numba.prange(0, n):
-            if (
-                np.isnan(pH_vals[i])
-                or np.isnan(pH_vals[j])
-                or np.isnan(temp_vals[i])
-                or np.isnan(temp_vals[j])
-                or np.isnan(quantity_vals[i])
-                or np.isnan(quantity_vals[j])
-            ):
-                continue
-            pH_dev = abs(pH_vals[i] - pH_vals[j])
-            t_dev = abs(temp_vals[i] - temp_vals[j]) * 2
-            quantity_factor = (500.0 / (quantity_vals[i])) + (
-                500.0 / (quantity_vals[j])
-            )
-            stress_sum += (pH_dev + t_dev) * quantity_factor
-    final_stress = stress_sum / (n * n)
+def _column_as_float(df: pl.DataFrame, name: str) -> np.ndarray:
+    """
+    Return a column as a floating point NumPy array, with nulls as NaN.
+    """
+    column = df[name]
+    if column.dtype not in (pl.Float32, pl.Float64):
+        column = column.cast(pl.Float64)
+    return column.to_numpy()
+
 
-    return final_stress
+def _distance_products(histograms: np.ndarray, grid: np.ndarray) -> np.ndarray:
+    """
+    Product of each histogram row with the matrix |x_k - x_l| of the sorted grid, without building it.
+
+    Row l of the product is sum_k h_k |x_k - x_l| = x_l (H_l - (H - H_l)) - (S_l - (S - S_l)),
+    with H_l and S_l the cumulative sums of h and h * x up to l, and H and S their totals.
+    """
+    below_counts = np.cumsum(histograms, axis=1)
+    below_sums = np.cumsum(histograms * grid, axis=1)
+    return grid * (2.0 * below_counts - below_counts[:, -1:]) - (
+        2.0 * below_sums - below_sums[:, -1:]
+    )
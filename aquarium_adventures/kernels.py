@@ -0,0 +1,635 @@
+import functools
+import types
+
+import numba
+import numpy as np
+
+
+@numba.njit(parallel=True, cache=True)
+def pairwise_stress_function(
+    pH_vals: np.array, temp_vals: np.array, quantity_vals: np.array
+) -> float:
+    """
+    Compute the stress score based on pairwise differences in pH, temperature, and quantity of water.
+
+    This is the O(n²) reference kernel, `sorted_stress_function` computes the same value in O(n log n).
+
+    Args:
+        pH_vals (np.array): Array of pH values.
+        temp_vals (np.array): Array of temperature values.
+        quantity_vals (np.array): Array of water quantities in liters.
+    Returns:
+        float: The computed stress score.
+
+    """
+
+    n = len(pH_vals)
+
+    if n == 0:
+        return 0.0
+
+    stress_sum = 0.0
+
+    for i in numba.prange(0, n):
+        for j in numba.prange(0, n):
+            if (
+                np.isnan(pH_vals[i])
+                or np.isnan(pH_vals[j])
+                or np.isnan(temp_vals[i])
+                or np.isnan(temp_vals[j])
+                or np.isnan(quantity_vals[i])
+                or np.isnan(quantity_vals[j])
+            ):
+                continue
+            pH_dev = abs(pH_vals[i] - pH_vals[j])
+            t_dev = abs(temp_vals[i] - temp_vals[j]) * 2
+            quantity_factor = (500.0 / (quantity_vals[i])) + (
+                500.0 / (quantity_vals[j])
+            )
+            stress_sum += (pH_dev + t_dev) * quantity_factor
+    final_stress = stress_sum / (n * n)
+
+    return final_stress
+
+
+@numba.njit(cache=True)
+def weighted_abs_diff_sum(x_vals: np.array, w_vals: np.array) -> float:
+    """
+    Compute the sum of |x_i - x_j| * (w_i + w_j) over all ordered pairs (i, j).
+
+    After sorting by x, each element only pairs with the ones before it, so the sum
+    is accumulated from running counts and sums of x, w and x * w.
+
+    Args:
+        x_vals (np.array): Array of values, must not contain NaN.
+        w_vals (np.array): Array of weights, aligned with x_vals.
+    Returns:
+        float: The weighted sum of absolute differences.
+    """
+    n = len(x_vals)
+    if n < 2:
+        return 0.0
+
+    order = np.argsort(x_vals, kind="mergesort")
+    # Shifting by the minimum keeps the running sums small and limits cancellation.
+    offset = x_vals[order[0]]
+
+    total = 0.0
+    sum_x = 0.0
+    sum_w = 0.0
+    sum_xw = 0.0
+    for k in range(n):
+        x = x_vals[order[k]] - offset
+        w = w_vals[order[k]]
+        total += k * x * w - w * sum_x + x * sum_w - sum_xw
+        sum_x += x
+        sum_w += w
+        sum_xw += x * w
+
+    return 2.0 * total
+
+
+@numba.njit(cache=True)
+def weighted_abs_diff_sum_counts(
+    x_vals: np.array, counts: np.array, w_sums: np.array
+) -> float:
+    """
+    Compute `weighted_abs_diff_sum` from a table of distinct values.
+
+    Each distinct x appears counts[k] times with a total weight of w_sums[k], so the memory
+    needed only grows with the number of distinct values, not with the number of readings.
+
+    Args:
+        x_vals (np.array): Array of distinct values, must not contain NaN.
+        counts (np.array): Number of readings with each value.
+        w_sums (np.array): Sum of the weights of the readings with each value.
+    Returns:
+        float: The weighted sum of absolute differences over all ordered pairs of readings.
+    """
+    n = len(x_vals)
+    if n < 2:
+        return 0.0
+
+    order = np.argsort(x_vals, kind="mergesort")
+    offset = x_vals[order[0]]
+
+    total = 0.0
+    sum_c = 0.0
+    sum_w = 0.0
+    sum_xc = 0.0
+    sum_xw = 0.0
+    for k in range(n):
+        x = x_vals[order[k]] - offset
+        c = counts[order[k]]
+        w = w_sums[order[k]]
+        total += x * w * sum_c + x * c * sum_w - w * sum_xc - c * sum_xw
+        sum_c += c
+        sum_w += w
+        sum_xc += x * c
+        sum_xw += x * w
+
+    return 2.0 * total
+
+
+@numba.njit(cache=True)
+def sorted_stress_function(
+    pH_vals: np.array, temp_vals: np.array, quantity_vals: np.array
+) -> float:
+    """
+    Compute the same stress score as `pairwise_stress_function` in O(n log n).
+
+    The score is a sum of |x_i - x_j| * (w_i + w_j) terms with x being the pH or twice the
+    temperature and w = 500 / quantity, so it reduces to two sorted prefix sums.
+    Rows with a NaN in any column are skipped but still count in the normalization.
+
+    Args:
+        pH_vals (np.array): Array of pH values.
+        temp_vals (np.array): Array of temperature values.
+        quantity_vals (np.array): Array of water quantities in liters.
+    Returns:
+        float: The computed stress score.
+    """
+    n = len(pH_vals)
+
+    if n == 0:
+        return 0.0
+
+    valid = ~(np.isnan(pH_vals) | np.isnan(temp_vals) | np.isnan(quantity_vals))
+    weights = 500.0 / quantity_vals[valid].astype(np.float64)
+
+    stress_sum = weighted_abs_diff_sum(
+        pH_vals[valid].astype(np.float64), weights
+    ) + 2.0 * weighted_abs_diff_sum(temp_vals[valid].astype(np.float64), weights)
+
+    return stress_sum / (n * n)
+
+
+serial_pairwise_stress_function = numba.njit(cache=True)(pairwise_stress_function.py_func)
+
+
+@numba.njit(parallel=True, cache=True)
+def grouped_stress_function(
+    pH_vals: np.array,
+    temp_vals: np.array,
+    quantity_vals: np.array,
+    rows: np.array,
+    offsets: np.array,
+    pairwise: bool = False,
+) -> np.array:
+    """
+    Compute the stress score of every group in one pass, spreading the groups across cores.
+
+    Args:
+        pH_vals (np.array): Array of pH values.
+        temp_vals (np.array): Array of temperature values.
+        quantity_vals (np.array): Array of water quantities in liters.
+        rows (np.array): Row indices ordered by group.
+        offsets (np.array): Group boundaries in `rows`, group g spans rows[offsets[g]:offsets[g + 1]].
+        pairwise (bool): Use the O(n²) reference kernel instead of the sorted one.
+    Returns:
+        np.array: The stress score of each group.
+    """
+    n_groups = len(offsets) - 1
+    scores = np.zeros(n_groups, dtype=np.float64)
+
+    for g in numba.prange(n_groups):
+        group_rows = rows[offsets[g] : offsets[g + 1]]
+        if pairwise:
+            scores[g] = serial_pairwise_stress_function(
+                pH_vals[group_rows], temp_vals[group_rows], quantity_vals[group_rows]
+            )
+        else:
+            scores[g] = sorted_stress_function(
+                pH_vals[group_rows], temp_vals[group_rows], quantity_vals[group_rows]
+            )
+
+    return scores
+
+
+serial_grouped_stress_function = numba.njit(cache=True)(grouped_stress_function.py_func)
+
+
+@numba.njit(cache=True)
+def _fenwick_add(tree: np.array, index: int, values: np.array) -> None:
+    """
+    Add `values` to the entry `index` of a Fenwick tree holding one running sum per column.
+    """
+    i = index + 1
+    while i < tree.shape[0]:
+        for k in range(len(values)):
+            tree[i, k] += values[k]
+        i += i & -i
+
+
+@numba.njit(cache=True)
+def _fenwick_prefix(tree: np.array, index: int, sums: np.array) -> None:
+    """
+    Write the sums of the entries before `index` of a Fenwick tree, one per column, into `sums`.
+    """
+    sums[:] = 0.0
+    i = index
+    while i > 0:
+        for k in range(tree.shape[1]):
+            sums[k] += tree[i, k]
+        i -= i & -i
+
+
+@numba.njit(cache=True)
+def _window_cross_sum(
+    tree: np.array, totals: np.array, rank: int, x: float, w: float, scratch: np.array
+) -> float:
+    """
+    Sum of |x - x_b| * (w + w_b) over the elements b of a window, from Fenwick trees of
+    the count, w, x and x * w of the elements indexed by their rank.
+    """
+    _fenwick_prefix(tree, rank, scratch)
+    below = scratch[0] * x * w + x * scratch[1] - w * scratch[2] - scratch[3]
+    above = (
+        (totals[0] - scratch[0]) * x * w
+        + x * (totals[1] - scratch[1])
+        - w * (totals[2] - scratch[2])
+        - (totals[3] - scratch[3])
+    )
+    return below - above
+
+
+@numba.njit(cache=True)
+def _window_step(
+    tree: np.array,
+    totals: np.array,
+    rank: int,
+    x: float,
+    w: float,
+    sign: float,
+    scratch: np.array,
+) -> float:
+    """
+    Add (sign = 1) or remove (sign = -1) an element of a window and return the change of
+    the window's sum of |x_i - x_j| * (w_i + w_j) over ordered pairs.
+    """
+    # The element's pairs with itself add nothing, so the cross sum is the same with or without it.
+    delta = 2.0 * sign * _window_cross_sum(tree, totals, rank, x, w, scratch)
+    scratch[0] = sign
+    scratch[1] = sign * w
+    scratch[2] = sign * x
+    scratch[3] = sign * x * w
+    _fenwick_add(tree, rank, scratch)
+    totals += scratch
+    return delta
+
+
+@numba.njit(cache=True)
+def _local_ranks(x_vals: np.array) -> np.array:
+    """
+    Rank of each value among `x_vals`, ties broken by position.
+    """
+    order = np.argsort(x_vals, kind="mergesort")
+    ranks = np.empty(len(x_vals), dtype=np.int64)
+    for k in range(len(order)):
+        ranks[order[k]] = k
+    return ranks
+
+
+@numba.njit(parallel=True, cache=True)
+def windowed_stress_function(
+    pH_vals: np.array,
+    temp_vals: np.array,
+    quantity_vals: np.array,
+    times: np.array,
+    rows: np.array,
+    offsets: np.array,
+    window: int,
+):
+    """
+    Compute the reading count, average pH and stress score of the sliding time window ending at every reading.
+
+    The window of a reading at time t holds the readings of its group in (t - window, t].
+    Each group is swept in time order: readings entering the window are added and readings
+    leaving it are removed, and each add or remove changes the pair sum of the window by
+    the cross sum of one reading against the window, read from Fenwick trees over the
+    pH and temperature ranks in O(log n).
+
+    Args:
+        pH_vals (np.array): Array of pH values.
+        temp_vals (np.array): Array of temperature values.
+        quantity_vals (np.array): Array of water quantities in liters.
+        times (np.array): Integer timestamps of the readings.
+        rows (np.array): Row indices ordered by group and time.
+        offsets (np.array): Group boundaries in `rows`, group g spans rows[offsets[g]:offsets[g + 1]].
+        window (int): Length of the windows, in the unit of `times`.
+    Returns:
+        tuple: The reading count, average pH and stress score of the window of every row.
+            Rows missing from `rows` get a count of 0 and NaN for the rest.
+    """
+    n = len(pH_vals)
+    counts = np.zeros(n, dtype=np.int64)
+    avg_pH = np.full(n, np.nan)
+    stress = np.full(n, np.nan)
+
+    for g in numba.prange(len(offsets) - 1):
+        group_rows = rows[offsets[g] : offsets[g + 1]]
+        size = len(group_rows)
+        if size == 0:
+            continue
+
+        pH = pH_vals[group_rows].astype(np.float64)
+        temp = 2.0 * temp_vals[group_rows].astype(np.float64)
+        quantity = quantity_vals[group_rows].astype(np.float64)
+        valid = ~(np.isnan(pH) | np.isnan(temp) | np.isnan(quantity))
+        weights = 500.0 / quantity
+
+        pH_ranks = _local_ranks(pH)
+        temp_ranks = _local_ranks(temp)
+        # Shifting by the minimum keeps the running sums small and limits cancellation.
+        pH_offset = np.nanmin(pH) if valid.any() else 0.0
+        pH = pH - pH_offset
+        temp = temp - (np.nanmin(temp) if valid.any() else 0.0)
+
+        pH_tree = np.zeros((size + 1, 4))
+        temp_tree = np.zeros((size + 1, 4))
+        pH_totals = np.zeros(4)
+        temp_totals = np.zeros(4)
+        scratch = np.zeros(4)
+
+        stress_sum = 0.0
+        num_valid = 0
+        pH_sum = 0.0
+        pH_count = 0
+
+        start = 0
+        end = 0
+        while end < size:
+            now = times[group_rows[end]]
+            stop = end
+            while stop < size and times[group_rows[stop]] == now:
+                stop += 1
+
+            # Readings with the same timestamp enter the window together.
+            for k in range(end, stop):
+                if not np.isnan(pH[k]):
+                    pH_sum += pH[k]
+                    pH_count += 1
+                if valid[k]:
+                    stress_sum += _window_step(
+                        pH_tree, pH_totals, pH_ranks[k], pH[k], weights[k], 1.0, scratch
+                    ) + _window_step(
+                        temp_tree, temp_totals, temp_ranks[k], temp[k], weights[k], 1.0, scratch
+                    )
+                    num_valid += 1
+
+            while times[group_rows[start]] <= now - window:
+                if not np.isnan(pH[start]):
+                    pH_sum -= pH[start]
+                    pH_count -= 1
+                if valid[start]:
+                    w = weights[start]
+                    stress_sum += _window_step(
+                        pH_tree, pH_totals, pH_ranks[start], pH[start], w, -1.0, scratch
+                    ) + _window_step(
+                        temp_tree, temp_totals, temp_ranks[start], temp[start], w, -1.0, scratch
+                    )
+                    num_valid -= 1
+                    if num_valid < 2:
+                        # No pairs left, drop the rounding residue of the removals.
+                        stress_sum = 0.0
+                start += 1
+
+            count = stop - start
+            for k in range(end, stop):
+                row = group_rows[k]
+                counts[row] = count
+                avg_pH[row] = pH_offset + pH_sum / pH_count if pH_count > 0 else np.nan
+                stress[row] = stress_sum / (count * count)
+            end = stop
+
+    return counts, avg_pH, stress
+
+
+serial_windowed_stress_function = numba.njit(cache=True)(windowed_stress_function.py_func)
+
+
+# The NumPy error model drops the zero-division checks that keep the tiles from vectorizing.
+@numba.njit(error_model="numpy", cache=True)
+def default_pair_stress(pH_i, temp_i, quantity_i, pH_j, temp_j, quantity_j):
+    """
+    Stress of one ordered pair of readings, the formula of `pairwise_stress_function`.
+
+    Custom pair functions follow the same signature and are best compiled the same way,
+    with `numba.njit(error_model="numpy")`.
+    """
+    return (abs(pH_i - pH_j) + 2.0 * abs(temp_i - temp_j)) * (
+        500.0 / quantity_i + 500.0 / quantity_j
+    )
+
+
+# Reassociation lets LLVM split the tile sums across SIMD lanes. The full fastmath set is
+# not used since it assumes no NaN, which would drop the NaN filter.
+TILED_OPTIONS = {"fastmath": {"reassoc", "contract", "arcp"}, "error_model": "numpy"}
+
+
+@numba.njit(parallel=True, cache=True, **TILED_OPTIONS)
+def tiled_stress_function(
+    pH_vals: np.array, temp_vals: np.array, quantity_vals: np.array, tile_size: int = 1024
+) -> float:
+    """
+    Compute the same stress score as `pairwise_stress_function` with a blocked pair loop.
+
+    Rows with a NaN are dropped once and the valid values packed into contiguous arrays, then
+    the pairs are visited in square tiles of `tile_size` rows, so the j tile stays in cache
+    while every row of the i tile streams over it in a branch-free, vectorizable inner loop.
+    Tile rows are spread across cores and their partial sums added in a fixed order.
+
+    The pair formula is `default_pair_stress`; `make_tiled_stress_function` compiles this
+    kernel around another one.
+
+    Args:
+        pH_vals (np.array): Array of pH values.
+        temp_vals (np.array): Array of temperature values.
+        quantity_vals (np.array): Array of water quantities in liters.
+        tile_size (int): Number of rows per tile.
+    Returns:
+        float: The computed stress score.
+    """
+    n = len(pH_vals)
+    if n == 0:
+        return 0.0
+
+    valid = ~(np.isnan(pH_vals) | np.isnan(temp_vals) | np.isnan(quantity_vals))
+    pH = pH_vals[valid].astype(np.float64)
+    temp = temp_vals[valid].astype(np.float64)
+    quantity = quantity_vals[valid].astype(np.float64)
+    m = len(pH)
+
+    num_tiles = (m + tile_size - 1) // tile_size
+    tile_sums = np.zeros(num_tiles, dtype=np.float64)
+    for ti in numba.prange(num_tiles):
+        i_end = min(m, (ti + 1) * tile_size)
+        total = 0.0
+        for j_start in range(0, m, tile_size):
+            j_end = min(m, j_start + tile_size)
+            for i in range(ti * tile_size, i_end):
+                pH_i = pH[i]
+                temp_i = temp[i]
+                quantity_i = quantity[i]
+                for j in range(j_start, j_end):
+                    total += default_pair_stress(
+                        pH_i, temp_i, quantity_i, pH[j], temp[j], quantity[j]
+                    )
+        tile_sums[ti] = total
+
+    return tile_sums.sum() / (n * n)
+
+
+serial_tiled_stress_function = numba.njit(cache=True, **TILED_OPTIONS)(
+    tiled_stress_function.py_func
+)
+
+
+@functools.lru_cache(maxsize=None)
+def make_tiled_stress_function(pair_function, parallel=True):
+    """
+    Compile `tiled_stress_function` around a custom pair formula.
+
+    The pair function is bound as a global of the kernel rather than passed as an argument,
+    so Numba inlines it into the tile loop. The kernel is compiled once per pair function and
+    process; it is not cached on disk.
+
+    Args:
+        pair_function: Numba-compiled function of (pH_i, temp_i, quantity_i, pH_j, temp_j, quantity_j)
+            returning the stress of the ordered pair (i, j), with the signature of `default_pair_stress`.
+        parallel (bool): Spread the tiles across cores.
+    Returns:
+        callable: A kernel with the arguments of `tiled_stress_function`.
+    """
+    py_func = tiled_stress_function.py_func
+    kernel = types.FunctionType(
+        py_func.__code__,
+        {**py_func.__globals__, "default_pair_stress": pair_function},
+        py_func.__name__,
+        py_func.__defaults__,
+    )
+    return numba.njit(parallel=parallel, **TILED_OPTIONS)(kernel)
+
+
+@numba.njit(cache=True)
+def _summary_prefix_sums(values, counts, weights, offsets):
+    """
+    Inclusive prefix sums of c, w, c * x and w * x within each group of a value-count table.
+    """
+    sums = np.empty((len(values), 4), dtype=np.float64)
+    for g in range(len(offsets) - 1):
+        c = 0.0
+        w = 0.0
+        cx = 0.0
+        wx = 0.0
+        for k in range(offsets[g], offsets[g + 1]):
+            c += counts[k]
+            w += weights[k]
+            cx += counts[k] * values[k]
+            wx += weights[k] * values[k]
+            sums[k, 0] = c
+            sums[k, 1] = w
+            sums[k, 2] = cx
+            sums[k, 3] = wx
+    return sums
+
+
+@numba.njit(cache=True)
+def _summary_cross_sum(values, counts, weights, sums, a_start, a_end, b_start, b_end):
+    """
+    Sum of |x_a - x_b| * (w_a + w_b) over every reading a of group A and b of group B,
+    by merging their sorted value-count tables in O(d_A + d_B).
+    """
+    if a_start == a_end or b_start == b_end:
+        return 0.0
+
+    c_total = sums[b_end - 1, 0]
+    w_total = sums[b_end - 1, 1]
+    cx_total = sums[b_end - 1, 2]
+    wx_total = sums[b_end - 1, 3]
+
+    total = 0.0
+    p = b_start
+    for k in range(a_start, a_end):
+        x = values[k]
+        while p < b_end and values[p] < x:
+            p += 1
+        if p > b_start:
+            c_lo = sums[p - 1, 0]
+            w_lo = sums[p - 1, 1]
+            cx_lo = sums[p - 1, 2]
+            wx_lo = sums[p - 1, 3]
+        else:
+            c_lo = 0.0
+            w_lo = 0.0
+            cx_lo = 0.0
+            wx_lo = 0.0
+        # A value with count c and weight sum w pairs with the readings of B as
+        # |x - x_b| * (w * c_b + c * w_b).
+        total += weights[k] * (x * c_lo - cx_lo) + counts[k] * (x * w_lo - wx_lo)
+        total += weights[k] * ((cx_total - cx_lo) - x * (c_total - c_lo)) + counts[k] * (
+            (wx_total - wx_lo) - x * (w_total - w_lo)
+        )
+    return total
+
+
+@numba.njit(parallel=True, cache=True)
+def cross_group_stress_matrix(
+    pH_values: np.array,
+    pH_counts: np.array,
+    pH_weights: np.array,
+    pH_offsets: np.array,
+    temp_values: np.array,
+    temp_counts: np.array,
+    temp_weights: np.array,
+    temp_offsets: np.array,
+    num_readings: np.array,
+) -> np.array:
+    """
+    Compute the stress between the readings of every pair of groups, as a condensed upper triangle.
+
+    Each group is given by its value-count tables of pH and temperature: its distinct values
+    sorted within the group, with their reading count and weight sum, group g spanning
+    [offsets[g], offsets[g + 1]). Prefix sums are built once per group, then each cell merges
+    two tables in O(d_A + d_B) for d distinct values per group, rows spread across cores.
+
+    Cell (A, B) is the sum over the readings i of A and j of B of the pair stress divided by
+    n_A * n_B; the diagonal is the stress score of each group alone.
+
+    Args:
+        pH_values (np.array): Distinct pH values, sorted within each group.
+        pH_counts (np.array): Number of readings with each pH value.
+        pH_weights (np.array): Sum of the weights 500 / quantity of the readings with each pH value.
+        pH_offsets (np.array): Group boundaries of the pH table.
+        temp_values (np.array): Distinct temperature values, sorted within each group.
+        temp_counts (np.array): Number of readings with each temperature value.
+        temp_weights (np.array): Sum of the weights of the readings with each temperature value.
+        temp_offsets (np.array): Group boundaries of the temperature table.
+        num_readings (np.array): Number of readings of each group, including the ones with missing values.
+    Returns:
+        np.array: The cells (A, B) with A <= B, row by row, of length n_groups * (n_groups + 1) / 2.
+    """
+    n_groups = len(num_readings)
+    pH_sums = _summary_prefix_sums(pH_values, pH_counts, pH_weights, pH_offsets)
+    temp_sums = _summary_prefix_sums(temp_values, temp_counts, temp_weights, temp_offsets)
+    cells = np.zeros(n_groups * (n_groups + 1) // 2, dtype=np.float64)
+
+    for a in numba.prange(n_groups):
+        row_start = a * n_groups - a * (a - 1) // 2
+        for b in range(a, n_groups):
+            if num_readings[a] == 0 or num_readings[b] == 0:
+                continue
+            pair_sum = _summary_cross_sum(
+                pH_values, pH_counts, pH_weights, pH_sums,
+                pH_offsets[a], pH_offsets[a + 1], pH_offsets[b], pH_offsets[b + 1],
+            ) + 2.0 * _summary_cross_sum(
+                temp_values, temp_counts, temp_weights, temp_sums,
+                temp_offsets[a], temp_offsets[a + 1], temp_offsets[b], temp_offsets[b + 1],
+            )
+            if a == b:
+                # Ordered pairs within the group: the cross sum of a group with itself counts both orders.
+                cells[row_start] = pair_sum / (num_readings[a] * num_readings[a])
+            else:
+                cells[row_start + b - a] = pair_sum / (num_readings[a] * num_readings[b])
+
+    return cells
@@ -1,49 +1,175 @@
+from pathlib import Path
+
 import polars as pl
 from aquarium_adventures.transformations import AquariumTransformer
 from aquarium_adventures.computations import AquariumHPCComputations
+from aquarium_adventures.cache import file_fingerprint
+from aquarium_adventures.partitioned import PARTITIONED_FORMAT, scan_partitioned, write_partitioned
 from aquarium_adventures.pipeline import AquariumPipeline
+from aquarium_adventures.runtime import RuntimeConfig
+from aquarium_adventures.storage import (
+    SENSOR_SCHEMA,
+    TANK_INFO_SCHEMA,
+    read_table,
+    scan_table,
+    write_table,
+)
+from aquarium_adventures.streaming import AquariumStreamingPipeline
+
+
+def read_tank_info(path, input_format=None, typed_schema=False) -> pl.DataFrame:
+    """
+    Reads a tank info file with its "fish_species" split into a list.
+
+    Args:
+        path (str): Path to the tank info file (TSV, Parquet or Arrow IPC).
+        input_format (str, optional): Format of the file, inferred from its extension if None.
+        typed_schema (bool, optional): Read it with `TANK_INFO_SCHEMA`. Defaults to False.
+    Returns:
+        pl.DataFrame: The tank info.
+    """
+    tank_info_df = read_table(path, input_format, TANK_INFO_SCHEMA if typed_schema else None)
+    if tank_info_df["fish_species"].dtype == pl.String:
+        tank_info_df = tank_info_df.with_columns(pl.col("fish_species").str.split(","))
+    return tank_info_df
 
 
 def run_full_pipeline(
-    input_csv, tank_info_csv=None, output_csv=None, project_name="AquariumProject"
+    input_csv,
+    tank_info_csv=None,
+    output_csv=None,
+    project_name="AquariumProject",
+    streaming=False,
+    memory_budget_mb=1024,
+    input_format=None,
+    output_format=None,
+    cache=None,
+    metrics_logger=None,
+    species_mode="explode",
+    typed_schema=False,
+    runtime=None,
 ):
     """
     Runs the full aquarium data processing pipeline.
 
     Args:
-        input_csv (str): Path to the input sensor data CSV file.
-        tank_info_csv (str, optional): Path to the tank info CSV file. Defaults to None.
-        output_csv (str, optional): Path to save the output CSV file. Defaults to None.
+        input_csv (str): Path to the input sensor data file (TSV, Parquet or Arrow IPC).
+        tank_info_csv (str, optional): Path to the tank info file. Defaults to None.
+        output_csv (str, optional): Path to save the output file. Defaults to None.
         project_name (str, optional): Name of the Weights & Biases project. Defaults to "AquariumProject".
+        streaming (bool, optional): Process the sensor data out-of-core and write the output as it is
+            produced, for files larger than RAM. Requires `output_csv`. Defaults to False.
+        memory_budget_mb (int, optional): Memory budget of the streaming mode. Defaults to 1024.
+        input_format (str, optional): Format of the input files, "csv", "parquet" or "ipc".
+            Inferred from the file extensions if None.
+        output_format (str, optional): Format of the output file, inferred from its extension if None.
+            "partitioned" writes `output_csv` as a directory of Parquet files partitioned by tank and day,
+            with a manifest, see `PartitionedParquetWriter`.
+        cache (StageCache, optional): On-disk cache of the stage outputs, keyed by the input file
+            size and modification time and by the analyzers configuration. Defaults to None.
+        metrics_logger (AsyncMetricsLogger, optional): Logger receiving the run metrics instead of
+            Weights & Biases, e.g. with a local `JSONLSink` for air-gapped runs. The caller closes it.
+            Defaults to None.
+        species_mode (str, optional): "explode" for one row per reading and fish species, or
+            "compact" for one row per reading with the species as a categorical list.
+            In compact mode, the number of readings per fish species is written next to
+            `output_csv`, see `fish_species_table_path`. Defaults to "explode".
+        typed_schema (bool, optional): Read the files with the memory-lean `SENSOR_SCHEMA` and
+            `TANK_INFO_SCHEMA` (Int32 ids, Float32 measurements, parsed times and categorical species)
+            instead of inferring Int64/Float64/String dtypes. Defaults to False.
+        runtime (RuntimeConfig | int, optional): Core budget of the run, or its number of cores,
+            split across the joblib workers, Polars and Numba threads of each stage. Read from the
+            `AQUARIUM_NUM_CORES` environment variable if None, and every available core otherwise.
 
     Returns:
-        pl.DataFrame: The final processed DataFrame.
+        pl.DataFrame: The final processed DataFrame. In streaming mode, a LazyFrame scanning `output_csv`.
     """
 
     # LOAD DATA
-    sensors_df = pl.read_csv(input_csv, separator="\t")
-
+    sensors_schema = SENSOR_SCHEMA if typed_schema else None
     tank_info_df_fish_species_split = None
     if tank_info_csv:
-        tank_info_df_fish_species_split = pl.read_csv(
-            tank_info_csv, separator="\t"
-        ).with_columns(pl.col("fish_species").str.split(","))
+        tank_info_df_fish_species_split = read_tank_info(
+            tank_info_csv, input_format, typed_schema
+        )
+
+    if streaming:
+        if not output_csv:
+            raise ValueError("output_csv is required in streaming mode")
+
+        streaming_pipeline = AquariumStreamingPipeline(
+            tank_info_df_fish_species_split, memory_budget_mb=memory_budget_mb
+        )
+        stress_score = streaming_pipeline.run(
+            scan_table(input_csv, input_format, sensors_schema), output_csv, output_format
+        )
+        if metrics_logger is not None:
+            metrics_logger.log({"stress_score": stress_score})
+        else:
+            AquariumPipeline([], project_name=project_name).log_to_wandb(
+                pl.DataFrame({"stress_score": [stress_score]})
+            )
+        if output_format == PARTITIONED_FORMAT:
+            return scan_partitioned(output_csv)
+        return scan_table(output_csv, output_format, sensors_schema)
+
+    sensors_df = read_table(input_csv, input_format, sensors_schema)
+
+    if isinstance(runtime, int):
+        runtime = RuntimeConfig(num_cores=runtime)
 
     # INITIALIZE TRANSFORMER AND COMPUTATIONS
-    transformer = AquariumTransformer(tank_info_df_fish_species_split)
+    transformer = AquariumTransformer(
+        tank_info_df_fish_species_split, species_mode=species_mode
+    )
     hpc_computations = AquariumHPCComputations()
 
     # RUN PIPELINE
     pipeline = AquariumPipeline(
-        analyzers=[transformer, hpc_computations], project_name=project_name
+        analyzers=[transformer, hpc_computations],
+        project_name=project_name,
+        cache=cache,
+        metrics_logger=metrics_logger,
+        runtime=runtime,
+    )
+    result_df = pipeline.run(
+        sensors_df,
+        log_to_wandb=metrics_logger is None,
+        input_fingerprint=file_fingerprint(input_csv) if cache is not None else None,
     )
-    result_df = pipeline.run(sensors_df, log_to_wandb=True)
 
-    if output_csv:
-        result_df.write_csv(output_csv, separator="\t")
+    if output_csv and output_format == PARTITIONED_FORMAT:
+        write_partitioned(result_df, output_csv)
+    elif output_csv:
+        write_table(result_df, output_csv, output_format)
+
+    # Restored from the cache along with the stage output when the transformer did not run.
+    if output_csv and transformer.fish_species_table is not None:
+        species_path, species_format = fish_species_table_path(output_csv, output_format)
+        write_table(transformer.fish_species_table, species_path, species_format)
 
     return result_df
 
+
+def fish_species_table_path(output_csv, output_format=None) -> tuple:
+    """
+    Where `run_full_pipeline` writes the number of readings per fish species of a compact-mode run:
+    beside the output, with "_fish_species" appended to its name, as Parquet for a partitioned output.
+
+    Args:
+        output_csv (str | Path): The pipeline output path.
+        output_format (str, optional): Format of the output, inferred from its extension if None.
+    Returns:
+        tuple[Path, str | None]: The path of the table and its format.
+    """
+    output_path = Path(output_csv)
+    if output_format == PARTITIONED_FORMAT:
+        return output_path.with_name(f"{output_path.name}_fish_species.parquet"), "parquet"
+    return (
+        output_path.with_name(f"{output_path.stem}_fish_species{output_path.suffix}"),
+        output_format,
+    )
+
 if __name__ == "__main__":
     
     sensors_csv = "data/full_sensors.tsv"
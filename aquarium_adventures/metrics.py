@@ -0,0 +1,258 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+
+class MetricsSink(ABC):
+    """
+    Destination of the metrics batched by `AsyncMetricsLogger`.
+
+    Sinks are only called from the logger background thread, one batch at a time.
+    """
+
+    def open(self, run_id: str) -> None:
+        """
+        Prepares the sink for a run, called once before the first batch.
+
+        Args:
+            run_id (str): Identifier of the run the metrics belong to.
+        """
+
+    @abstractmethod
+    def write(self, records: list) -> None:
+        """
+        Writes a batch of metric records.
+
+        Args:
+            records (list[dict]): The records, each with a "timestamp" and "step" field.
+        """
+
+    def close(self) -> None:
+        """
+        Releases the sink resources, called once after the last batch.
+        """
+
+
+class WandbSink(MetricsSink):
+    def __init__(self, project_name=None):
+        self.project_name = project_name
+
+    def open(self, run_id):
+        import wandb
+
+        wandb.init(project=self.project_name)
+
+    def write(self, records):
+        import wandb
+
+        for record in records:
+            wandb.log(
+                {k: v for k, v in record.items() if k not in ("timestamp", "step")}
+            )
+
+    def close(self):
+        import wandb
+
+        wandb.finish()
+
+
+class JSONLSink(MetricsSink):
+    """
+    Appends one JSON object per record to a local file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.run_id = None
+        self.file = None
+
+    def open(self, run_id):
+        self.run_id = run_id
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "a")
+
+    def write(self, records):
+        for record in records:
+            self.file.write(json.dumps({"run_id": self.run_id, **record}) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class SQLiteSink(MetricsSink):
+    """
+    Stores one row per (run, step, metric) in a local SQLite database.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.run_id = None
+        self.connection = None
+
+    def open(self, run_id):
+        self.run_id = run_id
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # The connection is created, used and closed by the logger thread only.
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS metrics ("
+            "run_id TEXT, step INTEGER, timestamp REAL, name TEXT, value)"
+        )
+
+    def write(self, records):
+        rows = [
+            (self.run_id, record["step"], record["timestamp"], name, value)
+            for record in records
+            for name, value in record.items()
+            if name not in ("timestamp", "step")
+        ]
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO metrics VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class AsyncMetricsLogger:
+    """
+    Collects metrics without blocking and writes them to its sinks in batches from a background thread.
+
+    `log` only enqueues the record; opening the sinks (e.g. `wandb.init`), batching and writing
+    all happen in the background thread. When the queue is full, records are dropped and
+    counted in `dropped` rather than slowing the caller down.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self, sinks, batch_size=256, flush_interval_s=1.0, max_queue_size=100_000
+    ):
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.run_id = uuid.uuid4().hex
+        self.dropped = 0
+        self.errors = []
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._step = 0
+        self._thread = threading.Thread(
+            target=self._worker, name="aquarium-metrics", daemon=True
+        )
+        self._thread.start()
+
+    def log(self, metrics: dict) -> None:
+        """
+        Enqueues a record of metrics, never blocking.
+
+        Args:
+            metrics (dict): Metric names and values.
+        """
+        record = {"timestamp": time.time(), "step": self._step, **metrics}
+        self._step += 1
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self, timeout=5.0) -> bool:
+        """
+        Flushes the pending records and closes the sinks, waiting at most `timeout` seconds.
+
+        Args:
+            timeout (float): Deadline in seconds; the background thread keeps flushing after it.
+        Returns:
+            bool: Whether everything was flushed before the deadline.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                self._queue.put(self._STOP, timeout=max(deadline - time.monotonic(), 0))
+                break
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    return False
+        self._thread.join(max(deadline - time.monotonic(), 0))
+        return not self._thread.is_alive()
+
+    def _worker(self):
+        open_sinks = []
+        for sink in self.sinks:
+            if self._call(sink.open, self.run_id):
+                open_sinks.append(sink)
+
+        stopping = False
+        while not stopping:
+            batch = []
+            flush_at = time.monotonic() + self.flush_interval_s
+            while len(batch) < self.batch_size:
+                try:
+                    record = self._queue.get(timeout=max(flush_at - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if record is self._STOP:
+                    stopping = True
+                    break
+                batch.append(record)
+
+            if batch:
+                for sink in open_sinks:
+                    self._call(sink.write, batch)
+
+        for sink in open_sinks:
+            self._call(sink.close)
+
+    def _call(self, method, *args) -> bool:
+        # A failing sink must not stop the others nor the pipeline.
+        try:
+            method(*args)
+        except Exception as error:
+            self.errors.append((method.__qualname__, error))
+            return False
+        return True
+
+
+def pipeline_metrics(df, report=None) -> dict:
+    """
+    Metrics of a pipeline run: stress scores, row counts, stage resource usage and thread settings.
+
+    Args:
+        df (pl.DataFrame): The pipeline output.
+        report (PipelineReport, optional): The run report.
+    Returns:
+        dict: Metric names and values.
+    """
+    metrics = {"rows": df.height, "columns": df.width}
+
+    if "stress_score" in df.columns and df.height:
+        metrics["stress_score"] = df["stress_score"][0]
+
+    for column in df.columns:
+        if column.startswith("stress_score_per_"):
+            keys = column[len("stress_score_per_") :]
+            if keys not in df.columns:
+                continue
+            groups = df.select(keys, column).unique(keys)
+            for key, value in groups.iter_rows():
+                metrics[f"{column}/{key}"] = value
+
+    if report is not None:
+        for stage in report.stages:
+            metrics[f"stage/{stage.name}/wall_time_s"] = stage.wall_time_s
+            metrics[f"stage/{stage.name}/cpu_time_s"] = stage.cpu_time_s
+            metrics[f"stage/{stage.name}/peak_rss_delta_mb"] = stage.peak_rss_delta_mb
+            metrics[f"stage/{stage.name}/output_rows"] = stage.output_rows
+        for name, value in report.runtime.items():
+            if value is not None:
+                metrics[f"runtime/{name}"] = value
+
+    return metrics
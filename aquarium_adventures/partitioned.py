@@ -0,0 +1,408 @@
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from datetime import date
+from pathlib import Path
+
+import polars as pl
+
+from aquarium_adventures.runtime import get_runtime_config
+
+PARTITIONED_FORMAT = "partitioned"
+MANIFEST_NAME = "_manifest.json"
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Staging files of `sink_partitioned`, each holding whole partitions.
+STAGING_BUCKETS = 64
+
+# Columns whose min and max are recorded per file in the manifest, for pruning beyond the partitions.
+STATISTICS_COLUMNS = ("time", "pH", "temp", "quantity_liters")
+
+
+class PartitionedParquetWriter:
+    """
+    Writes readings as a Parquet dataset partitioned by tank and day, from background threads.
+
+    Batches passed to `write` are buffered up to `buffer_rows` rows, so that small streaming
+    batches do not become tiny files, then split into partitions and queued; `num_writers`
+    background threads (one per core by default) compress and write them as
+    `tank_id=<id>/date=<day>/part-<n>.parquet` while the caller computes the next batches. At most `max_pending` partitions wait in the queue, which
+    with the buffer bounds the memory held by the writer. `close` writes `_manifest.json`, listing every file with its
+    partition values, row count and column statistics, so readers can prune files without
+    listing directories or opening footers. A dataset without a manifest is incomplete.
+    """
+
+    FORMAT_VERSION = 1
+    PARTITION_BY = ("tank_id", "date")
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        directory,
+        partition_by=PARTITION_BY,
+        compression="zstd",
+        row_group_size=None,
+        buffer_rows=1_000_000,
+        max_pending=16,
+        num_writers=None,
+    ):
+        if isinstance(partition_by, str):
+            partition_by = [partition_by]
+        self.directory = Path(directory)
+        self.partition_by = list(partition_by)
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.buffer_rows = buffer_rows
+        self.files = []
+        self.schema = None
+        self.manifest = None
+        self._num_files = 0
+        self._lock = threading.Lock()
+        self._error = None
+        self._closed = False
+        self._buffer = []
+        self._buffered_rows = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+
+        if num_writers is None:
+            num_writers = get_runtime_config().num_cores
+        if num_writers < 1:
+            raise ValueError(f"num_writers must be at least 1, got {num_writers}")
+        if not self.partition_by:
+            raise ValueError("At least one partition column is required")
+        if (self.directory / MANIFEST_NAME).exists():
+            raise FileExistsError(f"{self.directory} already holds a partitioned dataset")
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._threads = [
+            threading.Thread(
+                target=self._worker, name=f"aquarium-partition-writer-{index}", daemon=True
+            )
+            for index in range(num_writers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # Stop the writer without a manifest: the dataset stays marked incomplete.
+            self._stop()
+
+    def write(self, df: pl.DataFrame) -> None:
+        """
+        Queues a batch of readings, blocking only while the queue is full.
+
+        Args:
+            df (pl.DataFrame): The readings, with the partition columns. "date" is derived
+                from the "time" column unless present.
+        """
+        self._raise_error()
+        if self._closed:
+            raise ValueError("The writer is closed")
+        if df.height == 0:
+            return
+        if self.schema is None:
+            self.schema = df.schema
+
+        self._buffer.append(df)
+        self._buffered_rows += df.height
+        if self._buffered_rows >= self.buffer_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Splits the buffered rows into partitions and queues them for writing.
+        """
+        if not self._buffer:
+            return
+        df = pl.concat(self._buffer, how="vertical_relaxed")
+        self._buffer = []
+        self._buffered_rows = 0
+
+        key_columns = [f"__partition_{name}" for name in self.partition_by]
+        keyed = df.with_columns(
+            partition_expression(name, df.schema).alias(column)
+            for name, column in zip(self.partition_by, key_columns)
+        )
+        for key, part in keyed.partition_by(key_columns, as_dict=True).items():
+            self._queue.put((key, part.drop(key_columns)))
+            self._raise_error()
+
+    def close(self) -> dict:
+        """
+        Waits for the queued partitions and writes the manifest.
+
+        Returns:
+            dict: The manifest.
+        """
+        if self.manifest is not None:
+            return self.manifest
+        if not self._closed:
+            self.flush()
+        self._stop()
+        self._raise_error()
+
+        self.manifest = _write_manifest(
+            self.directory, self.partition_by, self.compression, self.schema, self.files
+        )
+        return self.manifest
+
+    def _stop(self):
+        if not self._closed:
+            self._closed = True
+            for _ in self._threads:
+                self._queue.put(self._STOP)
+        for thread in self._threads:
+            thread.join()
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("Writing a partition failed") from self._error
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            if self._error is not None:
+                # Drain the queue so that `write` never blocks after a failure.
+                continue
+            try:
+                entry = self._write_partition(*item)
+                with self._lock:
+                    self.files.append(entry)
+            except Exception as error:
+                self._error = error
+
+    def _write_partition(self, key, df: pl.DataFrame) -> dict:
+        values = dict(zip(self.partition_by, (_json_value(value) for value in key)))
+        relative_dir = Path(
+            *(
+                f"{name}={NULL_PARTITION if value is None else value}"
+                for name, value in values.items()
+            )
+        )
+        with self._lock:
+            relative_path = relative_dir / f"part-{self._num_files:05d}.parquet"
+            self._num_files += 1
+
+        path = self.directory / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        df.write_parquet(
+            tmp_path,
+            compression=self.compression,
+            statistics=True,
+            row_group_size=self.row_group_size,
+        )
+        os.replace(tmp_path, path)
+
+        statistics = {}
+        for name in STATISTICS_COLUMNS:
+            if name in df.columns:
+                column = df[name]
+                statistics[name] = {
+                    "min": _json_value(column.min()),
+                    "max": _json_value(column.max()),
+                    "null_count": column.null_count(),
+                }
+        return {
+            "path": relative_path.as_posix(),
+            "partition": values,
+            "num_rows": df.height,
+            "size_bytes": path.stat().st_size,
+            "statistics": statistics,
+        }
+
+
+def partition_expression(name, schema) -> pl.Expr:
+    """
+    Expression of a partition key: the column itself, or the day of "time" for "date".
+
+    Args:
+        name (str): The partition column.
+        schema (pl.Schema): Schema of the readings.
+    Returns:
+        pl.Expr: The partition key.
+    """
+    if name != "date" or "date" in schema:
+        return pl.col(name)
+    if schema["time"] == pl.String:
+        # Times are ISO 8601 strings; their day prefix parses much faster than the full time.
+        return pl.col("time").str.slice(0, 10).str.to_date("%Y-%m-%d")
+    return pl.col("time").cast(pl.Datetime("ms")).dt.date()
+
+
+def write_partitioned(df: pl.DataFrame, directory, **kwargs) -> dict:
+    """
+    Writes readings as a partitioned Parquet dataset, see `PartitionedParquetWriter`.
+
+    Args:
+        df (pl.DataFrame): The readings.
+        directory (str | Path): The dataset directory.
+        **kwargs: Options of `PartitionedParquetWriter`.
+    Returns:
+        dict: The manifest.
+    """
+    with PartitionedParquetWriter(directory, **kwargs) as writer:
+        writer.write(df)
+    return writer.manifest
+
+
+def sink_partitioned(
+    lf: pl.LazyFrame,
+    directory,
+    partition_by=PartitionedParquetWriter.PARTITION_BY,
+    buffer_rows=1_000_000,
+    **kwargs,
+) -> dict:
+    """
+    Streams a query into a partitioned Parquet dataset with bounded memory and one file per partition.
+
+    Feeding streamed batches to `PartitionedParquetWriter` would write a file per partition and
+    batch, since every batch holds readings of every partition. Instead, one streaming pass
+    spreads the rows over `STAGING_BUCKETS` staging files by the first partition column; the
+    buckets are then read a group of about `buffer_rows` rows at a time and written by the
+    writer, which gets each partition whole.
+
+    Args:
+        lf (pl.LazyFrame): The readings.
+        directory (str | Path): The dataset directory.
+        partition_by (Iterable[str]): The partition columns, see `PartitionedParquetWriter`.
+        buffer_rows (int): Rows read from the staging files at a time.
+        **kwargs: Other options of `PartitionedParquetWriter`.
+    Returns:
+        dict: The manifest.
+    """
+    if isinstance(partition_by, str):
+        partition_by = [partition_by]
+    directory = Path(directory)
+    schema = lf.collect_schema()
+    first_key = partition_expression(partition_by[0], schema) if partition_by else pl.lit(0)
+
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    staging_dir = Path(tempfile.mkdtemp(prefix=f".{directory.name}.staging.", dir=directory.parent))
+    staged_files = []
+    try:
+        lf.sink_parquet(
+            pl.PartitionBy(
+                staging_dir,
+                key=(first_key.hash() % STAGING_BUCKETS).alias("__bucket"),
+                include_key=False,
+            ),
+            compression="lz4",
+            mkdir=True,
+            engine="streaming",
+            sinked_paths_callback=lambda args: staged_files.extend(args.paths),
+        )
+        buckets = {}
+        for staged in staged_files:
+            paths, num_rows = buckets.get(Path(staged.path).parent, ([], 0))
+            buckets[Path(staged.path).parent] = (paths + [staged.path], num_rows + staged.num_rows)
+
+        with PartitionedParquetWriter(
+            directory, partition_by, buffer_rows=buffer_rows, **kwargs
+        ) as writer:
+            writer.schema = schema
+            group, group_rows = [], 0
+            for _, (paths, num_rows) in sorted(buckets.items()):
+                if group and group_rows + num_rows > buffer_rows:
+                    writer.write(pl.read_parquet(group))
+                    writer.flush()
+                    group, group_rows = [], 0
+                # Files of a bucket are named in write order, which keeps the source order.
+                group += sorted(paths)
+                group_rows += num_rows
+            if group:
+                writer.write(pl.read_parquet(group))
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return writer.manifest
+
+
+def _write_manifest(directory, partition_by, compression, schema, files) -> dict:
+    manifest = {
+        "version": PartitionedParquetWriter.FORMAT_VERSION,
+        "partition_by": list(partition_by),
+        "compression": compression,
+        "num_rows": sum(entry["num_rows"] for entry in files),
+        "schema": {name: str(dtype) for name, dtype in (schema or {}).items()},
+        "files": sorted(files, key=lambda entry: entry["path"]),
+    }
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest_path = directory / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=1))
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def read_manifest(directory) -> dict:
+    """
+    Reads the manifest of a partitioned dataset.
+
+    Args:
+        directory (str | Path): The dataset directory.
+    Returns:
+        dict: The manifest.
+    """
+    manifest_path = Path(directory) / MANIFEST_NAME
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"{directory} has no manifest, the dataset is missing or incomplete")
+    manifest = json.loads(manifest_path.read_text())
+    if manifest["version"] != PartitionedParquetWriter.FORMAT_VERSION:
+        raise ValueError(f"Unsupported manifest version {manifest['version']} in {directory}")
+    return manifest
+
+
+def scan_partitioned(directory, tank_ids=None, start_date=None, end_date=None) -> pl.LazyFrame:
+    """
+    Lazily scans a partitioned dataset, opening only the files of the requested tanks and days.
+
+    Args:
+        directory (str | Path): The dataset directory.
+        tank_ids (Iterable[int], optional): Tanks to read, all if None.
+        start_date (date | str, optional): First day to read, inclusive.
+        end_date (date | str, optional): Last day to read, inclusive.
+    Returns:
+        pl.LazyFrame: The readings of the selected partitions.
+    """
+    manifest = read_manifest(directory)
+    tank_ids = None if tank_ids is None else set(tank_ids)
+    start_date = None if start_date is None else str(_json_value(start_date))
+    end_date = None if end_date is None else str(_json_value(end_date))
+
+    def selected(partition):
+        tank_id = partition.get("tank_id")
+        day = partition.get("date")
+        if tank_ids is not None and tank_id not in tank_ids:
+            return False
+        if day is not None and start_date is not None and day < start_date:
+            return False
+        if day is not None and end_date is not None and day > end_date:
+            return False
+        return True
+
+    files = [entry for entry in manifest["files"] if selected(entry["partition"])]
+    paths = [str(Path(directory) / entry["path"]) for entry in files]
+    if paths:
+        return pl.scan_parquet(paths, hive_partitioning=False)
+    if manifest["files"]:
+        first_path = Path(directory) / manifest["files"][0]["path"]
+        return pl.scan_parquet(first_path, hive_partitioning=False).head(0)
+    return pl.LazyFrame()
+
+
+def _json_value(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
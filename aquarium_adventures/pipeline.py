@@ -1,40 +1,182 @@
-import wandb
+from aquarium_adventures.cache import dataframe_fingerprint, stage_key
+from aquarium_adventures.metrics import AsyncMetricsLogger, WandbSink, pipeline_metrics
+from aquarium_adventures.report import PipelineReport, StageReport, measure_stage
+from aquarium_adventures.runtime import get_runtime_config
 
 
 class AquariumPipeline:
-    def __init__(self, analyzers, project_name=None):
+    def __init__(
+        self,
+        analyzers,
+        project_name=None,
+        cache=None,
+        metrics_logger=None,
+        logging_deadline_s=5.0,
+        runtime=None,
+    ):
         self.analyzers = analyzers
         self.project_name = project_name
+        self.cache = cache
+        self.metrics_logger = metrics_logger
+        self.logging_deadline_s = logging_deadline_s
+        self.runtime = runtime
+        self.last_report = None
 
-    def run(self, sensors_df, log_to_wandb=False):
+    def run(
+        self,
+        sensors_df,
+        log_to_wandb=False,
+        return_report=False,
+        input_fingerprint=None,
+        use_cache=True,
+    ):
         """
         Executes the pipeline on the provided sensor data.
 
+        Each analyzer is applied in order to the output of the previous one, and its wall time,
+        CPU time, peak RSS growth and input/output shapes are recorded in `last_report`.
+        With a `StageCache`, the run resumes from the latest stage whose output is cached.
+        With a `metrics_logger`, the output and stage metrics are queued to it without blocking.
+        The stages share the core budget of `runtime`, whose thread settings go to the report.
+
         Args:
             sensors_df (pl.DataFrame): The input sensor data.
             log_to_wandb (bool): Whether to log results to Weights & Biases.
+            return_report (bool): Whether to also return the `PipelineReport` of the run.
+            input_fingerprint (str, optional): Fingerprint of the input, e.g. from `cache.file_fingerprint`.
+                The DataFrame content is hashed if None.
+            use_cache (bool): Set to False to bypass the cache for this run.
         Returns:
-            pl.DataFrame: The processed DataFrame after all analyzers have been applied.
+            pl.DataFrame: The processed DataFrame after all analyzers have been applied,
+                or a (DataFrame, PipelineReport) tuple if `return_report` is True.
         """
 
-        transformed_df = self.analyzers[0].analyze_data(sensors_df)
+        report = PipelineReport()
+        self.last_report = report
+
+        names = self.stage_names()
+        keys = [None] * len(self.analyzers)
+        out_df = sensors_df
+        first_stage = 0
+
+        if self.cache is not None and use_cache and self.analyzers:
+            keys = self.stage_keys(input_fingerprint or dataframe_fingerprint(sensors_df))
+            for i in reversed(range(len(keys))):
+                if keys[i] is None:
+                    continue
+                cached_df = self.cache.get(keys[i])
+                if cached_df is not None:
+                    out_df = cached_df
+                    first_stage = i + 1
+                    self.restore_side_outputs(self.cache.get_side_outputs(keys[i]), first_stage)
+                    break
+            report.stages.extend(
+                StageReport(name=name, cached=True) for name in names[:first_stage]
+            )
+            if first_stage:
+                report.stages[-1].output_rows = out_df.height
+                report.stages[-1].output_columns = out_df.width
+
+        runtime = self.runtime if self.runtime is not None else get_runtime_config()
+        with runtime.activate():
+            for name, analyzer, key in list(zip(names, self.analyzers, keys))[first_stage:]:
+                with measure_stage(name, out_df) as stage:
+                    out_df = analyzer.analyze_data(out_df)
+                    stage["output"] = out_df
+                report.stages.append(stage["report"])
+                if key is not None:
+                    self.cache.put(key, out_df, self.collect_side_outputs(len(report.stages)))
+            report.runtime = runtime.settings()
 
-        out_df = self.analyzers[1].analyze_data(transformed_df)
+        if self.metrics_logger is not None:
+            self.metrics_logger.log(pipeline_metrics(out_df, report))
 
         if log_to_wandb:
-            self.log_to_wandb(out_df)
+            self.log_to_wandb(out_df, report)
 
+        if return_report:
+            return out_df, report
         return out_df
 
-    def log_to_wandb(self, df):
+    def stage_keys(self, input_fingerprint):
+        """
+        Returns the cache key of every stage output, each chained from the key of its input.
+
+        Args:
+            input_fingerprint (str): Fingerprint of the pipeline input.
+        Returns:
+            list[str | None]: The stage keys, in order. A stage whose analyzer cannot be
+                fingerprinted, and every stage after it, has no key and is not cached.
+        """
+        keys = []
+        previous_key = input_fingerprint
+        for analyzer in self.analyzers:
+            previous_key = stage_key(previous_key, analyzer)
+            keys.append(previous_key)
+        return keys
+
+    def collect_side_outputs(self, num_stages) -> dict:
+        """
+        The side outputs of the first `num_stages` analyzers, named "<stage index>.<name>".
+
+        A cache entry holds those of every stage it covers, so that a hit restores them all.
+
+        Args:
+            num_stages (int): Number of stages run or restored so far.
+        Returns:
+            dict[str, pl.DataFrame]: The side outputs.
+        """
+        return {
+            f"{i}.{name}": df
+            for i, analyzer in enumerate(self.analyzers[:num_stages])
+            for name, df in analyzer.side_outputs().items()
+        }
+
+    def restore_side_outputs(self, side_outputs, num_stages) -> None:
+        """
+        Hands the side outputs read from the cache back to the first `num_stages` analyzers.
+
+        Args:
+            side_outputs (dict[str, pl.DataFrame]): Side outputs named as by `collect_side_outputs`.
+            num_stages (int): Number of stages restored from the cache.
+        """
+        for i, analyzer in enumerate(self.analyzers[:num_stages]):
+            prefix = f"{i}."
+            analyzer.restore_side_outputs(
+                {
+                    name[len(prefix) :]: df
+                    for name, df in side_outputs.items()
+                    if name.startswith(prefix)
+                }
+            )
+
+    def stage_names(self):
+        """
+        Returns a unique name per analyzer, its class name suffixed with its position when repeated.
+
+        Returns:
+            list[str]: The stage names, in order.
+        """
+        class_names = [type(analyzer).__name__ for analyzer in self.analyzers]
+        return [
+            f"{class_name}[{i}]" if class_names.count(class_name) > 1 else class_name
+            for i, class_name in enumerate(class_names)
+        ]
+
+    def log_to_wandb(self, df, report=None):
         """
         Logs the results to Weights & Biases.
 
+        The run setup and the upload happen in a background thread; this waits for them
+        at most `logging_deadline_s` seconds.
+
         Args:
             df (pl.DataFrame): The DataFrame containing the results to log.
+            report (PipelineReport, optional): The run report, to log the stage timings.
         Returns:
-            None
+            bool: Whether the results were fully logged before the deadline.
         """
 
-        wandb.init(project=self.project_name)
-        wandb.log({"stress_score": df["stress_score"][0]})
+        metrics_logger = AsyncMetricsLogger([WandbSink(self.project_name)])
+        metrics_logger.log(pipeline_metrics(df, report))
+        return metrics_logger.close(timeout=self.logging_deadline_s)
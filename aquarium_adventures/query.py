@@ -0,0 +1,382 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from aquarium_adventures.computations import _column_as_float
+from aquarium_adventures.partitioned import MANIFEST_NAME, scan_partitioned
+from aquarium_adventures.storage import scan_table
+
+INDEX_NAME = "index.sqlite"
+SCHEMA_NAME = "schema.parquet"
+BUCKET_COLUMN = "__bucket"
+
+
+class AquariumQueryStore:
+    """
+    Local store of pipeline outputs, indexed by (tank_id, time) for dashboard queries.
+
+    The readings of each tank are stored sorted by time in their own Parquet file. A SQLite
+    index lists every block of `BLOCK_ROWS` consecutive rows of a file with its time range,
+    so a query reads only the blocks overlapping its tanks and time range, whatever the
+    size of the store. The index also holds per-tank summaries computed at build time.
+    """
+
+    FORMAT_VERSION = 1
+    BLOCK_ROWS = 8192
+    NUM_BUCKETS = 16
+
+    # Columns of the per-tank summaries, besides "tank_id".
+    SUMMARY_COLUMNS = (
+        "num_readings",
+        "first_time",
+        "last_time",
+        "avg_pH",
+        "avg_temp",
+        "stress_score",
+    )
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        index_path = self.directory / INDEX_NAME
+        if not index_path.exists():
+            raise FileNotFoundError(f"No query store in {directory}, see AquariumQueryStore.build")
+        # Queries may come from several threads, each reading through its own connection.
+        self._local = threading.local()
+        version = self._execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if version is None or int(version[0]) != self.FORMAT_VERSION:
+            raise ValueError(f"Unsupported query store version in {directory}")
+        self.schema = pl.read_parquet_schema(self.directory / SCHEMA_NAME)
+
+    @classmethod
+    def build(cls, source, directory, input_format=None) -> "AquariumQueryStore":
+        """
+        Builds a store from pipeline output, replacing any store in `directory`.
+
+        The source is streamed once and only one of `NUM_BUCKETS` buckets of tanks is held in
+        memory at a time, so sources larger than memory can be indexed. The store is built in
+        a temporary sibling directory which replaces `directory` once complete, so a failed
+        build leaves the previous store in place.
+
+        Args:
+            source (str | Path | pl.DataFrame | pl.LazyFrame): The pipeline output: a DataFrame,
+                a LazyFrame, a file, or a partitioned dataset directory. It needs "tank_id" and
+                "time" columns, and rows where either is null are skipped; "pH", "temp" and
+                "quantity_liters" feed the summaries.
+            directory (str | Path): The store directory.
+            input_format (str, optional): Format of a source file, inferred from its extension if None.
+        Returns:
+            AquariumQueryStore: The store.
+        """
+        directory = Path(directory)
+        if isinstance(source, (str, Path)):
+            source_path = Path(source).resolve()
+            target = directory.resolve()
+            if source_path == target or target in source_path.parents:
+                raise ValueError(f"The source {source} is inside the store directory {directory}")
+        if directory.exists() and not (directory / INDEX_NAME).exists():
+            if not directory.is_dir() or any(directory.iterdir()):
+                raise FileExistsError(f"{directory} exists and is not a query store")
+
+        source_lf = _scan_source(source, input_format)
+        columns = source_lf.collect_schema().names()
+        if "tank_id" not in columns or "time" not in columns:
+            raise ValueError("The source needs 'tank_id' and 'time' columns")
+        source_lf = source_lf.with_columns(_time_expression(source_lf.collect_schema()))
+
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        build_dir = Path(tempfile.mkdtemp(prefix=f".{directory.name}.", dir=directory.parent))
+        try:
+            cls._build(source_lf, build_dir)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+
+        # A directory can only replace an empty one: move the previous store aside first.
+        previous_dir = None
+        if directory.exists():
+            previous_dir = build_dir.with_name(f"{build_dir.name}.previous")
+            os.replace(directory, previous_dir)
+        os.replace(build_dir, directory)
+        if previous_dir is not None:
+            shutil.rmtree(previous_dir)
+        return cls(directory)
+
+    @classmethod
+    def _build(cls, source_lf: pl.LazyFrame, directory: Path) -> None:
+        (directory / "data").mkdir()
+        connection = sqlite3.connect(directory / INDEX_NAME)
+        connection.executescript(
+            """
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE blocks (
+                tank_id INTEGER, path TEXT, row_offset INTEGER, num_rows INTEGER,
+                min_time INTEGER, max_time INTEGER
+            );
+            CREATE TABLE tank_summaries (
+                tank_id INTEGER PRIMARY KEY, num_readings INTEGER, first_time INTEGER,
+                last_time INTEGER, avg_pH REAL, avg_temp REAL, stress_score REAL
+            );
+            """
+        )
+
+        # One streaming pass spreads the rows over `NUM_BUCKETS` files of tanks; each bucket is
+        # then sorted in memory on its own, and written as one file per tank. Readings without
+        # a tank or a time cannot be looked up, so they are left out of the store.
+        staging_dir = directory / "_staging"
+        source_lf.filter(
+            pl.col("tank_id").is_not_null() & pl.col("time").is_not_null()
+        ).sink_parquet(
+            pl.PartitionBy(
+                staging_dir,
+                key=(pl.col("tank_id") % cls.NUM_BUCKETS).alias(BUCKET_COLUMN),
+                include_key=False,
+            ),
+            compression="lz4",
+            mkdir=True,
+        )
+        for bucket_dir in sorted(staging_dir.iterdir()) if staging_dir.exists() else []:
+            # The sink keeps the source order, so readings at the same time keep their order.
+            bucket_df = (
+                pl.scan_parquet(bucket_dir, hive_partitioning=False)
+                .sort(["tank_id", "time"], maintain_order=True)
+                .collect()
+            )
+            for (tank_id,), tank_df in bucket_df.partition_by(
+                "tank_id", as_dict=True, maintain_order=True
+            ).items():
+                cls._write_tank(connection, directory, tank_id, tank_df)
+            del bucket_df
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+        # An empty file keeps the schema, for queries that match no readings.
+        source_lf.head(0).collect().write_parquet(directory / SCHEMA_NAME)
+        connection.execute("INSERT INTO meta VALUES ('version', ?)", (str(cls.FORMAT_VERSION),))
+        connection.execute("CREATE INDEX blocks_by_tank_time ON blocks (tank_id, min_time)")
+        connection.commit()
+        connection.close()
+
+    @classmethod
+    def _write_tank(cls, connection, directory, tank_id, tank_df: pl.DataFrame) -> None:
+        relative_path = f"data/tank_id={tank_id}.parquet"
+        tank_df.write_parquet(
+            directory / relative_path, statistics=True, row_group_size=cls.BLOCK_ROWS
+        )
+
+        epoch_ms = tank_df["time"].dt.epoch("ms").to_numpy()
+        offsets = np.arange(0, tank_df.height, cls.BLOCK_ROWS)
+        # Times are sorted, so each block spans from its first to its last reading.
+        connection.executemany(
+            "INSERT INTO blocks VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    tank_id,
+                    relative_path,
+                    int(offset),
+                    int(min(cls.BLOCK_ROWS, tank_df.height - offset)),
+                    int(epoch_ms[offset]),
+                    int(epoch_ms[min(offset + cls.BLOCK_ROWS, tank_df.height) - 1]),
+                )
+                for offset in offsets
+            ],
+        )
+
+        summary = cls.summarize(tank_df)
+        connection.execute(
+            "INSERT INTO tank_summaries VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (tank_id, *(summary[name] for name in cls.SUMMARY_COLUMNS)),
+        )
+
+    @staticmethod
+    def summarize(tank_df: pl.DataFrame) -> dict:
+        """
+        Summary of the readings of one tank sorted by time.
+
+        Args:
+            tank_df (pl.DataFrame): The readings of the tank, with a Datetime "time" column.
+        Returns:
+            dict: The values of `SUMMARY_COLUMNS`, times in milliseconds since the epoch.
+        """
+        from aquarium_adventures import kernels
+
+        summary = {
+            "num_readings": tank_df.height,
+            "first_time": tank_df["time"].dt.epoch("ms").min(),
+            "last_time": tank_df["time"].dt.epoch("ms").max(),
+            "avg_pH": None,
+            "avg_temp": None,
+            "stress_score": None,
+        }
+        if "pH" in tank_df.columns:
+            summary["avg_pH"] = tank_df["pH"].mean()
+        if "temp" in tank_df.columns:
+            summary["avg_temp"] = tank_df["temp"].mean()
+        if {"pH", "temp", "quantity_liters"} <= set(tank_df.columns):
+            summary["stress_score"] = float(
+                kernels.sorted_stress_function(
+                    _column_as_float(tank_df, "pH"),
+                    _column_as_float(tank_df, "temp"),
+                    _column_as_float(tank_df, "quantity_liters"),
+                )
+            )
+        return summary
+
+    def query(self, tanks=None, start=None, end=None, columns=None) -> pl.DataFrame:
+        """
+        Reads the readings of some tanks over a time range, from the matching blocks only.
+
+        Args:
+            tanks (int | Iterable[int], optional): Tanks to read, all if None.
+            start (str | datetime | date, optional): First time to read, inclusive.
+            end (str | datetime | date, optional): Last time to read, inclusive.
+            columns (Iterable[str], optional): Columns to return, all if None.
+        Returns:
+            pl.DataFrame: The readings sorted by tank and time.
+        """
+        if isinstance(tanks, int):
+            tanks = [tanks]
+        start_ms = None if start is None else _epoch_ms(start)
+        end_ms = None if end is None else _epoch_ms(end)
+
+        conditions, parameters = [], []
+        if tanks is not None:
+            tanks = [int(tank_id) for tank_id in tanks]
+            conditions.append(f"tank_id IN ({','.join('?' * len(tanks))})")
+            parameters += tanks
+        if start_ms is not None:
+            conditions.append("max_time >= ?")
+            parameters.append(start_ms)
+        if end_ms is not None:
+            conditions.append("min_time <= ?")
+            parameters.append(end_ms)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        blocks = self._execute(
+            f"SELECT path, row_offset, num_rows FROM blocks {where} ORDER BY tank_id, min_time",
+            parameters,
+        ).fetchall()
+
+        selected = list(columns) if columns is not None else list(self.schema)
+        if not blocks:
+            return pl.read_parquet(self.directory / SCHEMA_NAME, columns=selected)
+
+        # Consecutive blocks of a file are read as one slice.
+        ranges = []
+        for path, offset, num_rows in blocks:
+            if ranges and ranges[-1][0] == path and ranges[-1][1] + ranges[-1][2] == offset:
+                ranges[-1][2] += num_rows
+            else:
+                ranges.append([path, offset, num_rows])
+
+        time_filter = pl.lit(True)
+        if start_ms is not None:
+            time_filter &= pl.col("time").dt.epoch("ms") >= start_ms
+        if end_ms is not None:
+            time_filter &= pl.col("time").dt.epoch("ms") <= end_ms
+        frames = [
+            pl.scan_parquet(self.directory / path).slice(offset, num_rows)
+            for path, offset, num_rows in ranges
+        ]
+        return pl.concat(frames).filter(time_filter).select(selected).collect()
+
+    def summaries(self, tanks=None) -> pl.DataFrame:
+        """
+        Per-tank summaries computed at build time.
+
+        Args:
+            tanks (int | Iterable[int], optional): Tanks to return, all if None.
+        Returns:
+            pl.DataFrame: One row per tank with "tank_id" and `SUMMARY_COLUMNS`.
+        """
+        if isinstance(tanks, int):
+            tanks = [tanks]
+        query = "SELECT * FROM tank_summaries"
+        parameters = []
+        if tanks is not None:
+            parameters = [int(tank_id) for tank_id in tanks]
+            query += f" WHERE tank_id IN ({','.join('?' * len(parameters))})"
+        rows = self._execute(query + " ORDER BY tank_id", parameters).fetchall()
+        return pl.DataFrame(
+            rows,
+            schema={
+                "tank_id": pl.Int64,
+                "num_readings": pl.Int64,
+                "first_time": pl.Int64,
+                "last_time": pl.Int64,
+                "avg_pH": pl.Float64,
+                "avg_temp": pl.Float64,
+                "stress_score": pl.Float64,
+            },
+            orient="row",
+        ).with_columns(pl.col("first_time", "last_time").cast(pl.Datetime("ms")))
+
+    def _execute(self, sql, parameters=()):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            uri = f"{(self.directory / INDEX_NAME).resolve().as_uri()}?mode=ro"
+            connection = sqlite3.connect(uri, uri=True)
+            self._local.connection = connection
+        return connection.execute(sql, parameters)
+
+
+def _scan_source(source, input_format=None) -> pl.LazyFrame:
+    if isinstance(source, pl.DataFrame):
+        return source.lazy()
+    if isinstance(source, pl.LazyFrame):
+        return source
+    if (Path(source) / MANIFEST_NAME).exists():
+        return scan_partitioned(source)
+    return scan_table(source, input_format)
+
+
+def _time_expression(schema) -> pl.Expr:
+    if schema["time"] == pl.String:
+        return pl.col("time").str.to_datetime(time_unit="ms")
+    return pl.col("time").cast(pl.Datetime("ms"))
+
+
+def _epoch_ms(value) -> int:
+    series = pl.Series([value])
+    if series.dtype == pl.String:
+        series = series.str.to_datetime(time_unit="ms")
+    return series.cast(pl.Datetime("ms")).dt.epoch("ms")[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build and query an indexed store of aquarium pipeline outputs."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build a store from a pipeline output.")
+    build.add_argument("source", help="Output file or partitioned dataset directory.")
+    build.add_argument("store", help="Store directory, replaced if it exists.")
+
+    query = commands.add_parser("query", help="Print the readings of some tanks.")
+    query.add_argument("store", help="Store directory.")
+    query.add_argument("--tank", type=int, action="append", help="Tank id, repeatable.")
+    query.add_argument("--start", default=None, help="First time, e.g. 2025-01-01.")
+    query.add_argument("--end", default=None, help="Last time, inclusive.")
+    query.add_argument("--columns", default=None, help="Comma separated columns.")
+
+    summary = commands.add_parser("summary", help="Print the per-tank summaries.")
+    summary.add_argument("store", help="Store directory.")
+    summary.add_argument("--tank", type=int, action="append", help="Tank id, repeatable.")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        store = AquariumQueryStore.build(args.source, args.store)
+        print(f"Built '{args.store}' with {store.summaries()['num_readings'].sum()} readings")
+    elif args.command == "query":
+        columns = args.columns.split(",") if args.columns else None
+        print(AquariumQueryStore(args.store).query(args.tank, args.start, args.end, columns))
+    else:
+        print(AquariumQueryStore(args.store).summaries(args.tank))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import json
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+
+# ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+_MAXRSS_TO_MB = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+
+
+def peak_rss_mb() -> float:
+    """
+    Returns the peak resident set size of the current process in megabytes.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_TO_MB
+
+
+@dataclass
+class StageReport:
+    """
+    Resources used by one pipeline stage.
+
+    `peak_rss_delta_mb` is how much the stage raised the process peak RSS, so it is 0
+    for a stage that stays below the peak reached by an earlier one.
+    """
+
+    name: str
+    wall_time_s: float = 0.0
+    cpu_time_s: float = 0.0
+    peak_rss_delta_mb: float = 0.0
+    input_rows: int = 0
+    input_columns: int = 0
+    output_rows: int = 0
+    output_columns: int = 0
+    cached: bool = False
+
+
+@dataclass
+class PipelineReport:
+    """
+    Per-stage resource usage of a pipeline run, and the thread settings it ran with.
+    """
+
+    stages: list = field(default_factory=list)
+    runtime: dict = field(default_factory=dict)
+
+    @property
+    def wall_time_s(self) -> float:
+        return sum(stage.wall_time_s for stage in self.stages)
+
+    @property
+    def cpu_time_s(self) -> float:
+        return sum(stage.cpu_time_s for stage in self.stages)
+
+    def to_dict(self) -> dict:
+        return {
+            "wall_time_s": self.wall_time_s,
+            "cpu_time_s": self.cpu_time_s,
+            "runtime": self.runtime,
+            "stages": [asdict(stage) for stage in self.stages],
+        }
+
+    def to_json(self, indent=2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+
+@contextmanager
+def measure_stage(name, input_df):
+    """
+    Measures wall time, CPU time and peak RSS growth of the code in the `with` block.
+
+    The caller sets the output DataFrame on the yielded dict under "output" to record its shape.
+
+    Args:
+        name (str): The stage name.
+        input_df (pl.DataFrame): The stage input.
+    Yields:
+        dict: A holder for the stage output.
+    """
+    stage = StageReport(
+        name=name, input_rows=input_df.height, input_columns=input_df.width
+    )
+    holder = {"output": None, "report": stage}
+
+    rss_before = peak_rss_mb()
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+    try:
+        yield holder
+    finally:
+        stage.wall_time_s = time.perf_counter() - wall_before
+        stage.cpu_time_s = time.process_time() - cpu_before
+        stage.peak_rss_delta_mb = peak_rss_mb() - rss_before
+        output_df = holder["output"]
+        if output_df is not None:
+            stage.output_rows = output_df.height
+            stage.output_columns = output_df.width
@@ -0,0 +1,195 @@
+import os
+import sys
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+# This module is imported by the package `__init__`, before Polars and Numba read their
+# thread settings, so it must not import either of them at module level.
+
+CORES_ENV_VAR = "AQUARIUM_NUM_CORES"
+JOBLIB_BACKEND = "aquarium_loky"
+
+# Thread pool sizes of the libraries, read once when they are imported.
+POLARS_THREADS_VAR = "POLARS_MAX_THREADS"
+NUMBA_THREADS_VAR = "NUMBA_NUM_THREADS"
+
+
+def available_cores() -> int:
+    """
+    Returns the number of cores this process may run on, which respects CPU affinity masks
+    such as the ones set by batch schedulers.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_num_cores() -> int:
+    """
+    Returns the core budget set by the `AQUARIUM_NUM_CORES` environment variable,
+    or every available core.
+    """
+    value = os.environ.get(CORES_ENV_VAR)
+    if not value:
+        return available_cores()
+    try:
+        num_cores = int(value)
+    except ValueError:
+        raise ValueError(f"{CORES_ENV_VAR} must be an integer, got {value!r}") from None
+    if num_cores < 1:
+        raise ValueError(f"{CORES_ENV_VAR} must be at least 1, got {num_cores}")
+    return num_cores
+
+
+@dataclass
+class RuntimeConfig:
+    """
+    Core budget of a run, split across the thread and process pools of each stage.
+
+    Stages running joblib workers give each worker `num_cores // workers` Polars and Numba
+    threads, and stages running Numba kernels in the main process use `num_cores` threads.
+    The Polars pool of the main process is sized once, when Polars is first imported: the
+    package sets `POLARS_MAX_THREADS` from `AQUARIUM_NUM_CORES` at import, unless it is
+    already set.
+    """
+
+    num_cores: int = field(default_factory=default_num_cores)
+
+    def __post_init__(self):
+        if self.num_cores < 1:
+            raise ValueError(f"num_cores must be at least 1, got {self.num_cores}")
+
+    def joblib_workers(self, num_tasks: int) -> int:
+        """
+        Returns the number of joblib workers for `num_tasks` independent tasks.
+        """
+        return max(1, min(num_tasks, self.num_cores))
+
+    def threads_per_worker(self, num_workers: int) -> int:
+        """
+        Returns the number of threads each of `num_workers` workers may use.
+        """
+        return max(1, self.num_cores // max(num_workers, 1))
+
+    def numba_threads(self) -> int:
+        """
+        Returns the number of Numba threads of the main process, at most the size of its pool.
+        """
+        if "numba" not in sys.modules:
+            return self.num_cores
+        import numba
+
+        return min(self.num_cores, numba.config.NUMBA_NUM_THREADS)
+
+    @contextmanager
+    def activate(self):
+        """
+        Makes this the config of the code in the `with` block and limits the Numba threads to it.
+        """
+        global _active_config
+
+        previous_config, _active_config = _active_config, self
+        previous_threads = None
+        if "numba" in sys.modules:
+            import numba
+
+            previous_threads = numba.get_num_threads()
+            numba.set_num_threads(self.numba_threads())
+        else:
+            # Numba sizes its pool from the environment when it is first imported.
+            os.environ.setdefault(NUMBA_THREADS_VAR, str(self.num_cores))
+        try:
+            yield self
+        finally:
+            _active_config = previous_config
+            if previous_threads is not None:
+                import numba
+
+                numba.set_num_threads(previous_threads)
+
+    def settings(self, joblib_tasks=3) -> dict:
+        """
+        Thread settings of the current process under this config, for the run report.
+
+        Args:
+            joblib_tasks (int): Number of tasks of the joblib stage, 3 for `AquariumTransformer`.
+        Returns:
+            dict: The core budget, the Polars and Numba threads of the main process, and the
+                joblib workers with their threads each.
+        """
+        workers = self.joblib_workers(joblib_tasks)
+        settings = {
+            "num_cores": self.num_cores,
+            "polars_threads": None,
+            "numba_threads": None,
+            "joblib_workers": workers,
+            "threads_per_joblib_worker": self.threads_per_worker(workers),
+        }
+        if "polars" in sys.modules:
+            import polars as pl
+
+            settings["polars_threads"] = pl.thread_pool_size()
+        if "numba" in sys.modules:
+            import numba
+
+            settings["numba_threads"] = numba.get_num_threads()
+        return settings
+
+
+_active_config = None
+
+
+def get_runtime_config() -> RuntimeConfig:
+    """
+    Returns the config activated by the running pipeline, or one built from the environment.
+    """
+    if _active_config is not None:
+        return _active_config
+    return RuntimeConfig()
+
+
+def configure_environment() -> None:
+    """
+    Sizes the Polars and Numba thread pools of this process from `AQUARIUM_NUM_CORES`, when it
+    is set and they have not been created yet. Explicit `POLARS_MAX_THREADS` and
+    `NUMBA_NUM_THREADS` values are kept.
+    """
+    if not os.environ.get(CORES_ENV_VAR):
+        return
+    num_cores = str(default_num_cores())
+    if "polars" not in sys.modules:
+        os.environ.setdefault(POLARS_THREADS_VAR, num_cores)
+    if "numba" not in sys.modules:
+        os.environ.setdefault(NUMBA_THREADS_VAR, num_cores)
+
+
+def limit_worker_threads(num_threads: int) -> None:
+    """
+    Limits the Polars and Numba pools of a freshly started worker process to `num_threads`.
+    Used as a process pool initializer, before the worker imports either library.
+    """
+    os.environ[POLARS_THREADS_VAR] = str(num_threads)
+    os.environ[NUMBA_THREADS_VAR] = str(num_threads)
+
+
+def register_joblib_backend() -> str:
+    """
+    Registers the `aquarium_loky` joblib backend, the loky backend sizing the Polars and
+    Numba pools of its workers to their share of the active core budget.
+
+    Returns:
+        str: The backend name, to pass to `joblib.Parallel`.
+    """
+    import joblib
+    from joblib._parallel_backends import LokyBackend
+
+    class AquariumLokyBackend(LokyBackend):
+        def _prepare_worker_env(self, n_jobs):
+            env = super()._prepare_worker_env(n_jobs)
+            num_threads = str(get_runtime_config().threads_per_worker(n_jobs))
+            env[NUMBA_THREADS_VAR] = num_threads
+            env[POLARS_THREADS_VAR] = num_threads
+            return env
+
+    joblib.register_parallel_backend(JOBLIB_BACKEND, AquariumLokyBackend)
+    return JOBLIB_BACKEND
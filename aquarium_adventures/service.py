@@ -0,0 +1,483 @@
+import argparse
+import io
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import polars as pl
+from aquarium_adventures.cache import file_fingerprint
+from aquarium_adventures.computations import AquariumHPCComputations
+from aquarium_adventures.main import read_tank_info
+from aquarium_adventures.pipeline import AquariumPipeline
+from aquarium_adventures.runtime import RuntimeConfig
+from aquarium_adventures.storage import read_table, write_table
+from aquarium_adventures.transformations import AquariumTransformer
+
+DEFAULT_SOCKET_PATH = "/tmp/aquarium.sock"
+
+# Each message is a JSON header and an optional binary payload (an Arrow IPC stream),
+# preceded by their lengths.
+_FRAME = struct.Struct(">II")
+
+
+class ServiceError(RuntimeError):
+    """
+    A job the service rejected or failed to run. `status` is "busy" when its queue was full.
+    """
+
+    def __init__(self, message, status="error"):
+        super().__init__(message)
+        self.status = status
+
+
+def send_message(sock, header: dict, payload: bytes = b"") -> None:
+    """
+    Sends a JSON header and a binary payload over a connected socket.
+
+    Args:
+        sock (socket.socket): The socket.
+        header (dict): JSON-serializable message header.
+        payload (bytes): Raw payload, e.g. an Arrow IPC stream.
+    """
+    header_bytes = json.dumps(header).encode()
+    sock.sendall(_FRAME.pack(len(header_bytes), len(payload)) + header_bytes)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock):
+    """
+    Receives a message sent by `send_message`.
+
+    Args:
+        sock (socket.socket): The socket.
+    Returns:
+        tuple[dict, bytes]: The header and the payload, or (None, b"") if the peer closed the socket.
+    """
+    frame = _recv_exactly(sock, _FRAME.size)
+    if frame is None:
+        return None, b""
+    header_size, payload_size = _FRAME.unpack(frame)
+    header = json.loads(_recv_exactly(sock, header_size) or b"null")
+    payload = _recv_exactly(sock, payload_size) if payload_size else b""
+    if header is None or payload is None:
+        raise ConnectionError("Connection closed in the middle of a message")
+    return header, payload
+
+
+def _recv_exactly(sock, size):
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = sock.recv(min(size - len(chunks), 1 << 20))
+        if not chunk:
+            return None
+        chunks += chunk
+    return bytes(chunks)
+
+
+def frame_to_ipc(df: pl.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.write_ipc(buffer, compression="uncompressed")
+    return buffer.getvalue()
+
+
+def frame_from_ipc(payload: bytes) -> pl.DataFrame:
+    return pl.read_ipc(io.BytesIO(payload))
+
+
+class AquariumService:
+    """
+    Long-running pipeline service answering jobs over a Unix socket.
+
+    The interpreter, the compiled kernels, the analyzers and the tank info tables stay loaded
+    between jobs, so a job only pays for reading its input and running the pipeline. Jobs run
+    on a pool of `max_workers` threads; up to `max_pending` more wait for a worker, and further
+    jobs are answered "busy" right away instead of piling up.
+    """
+
+    def __init__(
+        self,
+        socket_path=DEFAULT_SOCKET_PATH,
+        tank_info=None,
+        max_workers=2,
+        max_pending=8,
+        runtime=None,
+        warm=True,
+    ):
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be at least 1, got {max_workers}")
+        if max_pending < 0:
+            raise ValueError(f"max_pending must be at least 0, got {max_pending}")
+        self.socket_path = Path(socket_path)
+        self.tank_info = tank_info
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.runtime = runtime if runtime is not None else RuntimeConfig()
+        self.warm = warm
+        self.jobs_run = 0
+        self.jobs_rejected = 0
+
+        # Jobs run single-process: the lazy transformer needs no joblib workers.
+        self.computations = AquariumHPCComputations()
+        self._transformers = {}
+        self._lock = threading.Lock()
+        self._close_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._executor = None
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """
+        Loads the kernels and the tank info, then serves on the socket from a background thread.
+
+        Returns:
+            AquariumService: The running service.
+        """
+        if self.warm:
+            from aquarium_adventures.warmup import warmup
+
+            warmup()
+        if self.tank_info is not None:
+            self.transformer(self.tank_info)
+
+        if self.socket_path.exists():
+            if _is_listening(self.socket_path):
+                raise ServiceError(f"A service is already listening on {self.socket_path}")
+            self.socket_path.unlink()
+
+        self._closed.clear()
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="aquarium-job")
+        self._server = _UnixServer(str(self.socket_path), _RequestHandler)
+        self._server.service = self
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="aquarium-service", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def wait(self) -> None:
+        """
+        Blocks until the service is closed, e.g. by a "shutdown" request.
+        """
+        # Short waits keep the main thread responsive to KeyboardInterrupt.
+        while self._thread is not None and not self._closed.wait(0.5):
+            pass
+
+    def close(self) -> None:
+        """
+        Stops accepting jobs, waits for the running ones and removes the socket.
+        """
+        with self._close_lock:
+            if self._server is not None:
+                self._server.shutdown()
+                self._server.server_close()
+                self._server = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            self.socket_path.unlink(missing_ok=True)
+            self._closed.set()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def transformer(self, tank_info=None, input_format=None) -> AquariumTransformer:
+        """
+        Returns the transformer of a tank info file, loading it on first use and again when
+        the file changes.
+
+        Args:
+            tank_info (str, optional): Path to the tank info file, or None for no tank info.
+            input_format (str, optional): Format of the file, inferred from its extension if None.
+        Returns:
+            AquariumTransformer: The transformer holding the tank info.
+        """
+        if tank_info is None:
+            path, fingerprint = None, None
+        else:
+            path = str(Path(tank_info).resolve())
+            fingerprint = file_fingerprint(path)
+        with self._lock:
+            loaded_fingerprint, transformer = self._transformers.get(path, (None, None))
+            if transformer is None or loaded_fingerprint != fingerprint:
+                tank_info_df = None if path is None else read_tank_info(path, input_format)
+                transformer = AquariumTransformer(tank_info_df, execution="lazy")
+                self._transformers[path] = (fingerprint, transformer)
+            return transformer
+
+    def handle(self, header: dict, payload: bytes = b""):
+        """
+        Runs one request and returns the response.
+
+        Requests are {"op": "ping"}, {"op": "stats"}, {"op": "shutdown"} or a "run" job:
+        {"op": "run", "input": path, "tank_info": path, "output": path, "return_frame": bool},
+        where an Arrow IPC payload replaces "input" and all but "op" are optional.
+
+        Args:
+            header (dict): The request header.
+            payload (bytes): The request payload.
+        Returns:
+            tuple[dict, bytes]: The response header, with "status" set to "ok" or "error",
+                and payload.
+        """
+        try:
+            op = header.get("op")
+            if op == "ping":
+                return {"status": "ok"}, b""
+            if op == "stats":
+                return {"status": "ok", **self.stats()}, b""
+            if op == "shutdown":
+                threading.Thread(target=self.close, daemon=True).start()
+                return {"status": "ok"}, b""
+            if op == "run":
+                return self.run_job(header, payload)
+            raise ValueError(f"Unknown op {op!r}, expected 'run', 'ping', 'stats' or 'shutdown'")
+        except Exception as error:
+            return {"status": "error", "error": f"{type(error).__name__}: {error}"}, b""
+
+    def run_job(self, header: dict, payload: bytes = b""):
+        """
+        Runs the transformer and the stress computations on the job input.
+
+        Args:
+            header (dict): The job, see `handle`.
+            payload (bytes): The input readings as an Arrow IPC stream, if "input" is not set.
+        Returns:
+            tuple[dict, bytes]: A summary of the output, and the output as an Arrow IPC stream
+                if "return_frame" is set.
+        """
+        start = time.perf_counter()
+        input_format = header.get("input_format")
+        if header.get("input"):
+            sensors_df = read_table(header["input"], input_format)
+        elif payload:
+            sensors_df = frame_from_ipc(payload)
+        else:
+            raise ValueError("A run job needs an 'input' path or an Arrow IPC payload")
+
+        transformer = self.transformer(header.get("tank_info", self.tank_info), input_format)
+        pipeline = AquariumPipeline([transformer, self.computations], runtime=self.runtime)
+        result_df = pipeline.run(sensors_df)
+
+        if header.get("output"):
+            write_table(result_df, header["output"], header.get("output_format"))
+        with self._lock:
+            self.jobs_run += 1
+
+        response = {
+            "status": "ok",
+            "rows": result_df.height,
+            "columns": result_df.columns,
+            "stress_score": result_df["stress_score"][0] if result_df.height else None,
+            "output": header.get("output"),
+            "elapsed_s": time.perf_counter() - start,
+        }
+        return response, frame_to_ipc(result_df) if header.get("return_frame") else b""
+
+    def stats(self) -> dict:
+        return {
+            "jobs_run": self.jobs_run,
+            "jobs_rejected": self.jobs_rejected,
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "tank_info_tables": sum(path is not None for path in self._transformers),
+            "runtime": self.runtime.settings(),
+        }
+
+    def submit(self, header: dict, payload: bytes = b""):
+        """
+        Runs a request on the worker pool, or answers "busy" when the queue is full.
+        Cheap requests are answered directly.
+        """
+        if header.get("op") != "run":
+            return self.handle(header, payload)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.jobs_rejected += 1
+            return {"status": "busy", "error": "The job queue is full, retry later"}, b""
+        try:
+            return self._executor.submit(self.handle, header, payload).result()
+        finally:
+            self._slots.release()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        header, payload = recv_message(self.request)
+        if header is None:
+            return
+        response, response_payload = self.server.service.submit(header, payload)
+        send_message(self.request, response, response_payload)
+
+
+def _is_listening(socket_path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+        except OSError:
+            return False
+    return True
+
+
+class AquariumClient:
+    """
+    Client of an `AquariumService`, one connection per request.
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=None):
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+
+    def request(self, header: dict, payload: bytes = b""):
+        """
+        Sends a request and returns the response, raising `ServiceError` unless it succeeded.
+
+        Args:
+            header (dict): The request header, see `AquariumService.handle`.
+            payload (bytes): The request payload.
+        Returns:
+            tuple[dict, bytes]: The response header and payload.
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            send_message(sock, header, payload)
+            response, response_payload = recv_message(sock)
+        if response is None:
+            raise ServiceError("The service closed the connection without answering")
+        if response["status"] != "ok":
+            raise ServiceError(response.get("error", "Unknown error"), response["status"])
+        return response, response_payload
+
+    def ping(self) -> bool:
+        self.request({"op": "ping"})
+        return True
+
+    def stats(self) -> dict:
+        return self.request({"op": "stats"})[0]
+
+    def shutdown(self) -> None:
+        self.request({"op": "shutdown"})
+
+    def run(
+        self,
+        input=None,
+        df=None,
+        tank_info=None,
+        output=None,
+        input_format=None,
+        output_format=None,
+        return_frame=False,
+    ):
+        """
+        Runs the pipeline on a sensor file, or on a DataFrame sent as an Arrow IPC payload.
+
+        Paths are read and written by the service, so they must be reachable from its host.
+
+        Args:
+            input (str, optional): Path to the sensor data file.
+            df (pl.DataFrame, optional): The sensor data, if `input` is None.
+            tank_info (str, optional): Path to the tank info file. The service default if None.
+            output (str, optional): Path the service writes the output to.
+            input_format (str, optional): Format of the input files, inferred from their extension if None.
+            output_format (str, optional): Format of the output file, inferred from its extension if None.
+            return_frame (bool): Also return the output DataFrame.
+        Returns:
+            dict: A summary of the output, or a (dict, pl.DataFrame) tuple if `return_frame` is True.
+        """
+        if (input is None) == (df is None):
+            raise ValueError("Pass exactly one of input and df")
+        header = {
+            "op": "run",
+            "input": None if input is None else str(Path(input).resolve()),
+            "output": None if output is None else str(Path(output).resolve()),
+            "input_format": input_format,
+            "output_format": output_format,
+            "return_frame": return_frame,
+        }
+        if tank_info is not None:
+            header["tank_info"] = str(Path(tank_info).resolve())
+        payload = frame_to_ipc(df) if df is not None else b""
+
+        response, response_payload = self.request(header, payload)
+        if return_frame:
+            return response, frame_from_ipc(response_payload)
+        return response
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run the aquarium pipeline as a long-running service, or submit jobs to it."
+    )
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix socket path.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Start the service in the foreground.")
+    serve.add_argument("--tank-info", default=None, help="Tank info file loaded at start.")
+    serve.add_argument("--workers", type=int, default=2, help="Jobs run at the same time.")
+    serve.add_argument("--max-pending", type=int, default=8, help="Jobs waiting for a worker.")
+    serve.add_argument("--cores", type=int, default=None, help="Core budget of the jobs.")
+    serve.add_argument("--no-warmup", action="store_true", help="Skip compiling the kernels at start.")
+
+    submit = commands.add_parser("submit", help="Run the pipeline on a sensor file.")
+    submit.add_argument("input", help="Sensor data file.")
+    submit.add_argument("--tank-info", default=None, help="Tank info file.")
+    submit.add_argument("-o", "--output", default=None, help="Output file.")
+
+    commands.add_parser("ping", help="Check that the service is up.")
+    commands.add_parser("stats", help="Print the service counters.")
+    commands.add_parser("shutdown", help="Stop the service.")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        runtime = RuntimeConfig(args.cores) if args.cores else None
+        service = AquariumService(
+            args.socket,
+            tank_info=args.tank_info,
+            max_workers=args.workers,
+            max_pending=args.max_pending,
+            runtime=runtime,
+            warm=not args.no_warmup,
+        )
+        with service:
+            print(f"Serving on {args.socket} (pid {os.getpid()})", flush=True)
+            try:
+                service.wait()
+            except KeyboardInterrupt:
+                pass
+        return
+
+    client = AquariumClient(args.socket)
+    try:
+        if args.command == "submit":
+            print(json.dumps(client.run(args.input, tank_info=args.tank_info, output=args.output), indent=2))
+        elif args.command == "stats":
+            print(json.dumps(client.stats(), indent=2))
+        elif args.command == "ping":
+            client.ping()
+            print("ok")
+        else:
+            client.shutdown()
+    except (ServiceError, OSError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
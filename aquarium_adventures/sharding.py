@@ -0,0 +1,385 @@
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+from aquarium_adventures.base import BaseAquariumAnalyzer
+from aquarium_adventures.computations import _column_as_float
+from aquarium_adventures.runtime import get_runtime_config, limit_worker_threads
+from aquarium_adventures.storage import read_table
+
+STRESS_COLUMNS = ("pH", "temp", "quantity_liters")
+
+
+class StressPartial:
+    """
+    Mergeable partial state of the stress score of one shard of readings.
+
+    A partial holds the number of readings, the pair sum of the stress score over the shard,
+    and for pH and temperature a sorted summary of the shard: its distinct values with their
+    reading count and weight sum. Merging two partials adds their pair sums and the cross-shard
+    pair terms, read from the sorted summaries, so shards are scored independently and combined
+    exactly, in any order.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, num_readings=0, stress_sum=0.0, pH=None, temp=None):
+        self.num_readings = num_readings
+        self.stress_sum = stress_sum
+        self.pH = pH if pH is not None else _SortedSummary.empty()
+        self.temp = temp if temp is not None else _SortedSummary.empty()
+
+    @classmethod
+    def from_arrays(
+        cls, pH_vals: np.array, temp_vals: np.array, quantity_vals: np.array
+    ) -> "StressPartial":
+        """
+        Summarize one shard of readings.
+
+        Args:
+            pH_vals (np.array): Array of pH values.
+            temp_vals (np.array): Array of temperature values.
+            quantity_vals (np.array): Array of water quantities in liters.
+        Returns:
+            StressPartial: The partial state of the shard.
+        """
+        pH_vals = np.asarray(pH_vals, dtype=np.float64)
+        temp_vals = np.asarray(temp_vals, dtype=np.float64)
+        quantity_vals = np.asarray(quantity_vals, dtype=np.float64)
+
+        valid = ~(np.isnan(pH_vals) | np.isnan(temp_vals) | np.isnan(quantity_vals))
+        weights = 500.0 / quantity_vals[valid]
+        pH = _SortedSummary.from_values(pH_vals[valid], weights)
+        temp = _SortedSummary.from_values(temp_vals[valid], weights)
+
+        return cls(
+            num_readings=len(pH_vals),
+            stress_sum=pH.pair_sum() + 2.0 * temp.pair_sum(),
+            pH=pH,
+            temp=temp,
+        )
+
+    @classmethod
+    def from_df(cls, df: pl.DataFrame) -> "StressPartial":
+        """
+        Summarize the readings of a DataFrame with "pH", "temp" and "quantity_liters" columns.
+
+        Args:
+            df (pl.DataFrame): The readings of the shard.
+        Returns:
+            StressPartial: The partial state of the shard.
+        """
+        return cls.from_arrays(*(_column_as_float(df, name) for name in STRESS_COLUMNS))
+
+    @property
+    def stress_score(self) -> float:
+        """
+        The stress score of all readings summarized so far, as `pairwise_stress_function` would compute it.
+        """
+        if self.num_readings == 0:
+            return 0.0
+        return self.stress_sum / (self.num_readings * self.num_readings)
+
+    def merge(self, other: "StressPartial") -> "StressPartial":
+        """
+        Combine the partial states of two disjoint shards.
+
+        Args:
+            other (StressPartial): The partial state of the other shard.
+        Returns:
+            StressPartial: The partial state of both shards.
+        """
+        # Cross pairs are counted in both orders, as in the n² kernel.
+        cross_sum = self.pH.cross_sum(other.pH) + 2.0 * self.temp.cross_sum(other.temp)
+        return StressPartial(
+            num_readings=self.num_readings + other.num_readings,
+            stress_sum=self.stress_sum + other.stress_sum + 2.0 * cross_sum,
+            pH=self.pH.union(other.pH),
+            temp=self.temp.union(other.temp),
+        )
+
+    @classmethod
+    def merge_all(cls, partials) -> "StressPartial":
+        """
+        Combine the partial states of any number of disjoint shards, pairwise in a balanced tree.
+
+        Args:
+            partials (Iterable[StressPartial]): The partial states.
+        Returns:
+            StressPartial: The partial state of all shards.
+        """
+        partials = list(partials)
+        if not partials:
+            return cls()
+        while len(partials) > 1:
+            merged = [a.merge(b) for a, b in zip(partials[::2], partials[1::2])]
+            if len(partials) % 2:
+                merged.append(partials[-1])
+            partials = merged
+        return partials[0]
+
+    def save(self, path) -> None:
+        """
+        Write the partial state to a ".npz" file, e.g. to ship it from a worker node.
+
+        Args:
+            path (str | Path): Destination file.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=self.FORMAT_VERSION,
+                num_readings=self.num_readings,
+                stress_sum=self.stress_sum,
+                **self.pH.to_arrays("pH"),
+                **self.temp.to_arrays("temp"),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path) -> "StressPartial":
+        """
+        Read a partial state written by `save`.
+
+        Args:
+            path (str | Path): The partial state file.
+        Returns:
+            StressPartial: The partial state.
+        """
+        with np.load(path) as state:
+            if int(state["version"]) != cls.FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported partial state version {int(state['version'])} in {path}"
+                )
+            return cls(
+                num_readings=int(state["num_readings"]),
+                stress_sum=float(state["stress_sum"]),
+                pH=_SortedSummary.from_arrays(state, "pH"),
+                temp=_SortedSummary.from_arrays(state, "temp"),
+            )
+
+
+class _SortedSummary:
+    """
+    Sorted distinct values of one column with the count and weight sum of their readings.
+    """
+
+    def __init__(self, values, counts, weights):
+        self.values = values
+        self.counts = counts
+        self.weights = weights
+
+    @classmethod
+    def empty(cls) -> "_SortedSummary":
+        return cls(np.empty(0), np.empty(0), np.empty(0))
+
+    @classmethod
+    def from_values(cls, x_vals, weights) -> "_SortedSummary":
+        values, inverse = np.unique(x_vals, return_inverse=True)
+        return cls(
+            values,
+            np.bincount(inverse, minlength=len(values)).astype(np.float64),
+            np.bincount(inverse, weights=weights, minlength=len(values)),
+        )
+
+    @classmethod
+    def from_arrays(cls, state, prefix) -> "_SortedSummary":
+        return cls(
+            state[f"{prefix}_values"], state[f"{prefix}_counts"], state[f"{prefix}_weights"]
+        )
+
+    def to_arrays(self, prefix) -> dict:
+        return {
+            f"{prefix}_values": self.values,
+            f"{prefix}_counts": self.counts,
+            f"{prefix}_weights": self.weights,
+        }
+
+    def pair_sum(self) -> float:
+        from aquarium_adventures.kernels import weighted_abs_diff_sum_counts
+
+        return weighted_abs_diff_sum_counts(self.values, self.counts, self.weights)
+
+    def cross_sum(self, other: "_SortedSummary") -> float:
+        """
+        Sum of |x_a - x_b| * (w_a + w_b) over every reading a summarized here and b in `other`.
+        """
+        if len(self.values) == 0 or len(other.values) == 0:
+            return 0.0
+
+        # Shifting by a common minimum keeps the prefix sums small and limits cancellation.
+        offset = min(self.values[0], other.values[0])
+        x = self.values - offset
+        x_other = other.values - offset
+        sum_c = np.concatenate(([0.0], np.cumsum(other.counts)))
+        sum_w = np.concatenate(([0.0], np.cumsum(other.weights)))
+        sum_cx = np.concatenate(([0.0], np.cumsum(other.counts * x_other)))
+        sum_wx = np.concatenate(([0.0], np.cumsum(other.weights * x_other)))
+
+        below = np.searchsorted(x_other, x)
+        c_lo, w_lo, cx_lo, wx_lo = sum_c[below], sum_w[below], sum_cx[below], sum_wx[below]
+        c_hi, w_hi = sum_c[-1] - c_lo, sum_w[-1] - w_lo
+        cx_hi, wx_hi = sum_cx[-1] - cx_lo, sum_wx[-1] - wx_lo
+
+        # A value with count c and weight sum w pairs with the readings of `other` as
+        # |x - x_b| * (w * c_b + c * w_b).
+        lo = self.weights * (x * c_lo - cx_lo) + self.counts * (x * w_lo - wx_lo)
+        hi = self.weights * (cx_hi - x * c_hi) + self.counts * (wx_hi - x * w_hi)
+        return float(np.sum(lo + hi))
+
+    def union(self, other: "_SortedSummary") -> "_SortedSummary":
+        values, inverse = np.unique(
+            np.concatenate((self.values, other.values)), return_inverse=True
+        )
+        return _SortedSummary(
+            values,
+            np.bincount(
+                inverse, weights=np.concatenate((self.counts, other.counts)), minlength=len(values)
+            ),
+            np.bincount(
+                inverse, weights=np.concatenate((self.weights, other.weights)), minlength=len(values)
+            ),
+        )
+
+
+def stress_partial_from_shard(shard) -> StressPartial:
+    """
+    Compute the partial state of one shard, the task run by the executors.
+
+    Args:
+        shard (pl.DataFrame | str | Path): The readings, or a file a worker reads them from.
+    Returns:
+        StressPartial: The partial state of the shard.
+    """
+    if isinstance(shard, (str, Path)):
+        shard = read_table(shard).select(STRESS_COLUMNS)
+    return StressPartial.from_df(shard)
+
+
+class ShardExecutor(ABC):
+    """
+    Runs the shard tasks of a sharded stress computation.
+
+    A cluster backend implements `map` by sending each shard, or better its location,
+    to a node running `stress_partial_from_shard` and returning the partials.
+    """
+
+    @abstractmethod
+    def map(self, function, shards) -> list:
+        """
+        Applies a picklable top-level function to every shard.
+
+        Args:
+            function (callable): The task, e.g. `stress_partial_from_shard`.
+            shards (list): The shards.
+        Returns:
+            list: The results, in the order of `shards`.
+        """
+
+    def close(self) -> None:
+        """
+        Releases the executor workers.
+        """
+
+
+class SerialExecutor(ShardExecutor):
+    """
+    Runs the shard tasks one after the other in the current process.
+    """
+
+    def map(self, function, shards):
+        return [function(shard) for shard in shards]
+
+
+class ProcessPoolShardExecutor(ShardExecutor):
+    """
+    Runs the shard tasks in a pool of local worker processes.
+
+    Workers are spawned rather than forked by default, since forking a process that already
+    runs the Polars or Numba thread pools can deadlock. Without `max_workers`, there is one
+    worker per core of the run budget, each limited to its share of the threads.
+    """
+
+    def __init__(self, max_workers=None, start_method="spawn"):
+        self.max_workers = max_workers
+        self.start_method = start_method
+        self._pool = None
+
+    def map(self, function, shards):
+        if self._pool is None:
+            # Workers split the core budget of the run, like the joblib workers do.
+            runtime = get_runtime_config()
+            max_workers = self.max_workers or runtime.num_cores
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=get_context(self.start_method),
+                initializer=limit_worker_threads,
+                initargs=(runtime.threads_per_worker(max_workers),),
+            )
+        return list(self._pool.map(function, shards))
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def split_frame(df: pl.DataFrame, num_shards: int) -> list:
+    """
+    Splits a DataFrame into `num_shards` contiguous shards of nearly equal size.
+
+    Args:
+        df (pl.DataFrame): The readings.
+        num_shards (int): The number of shards.
+    Returns:
+        list[pl.DataFrame]: The shards.
+    """
+    bounds = np.linspace(0, df.height, num_shards + 1).astype(np.int64)
+    return [df.slice(start, end - start) for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+class AquariumShardedComputations(BaseAquariumAnalyzer):
+    def __init__(self, executor=None, num_shards=4):
+        if num_shards < 1:
+            raise ValueError(f"num_shards must be at least 1, got {num_shards}")
+        # The executor does not change the result, so it stays out of the cache fingerprint.
+        self._executor = executor if executor is not None else SerialExecutor()
+        self.num_shards = num_shards
+
+    @property
+    def executor(self) -> ShardExecutor:
+        """
+        The executor running the shard tasks.
+        """
+        return self._executor
+
+    def analyze_data(self, df: pl.DataFrame) -> pl.DataFrame:
+        """
+        Compute the stress score by scoring shards of the data independently and merging them.
+
+        Args:
+            df (pl.DataFrame): The input DataFrame containing columns "pH", "temp", and "quantity_liters".
+        Returns:
+            pl.DataFrame: A DataFrame with an additional column "stress_score", equal to the one
+                of `AquariumHPCComputations`.
+        """
+        shards = split_frame(df.select(STRESS_COLUMNS), self.num_shards)
+        stress_score = self.compute_stress(shards)
+        return df.with_columns(pl.lit(stress_score).alias("stress_score"))
+
+    def compute_stress(self, shards) -> float:
+        """
+        Compute the stress score of the union of disjoint shards.
+
+        Args:
+            shards (list[pl.DataFrame | str | Path]): The shards, as DataFrames or files.
+        Returns:
+            float: The stress score of all readings.
+        """
+        partials = self.executor.map(stress_partial_from_shard, list(shards))
+        return StressPartial.merge_all(partials).stress_score
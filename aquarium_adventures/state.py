@@ -0,0 +1,148 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+
+NULL_COUNT_COLUMNS = ("pH", "temp", "quantity_liters")
+
+
+class TankAggregateState:
+    """
+    Per-tank aggregates of every reading seen so far, which new readings update in place
+    of a pass over the full history.
+
+    The table has one row per tank with its number of readings, the sum and count of its
+    non-null pH values, and the null count of the "pH", "temp" and "quantity_liters" columns.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, table: pl.DataFrame = None):
+        self.table = table if table is not None else self.from_df(pl.DataFrame()).table
+
+    @classmethod
+    def from_df(cls, sensors_df: pl.DataFrame) -> "TankAggregateState":
+        """
+        Aggregates a batch of readings.
+
+        Args:
+            sensors_df (pl.DataFrame): Readings with "tank_id" and "pH" columns, and optionally
+                "temp" and "quantity_liters".
+        Returns:
+            TankAggregateState: The aggregates of the batch.
+        """
+        if "tank_id" not in sensors_df.columns:
+            sensors_df = pl.DataFrame(schema={"tank_id": pl.Int64, "pH": pl.Float64})
+
+        null_counts = [
+            (
+                pl.col(name).null_count()
+                if name in sensors_df.columns
+                else pl.lit(0, dtype=pl.UInt32)
+            )
+            .cast(pl.Int64)
+            .alias(f"{name}_null_count")
+            for name in NULL_COUNT_COLUMNS
+        ]
+        table = (
+            sensors_df.filter(pl.col("tank_id").is_not_null())
+            .group_by("tank_id")
+            .agg(
+                pl.len().cast(pl.Int64).alias("tank_num_readings"),
+                pl.col("pH").cast(pl.Float64).sum().alias("pH_sum"),
+                pl.col("pH").count().cast(pl.Int64).alias("pH_count"),
+                *null_counts,
+            )
+            .sort("tank_id")
+        )
+        return cls(table)
+
+    @property
+    def num_readings(self) -> int:
+        return int(self.table["tank_num_readings"].sum())
+
+    def merge(self, other: "TankAggregateState") -> "TankAggregateState":
+        """
+        Combines the aggregates of two disjoint sets of readings.
+
+        Args:
+            other (TankAggregateState): The aggregates of the other readings.
+        Returns:
+            TankAggregateState: The aggregates of both.
+        """
+        # NaN pH values propagate through the sums, as they do through `mean`.
+        schema = self.table.schema if self.table.height else other.table.schema
+        tables = [self.table.cast(schema), other.table.cast(schema)]
+        table = (
+            pl.concat(tables)
+            .group_by("tank_id")
+            .agg(pl.all().sum())
+            .sort("tank_id")
+        )
+        return TankAggregateState(table)
+
+    def per_tank_columns(self) -> pl.DataFrame:
+        """
+        The per-tank columns of `AquariumTransformer` computed from the aggregates.
+
+        Returns:
+            pl.DataFrame: "tank_id", "tank_num_readings" and "avg_pH_per_tank", one row per tank.
+        """
+        return self.table.select(
+            "tank_id",
+            pl.col("tank_num_readings").cast(pl.UInt32),
+            pl.when(pl.col("pH_count") > 0)
+            .then(pl.col("pH_sum") / pl.col("pH_count"))
+            .alias("avg_pH_per_tank"),
+        )
+
+    def save(self, path) -> None:
+        """
+        Writes the state to a ".npz" file atomically: a crash while writing leaves the
+        previous state file in place.
+
+        Args:
+            path (str | Path): Destination file.
+        """
+        path = Path(path)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                version=self.FORMAT_VERSION,
+                **{name: self.table[name].to_numpy() for name in self.table.columns},
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        # Persist the rename itself.
+        directory = os.open(path.parent, os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    @classmethod
+    def load(cls, path) -> "TankAggregateState":
+        """
+        Reads a state written by `save`, or returns an empty state if the file does not exist.
+
+        Args:
+            path (str | Path): The state file.
+        Returns:
+            TankAggregateState: The state.
+        """
+        if not Path(path).exists():
+            return cls()
+        with np.load(path) as state:
+            if int(state["version"]) != cls.FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported tank aggregate state version {int(state['version'])} in {path}"
+                )
+            empty = cls()
+            table = pl.DataFrame(
+                {name: state[name] for name in empty.table.columns}
+            )
+        return cls(table.cast(empty.table.schema | {"tank_id": table["tank_id"].dtype}))
@@ -0,0 +1,265 @@
+import argparse
+import inspect
+from pathlib import Path
+
+import polars as pl
+
+FORMATS = ("csv", "parquet", "ipc")
+
+FORMAT_BY_EXTENSION = {
+    ".tsv": "csv",
+    ".csv": "csv",
+    ".txt": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "ipc",
+    ".ipc": "ipc",
+    ".feather": "ipc",
+}
+
+EXTENSION_BY_FORMAT = {"csv": ".tsv", "parquet": ".parquet", "ipc": ".arrow"}
+
+CSV_SEPARATOR = "\t"
+
+# Memory-lean dtypes declared at ingest, under half the size of the inferred Int64/Float64/String ones.
+SENSOR_SCHEMA = {
+    "tank_id": pl.Int32,
+    "time": pl.Datetime("ms"),
+    "pH": pl.Float32,
+    "temp": pl.Float32,
+    "quantity_liters": pl.Float32,
+}
+
+TANK_INFO_SCHEMA = {
+    "tank_id": pl.Int32,
+    "capacity_liters": pl.Int32,
+    "fish_species": pl.List(pl.Categorical),
+}
+
+# Older Polars versions memory-map IPC files themselves when asked to.
+_READ_IPC_KWARGS = (
+    {"memory_map": True}
+    if "memory_map" in inspect.signature(pl.read_ipc).parameters
+    else {}
+)
+
+
+def detect_format(path, file_format=None) -> str:
+    """
+    Returns the file format to use for `path`, either the given one or the one matching its extension.
+
+    Args:
+        path (str | Path): The file path.
+        file_format (str, optional): One of "csv", "parquet" or "ipc". Defaults to None.
+    Returns:
+        str: The file format.
+    """
+    if file_format is not None:
+        if file_format not in FORMATS:
+            raise ValueError(
+                f"Unknown file format {file_format!r}, expected one of {FORMATS}"
+            )
+        return file_format
+
+    suffix = Path(path).suffix.lower()
+    if suffix not in FORMAT_BY_EXTENSION:
+        raise ValueError(
+            f"Cannot infer the file format of {path}, pass one of {FORMATS} explicitly"
+        )
+    return FORMAT_BY_EXTENSION[suffix]
+
+
+def read_table(path, file_format=None, schema=None) -> pl.DataFrame:
+    """
+    Reads a tab-separated, Parquet or Arrow IPC file.
+
+    Arrow IPC files are memory-mapped, so numeric columns without nulls reach
+    `to_numpy()` without a copy.
+
+    Args:
+        path (str | Path): The file path.
+        file_format (str, optional): The file format, inferred from the extension if None.
+        schema (dict, optional): Dtypes to read the columns as, e.g. `SENSOR_SCHEMA`, see `apply_schema`.
+            Inferred from the file if None.
+    Returns:
+        pl.DataFrame: The file contents.
+    """
+    file_format = detect_format(path, file_format)
+    if schema is not None:
+        return scan_table(path, file_format, schema).collect()
+    if file_format == "parquet":
+        return pl.read_parquet(path)
+    if file_format == "ipc":
+        return read_ipc_memory_mapped(path)
+    return pl.read_csv(path, separator=CSV_SEPARATOR)
+
+
+def read_ipc_memory_mapped(path) -> pl.DataFrame:
+    """
+    Reads an Arrow IPC file through a memory map, using pyarrow when it is installed.
+
+    Args:
+        path (str | Path): The file path.
+    Returns:
+        pl.DataFrame: The file contents, backed by the memory map.
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return pl.read_ipc(path, **_READ_IPC_KWARGS)
+
+    # The map stays open as long as the DataFrame references its buffers.
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    return pl.from_arrow(table, rechunk=False)
+
+
+def scan_table(path, file_format=None, schema=None) -> pl.LazyFrame:
+    """
+    Lazily scans a tab-separated, Parquet or Arrow IPC file.
+
+    Args:
+        path (str | Path): The file path.
+        file_format (str, optional): The file format, inferred from the extension if None.
+        schema (dict, optional): Dtypes to read the columns as, see `apply_schema`.
+            Inferred from the file if None.
+    Returns:
+        pl.LazyFrame: The file contents.
+    """
+    file_format = detect_format(path, file_format)
+    if file_format == "parquet":
+        lf = pl.scan_parquet(path)
+    elif file_format == "ipc":
+        lf = pl.scan_ipc(path)
+    else:
+        # Numeric columns are parsed straight into their declared dtype.
+        overrides = {
+            name: dtype for name, dtype in (schema or {}).items() if dtype.is_numeric()
+        }
+        lf = pl.scan_csv(path, separator=CSV_SEPARATOR, schema_overrides=overrides)
+
+    if schema is not None:
+        lf = apply_schema(lf, schema)
+    return lf
+
+
+def apply_schema(frame, schema):
+    """
+    Casts the columns of a DataFrame or LazyFrame to the dtypes of `schema`.
+
+    Columns missing from the frame are ignored. String columns are parsed into Datetime
+    columns, and split on commas into List columns.
+
+    Args:
+        frame (pl.DataFrame | pl.LazyFrame): The data to cast.
+        schema (dict): Column names mapped to their dtype, e.g. `SENSOR_SCHEMA`.
+    Returns:
+        pl.DataFrame | pl.LazyFrame: The data with the declared dtypes.
+    """
+    frame_schema = frame.collect_schema()
+    casts = []
+    for name, dtype in schema.items():
+        if name not in frame_schema or frame_schema[name] == dtype:
+            continue
+        column = pl.col(name)
+        if frame_schema[name] == pl.String and dtype == pl.Datetime:
+            column = column.str.to_datetime(time_unit=dtype.time_unit, time_zone=dtype.time_zone)
+        elif frame_schema[name] == pl.String and dtype == pl.List:
+            column = column.str.split(",")
+        casts.append(column.cast(dtype))
+    return frame.with_columns(casts)
+
+
+def write_table(df: pl.DataFrame, path, file_format=None) -> None:
+    """
+    Writes a DataFrame as a tab-separated, Parquet or Arrow IPC file.
+
+    Arrow IPC files are written uncompressed and as a single record batch, so they can be
+    memory-mapped back without copies. List columns, which CSV cannot hold, are written
+    comma separated like the "fish_species" column of the tank info.
+
+    Args:
+        df (pl.DataFrame): The data to write.
+        path (str | Path): The file path.
+        file_format (str, optional): The file format, inferred from the extension if None.
+    """
+    file_format = detect_format(path, file_format)
+    if file_format == "parquet":
+        df.write_parquet(path)
+    elif file_format == "ipc":
+        df.write_ipc(
+            path, compression="uncompressed", record_batch_size=max(df.height, 1)
+        )
+    else:
+        df = df.with_columns(
+            pl.col(name).cast(pl.List(pl.String)).list.join(",")
+            for name, dtype in df.schema.items()
+            if dtype == pl.List
+        )
+        df.write_csv(path, separator=CSV_SEPARATOR)
+
+
+def sink_table(lf: pl.LazyFrame, path, file_format=None) -> None:
+    """
+    Streams a LazyFrame to a tab-separated, Parquet or Arrow IPC file as it is computed.
+
+    Args:
+        lf (pl.LazyFrame): The data to write.
+        path (str | Path): The file path.
+        file_format (str, optional): The file format, inferred from the extension if None.
+    """
+    file_format = detect_format(path, file_format)
+    if file_format == "parquet":
+        lf.sink_parquet(path, engine="streaming")
+    elif file_format == "ipc":
+        lf.sink_ipc(path, compression="uncompressed", engine="streaming")
+    else:
+        lf.sink_csv(path, separator=CSV_SEPARATOR, engine="streaming")
+
+
+def convert(source, destination, file_format=None, source_format=None) -> Path:
+    """
+    Converts a sensor or tank info file to another format without loading it in memory.
+
+    Args:
+        source (str | Path): The file to convert.
+        destination (str | Path): The output file, or a directory to write `<source stem>.<ext>` into.
+        file_format (str, optional): The output format, inferred from `destination` if None.
+        source_format (str, optional): The input format, inferred from `source` if None.
+    Returns:
+        Path: The written file.
+    """
+    destination = Path(destination)
+    if destination.is_dir():
+        destination = destination / (
+            Path(source).stem + EXTENSION_BY_FORMAT[file_format or "parquet"]
+        )
+
+    sink_table(
+        scan_table(source, source_format), destination, file_format
+    )
+    return destination
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert aquarium TSV files to a columnar format once."
+    )
+    parser.add_argument("sources", nargs="+", help="Files to convert.")
+    parser.add_argument(
+        "-o", "--output", required=True, help="Output file, or directory for several sources."
+    )
+    parser.add_argument(
+        "-f", "--format", choices=FORMATS, default=None, help="Output format."
+    )
+    args = parser.parse_args(argv)
+
+    if len(args.sources) > 1 and not Path(args.output).is_dir():
+        parser.error("--output must be an existing directory when converting several files")
+
+    for source in args.sources:
+        destination = convert(source, args.output, args.format)
+        print(f"Converted '{source}' to '{destination}'")
+
+
+if __name__ == "__main__":
+    main()
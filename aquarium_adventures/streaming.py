@@ -0,0 +1,187 @@
+import polars as pl
+
+from aquarium_adventures.partitioned import (
+    PARTITIONED_FORMAT,
+    STAGING_BUCKETS,
+    sink_partitioned,
+)
+from aquarium_adventures.storage import sink_table
+from aquarium_adventures.transformations import AquariumTransformer
+
+
+class AquariumStreamingPipeline:
+    """
+    Runs the transformer and the stress computation on sensor files larger than RAM.
+
+    The input is scanned twice with the Polars streaming engine: a first pass collects the
+    per-tank aggregates and the stress score as mergeable value-count tables, a second pass
+    annotates the readings and writes them to disk as they are produced. Memory is bounded by
+    the streaming chunk size, the number of tanks and the number of distinct pH and temperature
+    values, never by the number of readings.
+    """
+
+    # Rough in-flight cost of a sensor row across the scan, join and sink buffers.
+    BYTES_PER_ROW = 256
+    MIN_CHUNK_ROWS = 1_000
+
+    def __init__(self, tank_info_df_fish_species_split=None, memory_budget_mb=1024):
+        self.tank_info_df_fish_species_split = tank_info_df_fish_species_split
+        self.memory_budget_mb = memory_budget_mb
+        self.transformer = AquariumTransformer(tank_info_df_fish_species_split)
+
+    @property
+    def chunk_rows(self) -> int:
+        """
+        Number of rows per streaming chunk that fits the memory budget.
+        """
+        budget_rows = self.memory_budget_mb * 1024 * 1024 // self.BYTES_PER_ROW
+        return max(self.MIN_CHUNK_ROWS, budget_rows // pl.thread_pool_size())
+
+    @property
+    def buffer_rows(self) -> int:
+        """
+        Number of rows the partitioned writer splits at a time, a quarter of the budget.
+        """
+        budget_rows = self.memory_budget_mb * 1024 * 1024 // self.BYTES_PER_ROW
+        return max(self.chunk_rows, budget_rows // 4)
+
+    def run(self, sensors_lf: pl.LazyFrame, output_csv, output_format=None) -> float:
+        """
+        Streams the sensor data through the pipeline and writes the result to `output_csv`.
+
+        Args:
+            sensors_lf (pl.LazyFrame): The sensor data, usually from `storage.scan_table`.
+            output_csv (str): Path of the output file, or directory of the "partitioned" format.
+            output_format (str, optional): Format of the output file, inferred from its extension if None,
+                or "partitioned" for a Parquet dataset partitioned by tank and day.
+        Returns:
+            float: The stress score of the whole sensor history.
+        """
+        with pl.Config(streaming_chunk_size=self.chunk_rows):
+            per_tank, stress_score = self.collect_aggregates(sensors_lf)
+            out_lf = self.annotate(sensors_lf, per_tank, stress_score)
+            if output_format == PARTITIONED_FORMAT:
+                # The streaming engine stages the rows by tank while computing them, then the
+                # staged buckets are split into partitions and written by parallel writers.
+                # The staging sink buffers a chunk per bucket, hence the smaller chunks.
+                staging_chunk_rows = max(self.MIN_CHUNK_ROWS, self.chunk_rows // STAGING_BUCKETS)
+                with pl.Config(streaming_chunk_size=staging_chunk_rows):
+                    sink_partitioned(out_lf, output_csv, buffer_rows=self.buffer_rows)
+            else:
+                sink_table(out_lf, output_csv, output_format)
+        return stress_score
+
+    def collect_aggregates(self, sensors_lf: pl.LazyFrame):
+        """
+        First pass: per-tank aggregates and the stress score in a single streaming scan.
+
+        Args:
+            sensors_lf (pl.LazyFrame): The sensor data.
+        Returns:
+            tuple[pl.DataFrame, float]: The per-tank table and the stress score.
+        """
+        valid = (
+            sensors_lf.select(
+                pl.col("pH").cast(pl.Float64).fill_nan(None),
+                pl.col("temp").cast(pl.Float64).fill_nan(None),
+                (500.0 / pl.col("quantity_liters").cast(pl.Float64).fill_nan(None)).alias(
+                    "weight"
+                ),
+            )
+        ).drop_nulls()
+
+        per_tank, num_readings, pH_table, temp_table = pl.collect_all(
+            [
+                sensors_lf.group_by("tank_id").agg(
+                    pl.len().alias("tank_num_readings"),
+                    pl.col("pH").mean().alias("avg_pH_per_tank"),
+                ),
+                sensors_lf.select(pl.len()),
+                value_count_table(valid, "pH"),
+                value_count_table(valid, "temp"),
+            ],
+            engine="streaming",
+        )
+
+        stress_score = value_count_stress(pH_table, temp_table, num_readings.item())
+        return per_tank, stress_score
+
+    def annotate(
+        self, sensors_lf: pl.LazyFrame, per_tank: pl.DataFrame, stress_score: float
+    ) -> pl.LazyFrame:
+        """
+        Second pass: the same columns as `AquariumTransformer` followed by `AquariumHPCComputations`.
+
+        Args:
+            sensors_lf (pl.LazyFrame): The sensor data.
+            per_tank (pl.DataFrame): The per-tank aggregates from the first pass.
+            stress_score (float): The stress score from the first pass.
+        Returns:
+            pl.LazyFrame: The annotated readings.
+        """
+        columns = sensors_lf.collect_schema().names()
+        out_lf = sensors_lf.join(per_tank.lazy(), on="tank_id").with_columns(
+            self.transformer.temperature_deviation_expression(columns)
+        )
+
+        if self.tank_info_df_fish_species_split is not None:
+            tank_info_exploded = self.tank_info_df_fish_species_split
+            if tank_info_exploded["fish_species"].dtype == pl.List:
+                tank_info_exploded = tank_info_exploded.explode("fish_species")
+            fish_species_readings = (
+                tank_info_exploded.join(per_tank, on="tank_id")
+                .group_by("fish_species")
+                .agg(
+                    pl.col("tank_num_readings").sum().alias("fish_species_num_readings")
+                )
+            )
+            out_lf = out_lf.join(tank_info_exploded.lazy(), on="tank_id").join(
+                fish_species_readings.lazy(), on="fish_species"
+            )
+
+        return out_lf.with_columns(pl.lit(stress_score).alias("stress_score"))
+
+
+def value_count_table(valid_lf: pl.LazyFrame, column: str) -> pl.LazyFrame:
+    """
+    Mergeable partial state of the stress score for one column: count and weight sum per distinct value.
+
+    Args:
+        valid_lf (pl.LazyFrame): Readings without nulls, with the column and a "weight" column.
+        column (str): The column to summarize.
+    Returns:
+        pl.LazyFrame: A table with the value, "count" and "weight" columns.
+    """
+    return valid_lf.group_by(column).agg(
+        pl.len().cast(pl.Float64).alias("count"), pl.col("weight").sum()
+    )
+
+
+def value_count_stress(
+    pH_table: pl.DataFrame, temp_table: pl.DataFrame, num_readings: int
+) -> float:
+    """
+    Compute the stress score from the value-count tables of pH and temperature.
+
+    Args:
+        pH_table (pl.DataFrame): Value-count table of pH.
+        temp_table (pl.DataFrame): Value-count table of temperature.
+        num_readings (int): Number of readings, including the ones with missing values.
+    Returns:
+        float: The stress score, equal to `pairwise_stress_function` over all readings.
+    """
+    if num_readings == 0:
+        return 0.0
+
+    from aquarium_adventures.kernels import weighted_abs_diff_sum_counts
+
+    stress_sum = weighted_abs_diff_sum_counts(
+        pH_table["pH"].to_numpy(),
+        pH_table["count"].to_numpy(),
+        pH_table["weight"].to_numpy(),
+    ) + 2.0 * weighted_abs_diff_sum_counts(
+        temp_table["temp"].to_numpy(),
+        temp_table["count"].to_numpy(),
+        temp_table["weight"].to_numpy(),
+    )
+    return stress_sum / (num_readings * num_readings)
@@ -1,13 +1,33 @@
 import polars as pl
 from aquarium_adventures.base import BaseAquariumAnalyzer
-import joblib
+from aquarium_adventures.state import TankAggregateState
 
 
 class AquariumTransformer(BaseAquariumAnalyzer):
     STANDARD_TEMPERATURE = 26.0
+    EXECUTION_MODES = ("joblib", "lazy")
+    SPECIES_MODES = ("explode", "compact")
 
-    def __init__(self, tank_info_df_fish_species_split=None):
+    def __init__(
+        self,
+        tank_info_df_fish_species_split=None,
+        execution="joblib",
+        species_mode="explode",
+        state_path=None,
+    ):
+        if execution not in self.EXECUTION_MODES:
+            raise ValueError(
+                f"Unknown execution mode {execution!r}, expected one of {self.EXECUTION_MODES}"
+            )
+        if species_mode not in self.SPECIES_MODES:
+            raise ValueError(
+                f"Unknown species mode {species_mode!r}, expected one of {self.SPECIES_MODES}"
+            )
         self.tank_info_df_fish_species_split = tank_info_df_fish_species_split
+        self.execution = execution
+        self.species_mode = species_mode
+        self.state_path = state_path
+        self._fish_species_table = None
 
     def analyze_data(self, sensors_df: pl.DataFrame) -> pl.DataFrame:
         """
@@ -20,14 +40,148 @@ class AquariumTransformer(BaseAquariumAnalyzer):
 
         """
 
+        self._fish_species_table = None
+        if self.execution == "lazy":
+            sensors_df = self.add_per_tank_columns_lazy(sensors_df)
+        else:
+            sensors_df = self.add_per_tank_columns_joblib(sensors_df)
+
+        if self.tank_info_df_fish_species_split is not None:
+            if self.species_mode == "compact":
+                sensors_df = self.add_fish_species_compact(sensors_df)
+            else:
+                sensors_df = self.add_num_readings_per_fish_species(sensors_df)
+
+        return sensors_df
+
+    def update(self, new_rows: pl.DataFrame) -> pl.DataFrame:
+        """
+        Adds new readings to the per-tank aggregate state and annotates them, without
+        reprocessing the readings seen before.
+
+        The state at `state_path` holds the per-tank counts, pH sums and null counts of every
+        reading passed to `update` so far. The new rows get the same columns as `analyze_data`
+        would give them on the full history, from the merged state; the cost scales with the
+        new rows and the number of tanks. The state file is replaced atomically once the rows
+        are annotated, so a crash leaves either the previous or the new state.
+
+        Args:
+            new_rows (pl.DataFrame): The readings appended since the last update.
+        Returns:
+            pl.DataFrame: The new readings with the calculated columns.
+        """
+        if self.state_path is None:
+            raise AttributeError("state_path is required to update the aggregate state")
+
+        state = TankAggregateState.load(self.state_path).merge(
+            TankAggregateState.from_df(new_rows)
+        )
+        per_tank = state.per_tank_columns().with_columns(
+            pl.col("tank_id").cast(new_rows.schema["tank_id"])
+        )
+        sensors_df = new_rows.join(per_tank, on="tank_id", how="left", maintain_order="left")
+        sensors_df = sensors_df.with_columns(
+            self.temperature_deviation_expression(sensors_df.columns)
+        )
+
+        if self.tank_info_df_fish_species_split is not None:
+            tank_counts = per_tank.select("tank_id", "tank_num_readings")
+            if self.species_mode == "compact":
+                sensors_df = self.add_fish_species_compact(sensors_df, tank_counts)
+            else:
+                sensors_df = self.add_num_readings_per_fish_species(sensors_df, tank_counts)
+
+        state.save(self.state_path)
+        return sensors_df
+
+    @property
+    def fish_species_table(self) -> pl.DataFrame:
+        """
+        The number of readings per fish species computed by the last compact-mode run, or None.
+        """
+        return self._fish_species_table
+
+    def side_outputs(self) -> dict:
+        if self._fish_species_table is None:
+            return {}
+        return {"fish_species_table": self._fish_species_table}
+
+    def restore_side_outputs(self, side_outputs: dict) -> None:
+        self._fish_species_table = side_outputs.get("fish_species_table")
+
+    def add_fish_species_compact(
+        self, sensors_df: pl.DataFrame, tank_counts: pl.DataFrame = None
+    ) -> pl.DataFrame:
+        """
+        Attaches the tank info to the sensor data keeping one row per reading.
+
+        Unlike `add_num_readings_per_fish_species`, the species of a tank stay a single
+        list column of categoricals, and the number of readings per species goes to the
+        separate `fish_species_table` instead of being repeated on every row.
+
+        Args:
+            sensors_df (pl.DataFrame): The input sensor data DataFrame.
+            tank_counts (pl.DataFrame, optional): The "tank_num_readings" of each "tank_id" to sum
+                per species, e.g. from the aggregate state. Taken from `sensors_df` if None.
+        Returns:
+            pl.DataFrame: A DataFrame with the tank info columns and "fish_species" as a categorical list.
+        """
+        if self.tank_info_df_fish_species_split is None:
+            raise AttributeError("tank_info_df_fish_species_split is not available")
+
+        if "fish_species" not in self.tank_info_df_fish_species_split.columns:
+            raise ValueError(
+                "fish_species column not found in tank_info_df_fish_species_split"
+            )
+
+        if "tank_num_readings" not in sensors_df.columns:
+            sensors_df = self.add_num_readings_per_tank(sensors_df)
+
+        tank_info = self.tank_info_df_fish_species_split
+        if tank_info["fish_species"].dtype == pl.List:
+            species = pl.col("fish_species").cast(pl.List(pl.Categorical))
+        else:
+            species = pl.concat_list(pl.col("fish_species").cast(pl.Categorical))
+        tank_info = tank_info.with_columns(species.alias("fish_species"))
+        if tank_counts is None:
+            tank_counts = sensors_df.select(["tank_id", "tank_num_readings"]).unique()
+
+        # Both joins run on the integer tank_id; species are grouped as categoricals.
+        self._fish_species_table = (
+            tank_info.select("tank_id", "fish_species")
+            .explode("fish_species")
+            .join(tank_counts, on="tank_id")
+            .group_by("fish_species")
+            .agg(pl.col("tank_num_readings").sum().alias("fish_species_num_readings"))
+        )
+
+        return sensors_df.join(tank_info, on="tank_id", maintain_order="left")
+
+    def add_per_tank_columns_joblib(self, sensors_df: pl.DataFrame) -> pl.DataFrame:
+        """
+        Runs the per-tank transformations in parallel joblib workers and stacks their new columns.
+
+        Args:
+            sensors_df (pl.DataFrame): The input sensor data DataFrame.
+        Returns:
+            pl.DataFrame: A DataFrame with the per-tank columns added.
+        """
+
+        import joblib
+
+        from aquarium_adventures.runtime import get_runtime_config, register_joblib_backend
+
         transformations = [
             self.add_num_readings_per_tank,
             self.add_avg_ph_per_tank,
             self.add_temperature_deviation,
         ]
 
-        # Apply transformations in parallel
-        results = joblib.Parallel(n_jobs=3)(
+        # Apply transformations in parallel, the workers sharing the core budget of the run
+        results = joblib.Parallel(
+            n_jobs=get_runtime_config().joblib_workers(len(transformations)),
+            backend=register_joblib_backend(),
+        )(
             joblib.delayed(transformation)(sensors_df)
             for transformation in transformations
         )
@@ -41,12 +195,58 @@ class AquariumTransformer(BaseAquariumAnalyzer):
         ]
 
         # Combine the results into a single DataFrame
-        sensors_df = pl.concat([sensors_df] + results, how="horizontal")
+        return pl.concat([sensors_df] + results, how="horizontal")
 
-        if self.tank_info_df_fish_species_split is not None:
-            sensors_df = self.add_num_readings_per_fish_species(sensors_df)
+    def add_per_tank_columns_lazy(self, sensors_df: pl.DataFrame) -> pl.DataFrame:
+        """
+        Adds the same columns as `add_per_tank_columns_joblib` in a single lazy query.
 
-        return sensors_df
+        The per-tank aggregates are window expressions over "tank_id", so Polars computes
+        them in one optimized plan without spawning processes, pickling or joining.
+
+        Args:
+            sensors_df (pl.DataFrame | pl.LazyFrame): The input sensor data.
+        Returns:
+            pl.DataFrame: A DataFrame with the per-tank columns added.
+        """
+        sensors_lf = sensors_df.lazy()
+        columns = sensors_lf.collect_schema().names()
+        return sensors_lf.with_columns(self.per_tank_expressions(columns)).collect()
+
+    def per_tank_expressions(self, columns) -> list:
+        """
+        Expressions for the number of readings per tank, the average pH per tank and the temperature deviation.
+
+        Args:
+            columns (list[str]): The columns of the sensor data.
+        Returns:
+            list[pl.Expr]: The expressions, to be used in `with_columns`.
+        """
+        return [
+            pl.len().over("tank_id").alias("tank_num_readings"),
+            pl.col("pH").mean().over("tank_id").alias("avg_pH_per_tank"),
+            self.temperature_deviation_expression(columns),
+        ]
+
+    def temperature_deviation_expression(self, columns) -> pl.Expr:
+        """
+        Expression for the temperature deviation, scaled by the water quantity when it is available.
+
+        Args:
+            columns (list[str]): The columns of the sensor data.
+        Returns:
+            pl.Expr: The temperature deviation expression.
+        """
+        if "quantity_liters" in columns:
+            return (
+                abs(pl.col("temp") - self.STANDARD_TEMPERATURE)
+                * 1000
+                / pl.col("quantity_liters")
+            ).alias("temperature_deviation_scaled")
+
+        return (abs(pl.col("temp") - self.STANDARD_TEMPERATURE)).alias(
+            "temperature_deviation"
+        )
 
     def add_num_readings_per_tank(self, sensors_df: pl.DataFrame) -> pl.DataFrame:
         """
@@ -84,30 +284,20 @@ class AquariumTransformer(BaseAquariumAnalyzer):
             pl.DataFrame: A DataFrame with an additional column for the temperature deviation.
         """
 
-        if "quantity_liters" in sensors_df.columns:
-            return sensors_df.with_columns(
-                (
-                    abs(pl.col("temp") - self.STANDARD_TEMPERATURE)
-                    * 1000
-                    / pl.col("quantity_liters")
-                ).alias("temperature_deviation_scaled")
-            )
-
-        else:
-            return sensors_df.with_columns(
-                (abs(pl.col("temp") - self.STANDARD_TEMPERATURE)).alias(
-                    "temperature_deviation"
-                )
-            )
+        return sensors_df.with_columns(
+            self.temperature_deviation_expression(sensors_df.columns)
+        )
 
     def add_num_readings_per_fish_species(
-        self, sensors_df: pl.DataFrame
+        self, sensors_df: pl.DataFrame, tank_counts: pl.DataFrame = None
     ) -> pl.DataFrame:
         """
         Adds a column with the number of readings per fish species.
 
         Args:
             sensors_df (pl.DataFrame): The input sensor data DataFrame.
+            tank_counts (pl.DataFrame, optional): The "tank_num_readings" of each "tank_id" to sum
+                per species, e.g. from the aggregate state. Taken from `sensors_df` if None.
         Returns:
             pl.DataFrame: A DataFrame with an additional column for the number of readings per fish species.
         """
@@ -131,12 +321,12 @@ class AquariumTransformer(BaseAquariumAnalyzer):
                 "fish_species"
             )
 
+        if tank_counts is None:
+            tank_counts = sensors_df.select(["tank_id", "tank_num_readings"]).unique()
+
         # Create DataFrame with readings per fish species
         fish_species_readings = (
-            tank_info_exploded.join(
-                sensors_df.select(["tank_id", "tank_num_readings"]).unique(),
-                on="tank_id",
-            )
+            tank_info_exploded.join(tank_counts, on="tank_id")
             .group_by("fish_species")
             .agg(pl.col("tank_num_readings").sum().alias("fish_species_num_readings"))
         )
@@ -0,0 +1,219 @@
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from numba import from_dtype, types
+
+from aquarium_adventures import kernels
+
+AOT_MODULE_NAME = "_aot_kernels"
+KERNEL_DTYPES = (np.float32, np.float64)
+
+# Kernels compiled ahead of time; parallel kernels are JIT-only since pycc cannot build them.
+AOT_KERNELS = ("sorted_stress_function", "serial_pairwise_stress_function")
+
+_FIRST_RESULT_SCRIPT = """
+import time
+start = time.perf_counter()
+import polars as pl
+from aquarium_adventures.computations import AquariumHPCComputations
+df = pl.DataFrame({"pH": [7.0, 7.2], "temp": [25.0, 26.0], "quantity_liters": [500.0, 500.0]})
+AquariumHPCComputations(parallel=False).analyze_data(df)
+print(time.perf_counter() - start)
+"""
+
+
+def kernel_signatures(dtype, readonly=False) -> dict:
+    """
+    Returns the explicit Numba signature of every kernel for one input dtype.
+
+    Args:
+        dtype (np.dtype): The dtype of the pH, temperature and quantity arrays.
+        readonly (bool): Signatures for read-only arrays, such as memory-mapped Arrow IPC columns.
+    Returns:
+        dict: Maps each kernel name to its dispatcher, its signature and whether it is parallel.
+    """
+    array = types.Array(from_dtype(np.dtype(dtype)), 1, "C", readonly=readonly)
+    index = types.Array(types.int64, 1, "C")
+    stress_args = (array, array, array)
+    grouped_args = stress_args + (index, index, types.boolean)
+    windowed_args = stress_args + (index, index, index, types.int64)
+    tiled_args = stress_args + (types.int64,)
+
+    return {
+        "pairwise_stress_function": (
+            kernels.pairwise_stress_function,
+            stress_args,
+            True,
+        ),
+        "serial_pairwise_stress_function": (
+            kernels.serial_pairwise_stress_function,
+            stress_args,
+            False,
+        ),
+        "sorted_stress_function": (
+            kernels.sorted_stress_function,
+            stress_args,
+            False,
+        ),
+        "grouped_stress_function": (
+            kernels.grouped_stress_function,
+            grouped_args,
+            True,
+        ),
+        "serial_grouped_stress_function": (
+            kernels.serial_grouped_stress_function,
+            grouped_args,
+            False,
+        ),
+        "tiled_stress_function": (
+            kernels.tiled_stress_function,
+            tiled_args,
+            True,
+        ),
+        "serial_tiled_stress_function": (
+            kernels.serial_tiled_stress_function,
+            tiled_args,
+            False,
+        ),
+        "windowed_stress_function": (
+            kernels.windowed_stress_function,
+            windowed_args,
+            True,
+        ),
+        "serial_windowed_stress_function": (
+            kernels.serial_windowed_stress_function,
+            windowed_args,
+            False,
+        ),
+    }
+
+
+def warmup(dtypes=KERNEL_DTYPES, parallel=(True, False), readonly=(False, True)) -> dict:
+    """
+    Compiles every kernel variant before the first request.
+
+    Kernels are declared with `cache=True`, so once a process has compiled them this
+    only loads the machine code from Numba's on-disk cache.
+
+    Args:
+        dtypes (tuple): Input dtypes to compile for.
+        parallel (tuple): Compile the parallel kernels (True), the serial ones (False), or both.
+        readonly (tuple): Compile for writable arrays (False), read-only arrays (True), or both.
+    Returns:
+        dict: Seconds spent on each "<kernel>[<dtype>]" variant.
+    """
+    timings = {}
+    for dtype in dtypes:
+        for is_readonly in readonly:
+            signatures = kernel_signatures(dtype, is_readonly)
+            for name, (dispatcher, args, is_parallel) in signatures.items():
+                if is_parallel not in parallel:
+                    continue
+                variant = np.dtype(dtype).name + (", readonly" if is_readonly else "")
+                start = time.perf_counter()
+                dispatcher.compile(args)
+                timings[f"{name}[{variant}]"] = time.perf_counter() - start
+    return timings
+
+
+def build_aot(output_dir=None) -> Path:
+    """
+    Builds the ahead-of-time compiled kernel module, used by `AquariumHPCComputations` when present.
+
+    The module only needs NumPy at runtime, so importing it costs neither Numba nor compilation.
+
+    Args:
+        output_dir (str | Path, optional): Where to write the extension module.
+            Defaults to the package directory, where it is picked up automatically.
+    Returns:
+        Path: The built extension module.
+    """
+    from numba.pycc import CC
+
+    output_dir = Path(output_dir or Path(__file__).parent)
+    cc = CC(AOT_MODULE_NAME)
+    cc.output_dir = str(output_dir)
+    cc.verbose = False
+
+    for dtype in KERNEL_DTYPES:
+        dtype_name = np.dtype(dtype).name
+        signature = "f8({0}[::1], {0}[::1], {0}[::1])".format(
+            "f4" if dtype_name == "float32" else "f8"
+        )
+        for name in AOT_KERNELS:
+            kernel = getattr(kernels, name)
+            cc.export(f"{name}_{dtype_name}", signature)(kernel.py_func)
+
+    cc.compile()
+    return output_dir / cc.output_file
+
+
+def time_to_first_result(env=None) -> float:
+    """
+    Measures, in a fresh interpreter, the time from process start to the first stress score.
+
+    Args:
+        env (dict, optional): Extra environment variables for the interpreter.
+    Returns:
+        float: Seconds from launching the interpreter to the first result.
+    """
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", _FIRST_RESULT_SCRIPT],
+        check=True,
+        capture_output=True,
+        env={**os.environ, **(env or {})},
+    )
+    return time.perf_counter() - start
+
+
+def measure_cold_start() -> dict:
+    """
+    Reports the time to first result with an empty kernel cache, a warm kernel cache and the AOT module.
+
+    Returns:
+        dict: Seconds to first result for each start mode.
+    """
+    with tempfile.TemporaryDirectory() as cache_dir:
+        jit_env = {"NUMBA_CACHE_DIR": cache_dir, "AQUARIUM_DISABLE_AOT": "1"}
+        report = {
+            "jit_cold_cache_s": time_to_first_result(jit_env),
+            "jit_warm_cache_s": time_to_first_result(jit_env),
+        }
+    if importlib.util.find_spec(f"aquarium_adventures.{AOT_MODULE_NAME}") is not None:
+        report["aot_s"] = time_to_first_result()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Precompile the aquarium stress kernels and measure cold starts."
+    )
+    parser.add_argument(
+        "--build-aot", action="store_true", help="Build the ahead-of-time compiled kernel module."
+    )
+    parser.add_argument(
+        "--measure", action="store_true", help="Report the time to first result of each start mode."
+    )
+    args = parser.parse_args(argv)
+
+    if args.build_aot:
+        print(f"Built {build_aot()}")
+    else:
+        timings = warmup()
+        print(f"Compiled {len(timings)} kernel variants in {sum(timings.values()):.2f}s")
+
+    if args.measure:
+        print(json.dumps(measure_cold_start(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
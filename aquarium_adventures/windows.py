@@ -0,0 +1,123 @@
+import re
+
+import numpy as np
+import polars as pl
+from aquarium_adventures.base import BaseAquariumAnalyzer
+from aquarium_adventures.computations import _column_as_float
+
+
+class AquariumWindowedAnalyzer(BaseAquariumAnalyzer):
+    WINDOWS = ("1h", "6h", "24h")
+    DURATION_UNITS_MS = {
+        "ms": 1,
+        "s": 1_000,
+        "m": 60_000,
+        "h": 3_600_000,
+        "d": 86_400_000,
+        "w": 604_800_000,
+    }
+
+    def __init__(self, windows=WINDOWS, parallel=True):
+        if isinstance(windows, str):
+            windows = [windows]
+        self.windows = list(windows)
+        self.parallel = parallel
+
+        if not self.windows:
+            raise ValueError("At least one window is required")
+        for window in self.windows:
+            self.window_ms(window)
+
+    def analyze_data(self, df: pl.DataFrame) -> pl.DataFrame:
+        """
+        Adds the reading count, average pH and stress score of each tank over sliding time windows.
+
+        For every window (e.g. "1h") and every reading at time t, the metrics cover the readings
+        of the same tank in (t - window, t]. Readings without a time get nulls.
+
+        Args:
+            df (pl.DataFrame): The input DataFrame with "tank_id", "time", "pH", "temp" and
+                "quantity_liters" columns. "time" is parsed if it is a string.
+        Returns:
+            pl.DataFrame: A DataFrame with "tank_num_readings_<window>", "avg_pH_per_tank_<window>"
+                and "stress_score_per_tank_<window>" columns for each window, in the input row order.
+        """
+        times = self.parse_time(df["time"])
+        missing_time = times.is_null()
+
+        # Sort once by (tank_id, time); the kernel sweeps each tank in time order.
+        ordered = (
+            pl.DataFrame({"tank_id": df["tank_id"], "time": times})
+            .with_row_index("__row")
+            .filter(pl.col("time").is_not_null())
+            .sort(["tank_id", "time"])
+        )
+        rows = ordered["__row"].to_numpy().astype(np.int64)
+        tank_starts = np.flatnonzero(ordered["tank_id"].rle_id().diff().fill_null(1).to_numpy())
+        offsets = np.append(tank_starts, len(rows)).astype(np.int64)
+
+        timestamps = times.dt.epoch("ms").fill_null(0).to_numpy().astype(np.int64)
+        pH_vals = _column_as_float(df, "pH")
+        temp_vals = _column_as_float(df, "temp")
+        quantity_vals = _column_as_float(df, "quantity_liters")
+
+        from aquarium_adventures import kernels
+
+        kernel = (
+            kernels.windowed_stress_function
+            if self.parallel
+            else kernels.serial_windowed_stress_function
+        )
+
+        columns = []
+        for window in self.windows:
+            counts, avg_pH, stress = kernel(
+                pH_vals,
+                temp_vals,
+                quantity_vals,
+                timestamps,
+                rows,
+                offsets,
+                self.window_ms(window),
+            )
+            columns += [
+                pl.Series(f"tank_num_readings_{window}", counts).set(missing_time, None),
+                pl.Series(f"avg_pH_per_tank_{window}", avg_pH).fill_nan(None),
+                pl.Series(f"stress_score_per_tank_{window}", stress).fill_nan(None),
+            ]
+
+        return df.with_columns(columns)
+
+    @staticmethod
+    def parse_time(time: pl.Series) -> pl.Series:
+        """
+        Returns the time column as millisecond datetimes, parsing it if it holds strings.
+
+        Args:
+            time (pl.Series): The "time" column.
+        Returns:
+            pl.Series: The parsed times.
+        """
+        if time.dtype == pl.String:
+            return time.str.to_datetime(time_unit="ms")
+        return time.cast(pl.Datetime("ms"))
+
+    @classmethod
+    def window_ms(cls, window: str) -> int:
+        """
+        Converts a window such as "90m", "6h" or "1d12h" to milliseconds.
+
+        Args:
+            window (str): Integers followed by one of the units of `DURATION_UNITS_MS`.
+        Returns:
+            int: The window length in milliseconds.
+        """
+        parts = re.findall(r"(\d+)(ms|s|m|h|d|w)", window)
+        if not parts or "".join(n + unit for n, unit in parts) != window:
+            raise ValueError(
+                f"Invalid window {window!r}, expected e.g. '1h' with units {tuple(cls.DURATION_UNITS_MS)}"
+            )
+        length = sum(int(n) * cls.DURATION_UNITS_MS[unit] for n, unit in parts)
+        if length <= 0:
+            raise ValueError(f"Window {window!r} must be positive")
+        return length
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Checks the import time of the package against its budget with `python -X importtime`.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5]
+
+The budgets below are the cumulative import times allowed for each module, best of
+`--repeat` fresh interpreters. Heavy optional dependencies must not be imported at all:
+they are loaded by the features that need them.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import time budget in milliseconds. Polars alone accounts for ~200 ms.
+IMPORT_BUDGET_MS = {
+    "aquarium_adventures": 50,
+    "aquarium_adventures.main": 500,
+}
+
+LAZY_DEPENDENCIES = ("numba", "wandb", "joblib", "pyarrow")
+
+
+def import_time_ms(module: str) -> float:
+    """
+    Returns the cumulative import time of `module` in a fresh interpreter, in milliseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+    )
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1000
+    raise RuntimeError(f"{module} not found in the -X importtime output")
+
+
+def eagerly_imported(module: str) -> list:
+    """
+    Returns the heavy dependencies that importing `module` pulls in.
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {LAZY_DEPENDENCIES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=REPO_ROOT,
+        env={**os.environ, "PYTHONPATH": str(REPO_ROOT)},
+    )
+    return [name for name in result.stdout.strip().split(",") if name]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module, budget_ms in IMPORT_BUDGET_MS.items():
+        best_ms = min(import_time_ms(module) for _ in range(args.repeat))
+        heavy = eagerly_imported(module)
+        ok = best_ms <= budget_ms and not heavy
+        failed |= not ok
+        status = "OK" if ok else "FAIL"
+        print(f"{status:4} {module}: {best_ms:.1f} ms (budget {budget_ms} ms)", end="")
+        print(f", eagerly imports {', '.join(heavy)}" if heavy else "")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
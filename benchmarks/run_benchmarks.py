@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmarks of the transformer, the stress engines and the end-to-end pipeline.
+
+Usage:
+    python benchmarks/run_benchmarks.py --rows 1000 100000 --tanks 10 100 --threads 1 4 -o results.json
+    python benchmarks/run_benchmarks.py --preset full -o results.json
+    python benchmarks/run_benchmarks.py --compare baseline.json results.json --tolerance 0.15
+
+Every case runs in a fresh interpreter so that its peak memory is its own and the
+thread count can be set through NUMBA_NUM_THREADS and POLARS_MAX_THREADS before
+Numba and Polars start. Results are a JSON list of cases with their wall time,
+throughput and peak RSS; compare mode exits with status 1 when a case of the new
+results is slower, or uses more memory, than the baseline beyond the tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+PRESETS = {
+    "quick": {"rows": [1_000, 10_000, 100_000], "tanks": [10, 100]},
+    "full": {
+        "rows": [1_000, 10_000, 100_000, 1_000_000, 10_000_000],
+        "tanks": [10, 100, 1_000, 10_000],
+    },
+}
+
+# The O(n²) reference kernel is skipped above this size.
+MAX_PAIRWISE_ROWS = 20_000
+
+
+def _sensors(rows, tanks):
+    from data_generator import generate_sensor_data
+
+    return generate_sensor_data(num_tanks=tanks, num_readings=rows, seed=0)
+
+
+def _tank_info(tanks):
+    from data_generator import generate_tank_info, tank_rng
+
+    return generate_tank_info(num_tanks=tanks, rng=tank_rng(0))
+
+
+def _stress_arrays(df):
+    from aquarium_adventures.computations import _column_as_float
+
+    return [_column_as_float(df, name) for name in ("pH", "temp", "quantity_liters")]
+
+
+def bench_transformer_joblib(rows, tanks):
+    from aquarium_adventures.transformations import AquariumTransformer
+
+    df = _sensors(rows, tanks)
+    transformer = AquariumTransformer()
+    return lambda: transformer.analyze_data(df)
+
+
+def bench_transformer_lazy(rows, tanks):
+    from aquarium_adventures.transformations import AquariumTransformer
+
+    df = _sensors(rows, tanks)
+    transformer = AquariumTransformer(execution="lazy")
+    return lambda: transformer.analyze_data(df)
+
+
+def bench_stress_sorted(rows, tanks):
+    from aquarium_adventures.kernels import sorted_stress_function
+
+    arrays = _stress_arrays(_sensors(rows, tanks))
+    return lambda: sorted_stress_function(*arrays)
+
+
+def bench_stress_pairwise(rows, tanks):
+    if rows > MAX_PAIRWISE_ROWS:
+        return None
+    from aquarium_adventures.kernels import pairwise_stress_function
+
+    arrays = _stress_arrays(_sensors(rows, tanks))
+    return lambda: pairwise_stress_function(*arrays)
+
+
+def bench_stress_grouped(rows, tanks):
+    from aquarium_adventures.computations import AquariumHPCComputations
+
+    df = _sensors(rows, tanks)
+    hpc = AquariumHPCComputations(group_by="tank_id")
+    return lambda: hpc.analyze_data(df)
+
+
+def bench_stress_streaming(rows, tanks):
+    from aquarium_adventures.computations import StreamingStressAccumulator
+
+    arrays = _stress_arrays(_sensors(rows, tanks))
+    batch = max(rows // 100, 1)
+
+    def run():
+        accumulator = StreamingStressAccumulator()
+        for start in range(0, rows, batch):
+            accumulator.update(*(array[start : start + batch] for array in arrays))
+        return accumulator.stress_score
+
+    return run
+
+
+def bench_stress_value_counts(rows, tanks):
+    from aquarium_adventures.streaming import AquariumStreamingPipeline
+
+    lf = _sensors(rows, tanks).lazy()
+    return lambda: AquariumStreamingPipeline().collect_aggregates(lf)
+
+
+def bench_pipeline(rows, tanks):
+    from aquarium_adventures.main import run_full_pipeline
+    from aquarium_adventures.metrics import AsyncMetricsLogger
+    from aquarium_adventures.storage import write_table
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="aquarium-bench-"))
+    write_table(_sensors(rows, tanks), tmp_dir / "sensors.tsv")
+    write_table(_tank_info(tanks), tmp_dir / "tank_info.tsv")
+
+    def run():
+        metrics_logger = AsyncMetricsLogger([])
+        run_full_pipeline(
+            str(tmp_dir / "sensors.tsv"),
+            str(tmp_dir / "tank_info.tsv"),
+            str(tmp_dir / "output.tsv"),
+            metrics_logger=metrics_logger,
+        )
+        metrics_logger.close()
+
+    return run
+
+
+BENCHMARKS = {
+    "transformer_joblib": bench_transformer_joblib,
+    "transformer_lazy": bench_transformer_lazy,
+    "stress_sorted": bench_stress_sorted,
+    "stress_pairwise": bench_stress_pairwise,
+    "stress_grouped": bench_stress_grouped,
+    "stress_streaming": bench_stress_streaming,
+    "stress_value_counts": bench_stress_value_counts,
+    "pipeline": bench_pipeline,
+}
+
+
+def _peak_rss_mb():
+    scale = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def run_case(name, rows, tanks, repeat):
+    """
+    Runs one benchmark in the current process. The first call warms up JIT compilation and
+    is not timed; the best of `repeat` timed calls is reported.
+    """
+    setup_rss_mb = _peak_rss_mb()
+    func = BENCHMARKS[name](rows, tanks)
+    if func is None:
+        return None
+    func()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    best = min(times)
+    return {
+        "benchmark": name,
+        "rows": rows,
+        "tanks": tanks,
+        "wall_time_s": best,
+        "throughput_rows_s": rows / best if best > 0 else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "setup_rss_mb": setup_rss_mb,
+        "times_s": times,
+    }
+
+
+def run_case_subprocess(name, rows, tanks, threads, repeat):
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(REPO_ROOT),
+        "NUMBA_NUM_THREADS": str(threads),
+        "POLARS_MAX_THREADS": str(threads),
+    }
+    result = subprocess.run(
+        [sys.executable, __file__, "--case", name, str(rows), str(tanks), str(repeat)],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=REPO_ROOT,
+    )
+    if result.returncode != 0:
+        return {
+            "benchmark": name,
+            "rows": rows,
+            "tanks": tanks,
+            "threads": threads,
+            "error": result.stderr.strip().splitlines()[-1:] or ["failed"],
+        }
+    case = json.loads(result.stdout.strip().splitlines()[-1])
+    if case is not None:
+        case["threads"] = threads
+    return case
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=REPO_ROOT
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+def case_key(case):
+    return (case["benchmark"], case["rows"], case["tanks"], case.get("threads"))
+
+
+def compare(baseline, results, tolerance=0.1, memory_tolerance=None):
+    """
+    Flags the cases of `results` that are slower or use more memory than in `baseline`.
+
+    Args:
+        baseline (dict): A saved results document.
+        results (dict): The new results document.
+        tolerance (float): Allowed relative wall time increase.
+        memory_tolerance (float, optional): Allowed relative peak RSS increase, defaults to `tolerance`.
+    Returns:
+        list[dict]: One entry per regression.
+    """
+    memory_tolerance = tolerance if memory_tolerance is None else memory_tolerance
+    baseline_cases = {case_key(case): case for case in baseline["cases"] if "error" not in case}
+    regressions = []
+    for case in results["cases"]:
+        old = baseline_cases.get(case_key(case))
+        if old is None:
+            continue
+        if "error" in case:
+            regressions.append({"case": case_key(case), "metric": "error", "detail": case["error"]})
+            continue
+        for metric, allowed in (("wall_time_s", tolerance), ("peak_rss_mb", memory_tolerance)):
+            if case[metric] > old[metric] * (1 + allowed):
+                regressions.append(
+                    {
+                        "case": case_key(case),
+                        "metric": metric,
+                        "baseline": old[metric],
+                        "value": case[metric],
+                        "ratio": case[metric] / old[metric],
+                    }
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aquarium scaling benchmarks.")
+    parser.add_argument("--preset", choices=PRESETS, default="quick")
+    parser.add_argument("--rows", type=int, nargs="+", help="Dataset sizes, overrides the preset.")
+    parser.add_argument("--tanks", type=int, nargs="+", help="Tank counts, overrides the preset.")
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=[1], help="Thread counts to scale over."
+    )
+    parser.add_argument(
+        "--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS)
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output", help="Where to write the JSON results.")
+    parser.add_argument(
+        "--compare", nargs=2, metavar=("BASELINE", "RESULTS"), help="Compare two result files."
+    )
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    parser.add_argument("--case", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        name, rows, tanks, repeat = args.case
+        print(json.dumps(run_case(name, int(rows), int(tanks), int(repeat))))
+        return 0
+
+    if args.compare:
+        baseline, results = (json.loads(Path(path).read_text()) for path in args.compare)
+        regressions = compare(baseline, results, args.tolerance)
+        for regression in regressions:
+            print(json.dumps(regression))
+        print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1 if regressions else 0
+
+    rows_list = args.rows or PRESETS[args.preset]["rows"]
+    tanks_list = args.tanks or PRESETS[args.preset]["tanks"]
+    cases = []
+    for name in args.benchmarks:
+        for rows in rows_list:
+            for tanks in tanks_list:
+                for threads in args.threads:
+                    case = run_case_subprocess(name, rows, tanks, threads, args.repeat)
+                    if case is None:
+                        continue
+                    cases.append(case)
+                    if "error" in case:
+                        print(f"{name:22} rows={rows:<10} tanks={tanks:<6} threads={threads:<3} ERROR {case['error']}")
+                    else:
+                        print(
+                            f"{name:22} rows={rows:<10} tanks={tanks:<6} threads={threads:<3} "
+                            f"{case['wall_time_s']:9.4f}s {case['throughput_rows_s']:14,.0f} rows/s "
+                            f"{case['peak_rss_mb']:8.1f} MB"
+                        )
+
+    document = {"environment": environment(), "cases": cases}
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
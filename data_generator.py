@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 
-import random
-from datetime import datetime, timedelta
+import argparse
+from datetime import datetime
 from pathlib import Path
 
 import joblib
+import numpy as np
 import polars as pl
 import tqdm
 
+from aquarium_adventures.storage import EXTENSION_BY_FORMAT, FORMATS, write_table
+
 # Some examples of descriptive adjectives
 ADJECTIVES = [
     "Majestic",
@@ -90,119 +93,221 @@ FISH_TYPES = [
 ]
 
 
-def generate_species_list(num_species=500):
+SENSOR_SCHEMA = {
+    "tank_id": pl.Int64,
+    "time": pl.String,
+    "pH": pl.Float64,
+    "temp": pl.Float64,
+    "quantity_liters": pl.Int64,
+}
+
+SPECIES_PER_TANK = 5
+QUANTITY_NULL_RATE = 0.1
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def tank_rng(seed):
+    """
+    Random generator for the species pool and the tank info.
     """
-    Creates a set of 'num_species' fish species, each formed by
-    combining a random adjective with a random fish type,
-    e.g., "MajesticBetta" or "FabulousDiscus".
+    return np.random.default_rng([seed, 0])
 
-    We ensure no duplicates by storing them in a set until we reach
-    the desired quantity, or exhaust combinations (whichever comes first).
+
+def chunk_rng(seed, chunk_index):
+    """
+    Random generator of one sensor chunk. Chunks get independent streams derived from
+    the seed and their index only, so the output does not depend on which worker
+    generates which chunk.
     """
-    all_combos = set()
-    max_attempts = num_species * 5  # safeguard for random loops
+    return np.random.default_rng([seed, 1, chunk_index])
 
-    while len(all_combos) < num_species and max_attempts > 0:
-        adj = random.choice(ADJECTIVES)
-        fish = random.choice(FISH_TYPES)
-        combo = f"{adj}{fish}"
-        all_combos.add(combo)
-        max_attempts -= 1
 
-    # Convert set to a list and return
-    return list(all_combos)
+def generate_species_list(num_species=500, rng=None):
+    """
+    Creates a list of 'num_species' distinct fish species, each formed by
+    combining an adjective with a fish type, e.g., "MajesticBetta" or "FabulousDiscus".
+
+    The species are drawn without replacement from every distinct combination,
+    so at most len(ADJECTIVES) * len(FISH_TYPES) species can be created.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    all_combos = sorted({f"{adj}{fish}" for adj in ADJECTIVES for fish in FISH_TYPES})
+    picked = rng.choice(len(all_combos), size=min(num_species, len(all_combos)), replace=False)
+    return [all_combos[i] for i in picked]
 
 
-def generate_tank_info(num_tanks=20, species_list=None):
+def generate_tank_info(num_tanks=20, species_list=None, rng=None):
     """
     Creates tank_info data with columns:
-      tank_id, fish_species
+      tank_id, fish_species, capacity_liters
     - tank_id in [1..num_tanks]
-    - fish_species randomly chosen from 'species_list'
+    - fish_species: 5 distinct species randomly chosen from 'species_list', comma separated
+    - capacity_liters from 1000 to 1800
+    Returns a DataFrame.
     """
+    rng = rng if rng is not None else np.random.default_rng()
     if species_list is None:
         # Default to 500 generated species
-        species_list = generate_species_list(500)
+        species_list = generate_species_list(500, rng)
 
-    rows = []
-    for tank_id in range(1, num_tanks + 1):
-        fish_species = random.sample(species_list, k=5)
-        capacity = random.randint(1000, 1800)
-        rows.append({"tank_id": tank_id, "fish_species": ",".join(fish_species), "capacity_liters": capacity})
-    return rows
+    # The first 5 columns of a random permutation per tank are 5 distinct species.
+    species = np.array(species_list)
+    picked = np.argsort(rng.random((num_tanks, len(species_list))), axis=1)[:, :SPECIES_PER_TANK]
+
+    return pl.DataFrame(
+        {
+            "tank_id": np.arange(1, num_tanks + 1),
+            "fish_species": [",".join(row) for row in species[picked]],
+            "capacity_liters": rng.integers(1000, 1800, size=num_tanks, endpoint=True),
+        }
+    )
 
 
-def generate_sensor_data(num_tanks=5, num_readings=20, start_date="2025-01-01"):
+def generate_sensor_chunk(chunk_index, chunk_size, num_tanks=5, start_date="2025-01-01", seed=0):
     """
-    Creates sensor readings with columns:
-      tank_id, time, pH, temp, capacity_liters
+    Creates one chunk of sensor readings with columns:
+      tank_id, time, pH, temp, quantity_liters
 
     - Randomly picks from 1..num_tanks for tank_id.
-    - Time is spread around a given start date with random offsets.
-    - pH is in a range of ~6.5 to 8.0
-    - Temp is in a range of ~22 to 28
-    - capacity_liters is from 200 to 1000
-    Returns a list of dict rows.
-    """
-    base_date = datetime.strptime(start_date, "%Y-%m-%d")
-
-    def generate_sensor_row():
-        tank_id = random.randint(1, num_tanks)
-        # Generate a random offset (in hours or days) from base_date
-        offset_days = random.randint(0, 10)  # up to 10 days after
-        offset_hours = random.randint(0, 23)
-        timestamp = base_date + timedelta(days=offset_days, hours=offset_hours)
-
-        pH = round(random.uniform(6.5, 8.0), 2)
-        temp = round(random.uniform(22.0, 28.0), 2)
-        quantity = random.randint(200, 1000)
-        quantity_none = random.randint(1, 10) == 2
-        if quantity_none:
-            quantity = None
-
-        return {
-            "tank_id": tank_id,
-            "time": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
-            "pH": pH,
-            "temp": temp,
-            "quantity_liters": quantity,
-        }
+    - Time is the start date plus 0 to 10 days and 0 to 23 hours.
+    - pH is in a range of ~6.5 to 8.0, rounded to 2 decimals
+    - Temp is in a range of ~22 to 28, rounded to 2 decimals
+    - quantity_liters is from 200 to 1000, missing for ~10% of the readings
+    Returns a DataFrame.
+    """
+    rng = chunk_rng(seed, chunk_index)
+    base_date = np.datetime64(datetime.strptime(start_date, "%Y-%m-%d"), "ms")
 
-    rows = joblib.Parallel(n_jobs=-1)(
-        joblib.delayed(generate_sensor_row)() for _ in tqdm.tqdm(range(num_readings), desc="Generating sensor data")
+    offset_days = rng.integers(0, 10, size=chunk_size, endpoint=True)
+    offset_hours = rng.integers(0, 23, size=chunk_size, endpoint=True)
+    timestamps = (
+        base_date
+        + offset_days.astype("timedelta64[D]")
+        + offset_hours.astype("timedelta64[h]")
     )
 
-    return rows
+    quantity = rng.integers(200, 1000, size=chunk_size, endpoint=True)
+    quantity_none = rng.random(chunk_size) < QUANTITY_NULL_RATE
 
+    return pl.DataFrame(
+        {
+            "tank_id": rng.integers(1, num_tanks, size=chunk_size, endpoint=True),
+            "time": pl.Series(timestamps).dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "pH": rng.uniform(6.5, 8.0, size=chunk_size).round(2),
+            "temp": rng.uniform(22.0, 28.0, size=chunk_size).round(2),
+            "quantity_liters": pl.Series(quantity).set(pl.Series(quantity_none), None),
+        },
+        schema=SENSOR_SCHEMA,
+    )
 
-def main():
-    # For reproducibility, you can fix the random seed:
-    # random.seed(42)
 
-    NUM_TANKS = 100
-    NUM_READINGS = 100_000
+def iter_sensor_chunks(
+    num_tanks=5,
+    num_readings=20,
+    start_date="2025-01-01",
+    seed=0,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    n_jobs=1,
+):
+    """
+    Yields the sensor readings as DataFrame chunks of at most 'chunk_size' rows, in order.
 
-    # Create a big list of random fish species names
-    species_pool = generate_species_list(num_species=500)
+    Chunks are generated by 'n_jobs' joblib workers; the output only depends on the
+    seed and the chunk size, not on the number of workers.
+    """
+    chunk_sizes = [
+        min(chunk_size, num_readings - start) for start in range(0, num_readings, chunk_size)
+    ]
+    chunks = joblib.Parallel(n_jobs=n_jobs, return_as="generator")(
+        joblib.delayed(generate_sensor_chunk)(i, size, num_tanks, start_date, seed)
+        for i, size in enumerate(chunk_sizes)
+    )
+    yield from tqdm.tqdm(chunks, total=len(chunk_sizes), desc="Generating sensor data")
 
-    # Create 'tank_info.tsv'
-    tank_info = generate_tank_info(num_tanks=NUM_TANKS, species_list=species_pool)
-    sensors = generate_sensor_data(num_tanks=NUM_TANKS, num_readings=NUM_READINGS, start_date="2025-01-01")
 
-    output_path = Path("data")
-    output_path.mkdir(exist_ok=True)
+def generate_sensor_data(num_tanks=5, num_readings=20, start_date="2025-01-01", seed=0, chunk_size=DEFAULT_CHUNK_SIZE, n_jobs=1):
+    """
+    Creates all sensor readings in memory, see `iter_sensor_chunks`.
+    Returns a DataFrame.
+    """
+    chunks = list(iter_sensor_chunks(num_tanks, num_readings, start_date, seed, chunk_size, n_jobs))
+    if not chunks:
+        return pl.DataFrame(schema=SENSOR_SCHEMA)
+    return pl.concat(chunks)
+
+
+def write_chunks(chunks, path, file_format):
+    """
+    Streams DataFrame chunks to a TSV, Parquet or Arrow IPC file, one chunk in memory at a time.
+    Returns the number of rows written.
+    """
+    num_rows = 0
+    if file_format == "csv":
+        with open(path, "wb") as f:
+            for i, chunk in enumerate(chunks):
+                chunk.write_csv(f, separator="\t", include_header=i == 0)
+                num_rows += chunk.height
+        if num_rows == 0:
+            pl.DataFrame(schema=SENSOR_SCHEMA).write_csv(path, separator="\t")
+        return num_rows
+
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
 
-    # Write tank_info.tsv
-    pl.DataFrame(tank_info, schema=["tank_id", "fish_species", "capacity_liters"]).write_csv(
-        output_path / "full_tank_info.tsv", separator="\t"
+    schema = pl.DataFrame(schema=SENSOR_SCHEMA).to_arrow().schema
+    if file_format == "parquet":
+        writer = pa.parquet.ParquetWriter(path, schema)
+    else:
+        writer = pa.ipc.new_file(str(path), schema)
+
+    with writer:
+        for chunk in chunks:
+            writer.write_table(chunk.to_arrow())
+            num_rows += chunk.height
+    return num_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate example aquarium data.")
+    parser.add_argument(
+        "--format", choices=FORMATS, default="csv", help="Output file format (csv writes TSV)."
+    )
+    parser.add_argument("--num-tanks", type=int, default=100)
+    parser.add_argument("--num-readings", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the random generators.")
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows generated and written at a time."
     )
+    parser.add_argument("--n-jobs", type=int, default=1, help="Number of joblib workers.")
+    parser.add_argument("--output-dir", default="data")
+    args = parser.parse_args()
+    extension = EXTENSION_BY_FORMAT[args.format]
 
-    # Write sensors.tsv
-    pl.DataFrame(sensors, schema=["tank_id", "time", "pH", "temp", "quantity_liters"]).write_csv(
-        output_path / "full_sensors.tsv", separator="\t"
+    output_path = Path(args.output_dir)
+    output_path.mkdir(exist_ok=True)
+
+    # Create a pool of random fish species names and the tank info
+    rng = tank_rng(args.seed)
+    species_pool = generate_species_list(num_species=500, rng=rng)
+    tank_info = generate_tank_info(num_tanks=args.num_tanks, species_list=species_pool, rng=rng)
+    write_table(tank_info, output_path / f"full_tank_info{extension}")
+
+    # Stream the sensor readings to disk chunk by chunk
+    chunks = iter_sensor_chunks(
+        num_tanks=args.num_tanks,
+        num_readings=args.num_readings,
+        start_date="2025-01-01",
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        n_jobs=args.n_jobs,
     )
+    num_rows = write_chunks(chunks, output_path / f"full_sensors{extension}", args.format)
 
-    print(f"Generated 'tank_info.tsv' (with {len(tank_info)} rows) and 'sensors.tsv' (with {len(sensors)} rows).")
+    print(
+        f"Generated 'full_tank_info{extension}' (with {tank_info.height} rows) "
+        f"and 'full_sensors{extension}' (with {num_rows} rows)."
+    )
 
 
 if __name__ == "__main__":
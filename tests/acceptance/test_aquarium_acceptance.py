@@ -1,6 +1,8 @@
 import polars as pl
 import pytest
+from aquarium_adventures.cache import StageCache
 from aquarium_adventures.main import run_full_pipeline
+from aquarium_adventures.partitioned import read_manifest
 from unittest.mock import MagicMock, patch
 
 
@@ -43,3 +45,155 @@ def test_aquarium_pipeline_end_to_end(tmp_path, monkey_joblib, monkey_wandb_run,
 
     parallel_mock.assert_called()
     delayed_mock.assert_called()
+
+
+@pytest.mark.slow
+def test_aquarium_pipeline_streaming(tmp_path, monkey_wandb_run, sensors_df, tank_info_df):
+    sensor_csv = tmp_path / "sensors.csv"
+    sensor_csv.write_text(sensors_df.write_csv(separator="\t"))
+    info_csv = tmp_path / "tank_info.csv"
+    info_csv.write_text(tank_info_df.write_csv(separator="\t"))
+    output_csv = tmp_path / "results.csv"
+
+    result_lf = run_full_pipeline(
+        input_csv=str(sensor_csv),
+        tank_info_csv=str(info_csv),
+        output_csv=str(output_csv),
+        project_name="AcceptanceTest",
+        streaming=True,
+        memory_budget_mb=64,
+    )
+
+    assert any("stress_score" in d for d in monkey_wandb_run.logs), "No stress_score logged to wandb"
+    df_result = pl.read_csv(output_csv, separator="\t")
+    for col in ["avg_pH_per_tank", "stress_score"]:
+        assert col in df_result.columns, f"Missing {col} in final output"
+    assert df_result.shape[0] == 9
+    assert result_lf.collect().shape == df_result.shape
+
+    with pytest.raises(ValueError):
+        run_full_pipeline(input_csv=str(sensor_csv), streaming=True)
+
+
+@pytest.mark.slow
+def test_aquarium_pipeline_columnar(tmp_path, monkey_joblib, monkey_wandb_run, sensors_df, tank_info_df):
+    sensor_file = tmp_path / "sensors.parquet"
+    sensors_df.write_parquet(sensor_file)
+    info_file = tmp_path / "tank_info.parquet"
+    tank_info_df.write_parquet(info_file)
+    output_file = tmp_path / "results.arrow"
+
+    result_df = run_full_pipeline(
+        input_csv=str(sensor_file),
+        tank_info_csv=str(info_file),
+        output_csv=str(output_file),
+        project_name="AcceptanceTest",
+    )
+
+    df_result = pl.read_ipc(output_file)
+    assert df_result.equals(result_df)
+    assert df_result.shape[0] == 9
+
+
+@pytest.mark.slow
+def test_aquarium_pipeline_compact_species(tmp_path, monkey_wandb_run, sensors_df, tank_info_df):
+    sensor_csv = tmp_path / "sensors.csv"
+    sensor_csv.write_text(sensors_df.write_csv(separator="\t"))
+    info_csv = tmp_path / "tank_info.csv"
+    info_csv.write_text(tank_info_df.write_csv(separator="\t"))
+    output_csv = tmp_path / "results.csv"
+    species_csv = tmp_path / "results_fish_species.csv"
+    cache = StageCache(tmp_path / "cache")
+
+    result_df = run_full_pipeline(
+        input_csv=str(sensor_csv),
+        tank_info_csv=str(info_csv),
+        output_csv=str(output_csv),
+        project_name="AcceptanceTest",
+        species_mode="compact",
+        cache=cache,
+    )
+    species_df = pl.read_csv(species_csv, separator="\t").sort("fish_species")
+    assert dict(species_df.iter_rows())["VelvetLoach"] == 3
+
+    # A cache hit skips the transformer, whose species table comes back from the cache.
+    species_csv.unlink()
+    run_full_pipeline(
+        input_csv=str(sensor_csv),
+        tank_info_csv=str(info_csv),
+        output_csv=str(output_csv),
+        project_name="AcceptanceTest",
+        species_mode="compact",
+        cache=cache,
+    )
+    assert pl.read_csv(species_csv, separator="\t").sort("fish_species").equals(species_df)
+
+    assert result_df.shape[0] == sensors_df.height
+    assert result_df.schema["fish_species"] == pl.List(pl.Categorical)
+    df_result = pl.read_csv(output_csv, separator="\t")
+    assert df_result["fish_species"].to_list() == tank_info_df.join(
+        sensors_df.select("tank_id"), on="tank_id", how="right"
+    )["fish_species"].to_list()
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"species_mode": "compact"}, {"streaming": True}],
+    ids=["explode", "compact", "streaming"],
+)
+def test_aquarium_pipeline_typed_schema(tmp_path, monkey_wandb_run, sensors_df, tank_info_df, options):
+    sensor_csv = tmp_path / "sensors.csv"
+    sensor_csv.write_text(sensors_df.write_csv(separator="\t"))
+    info_csv = tmp_path / "tank_info.csv"
+    info_csv.write_text(tank_info_df.write_csv(separator="\t"))
+
+    def run(typed_schema):
+        result = run_full_pipeline(
+            input_csv=str(sensor_csv),
+            tank_info_csv=str(info_csv),
+            output_csv=str(tmp_path / f"results_{typed_schema}.csv"),
+            project_name="AcceptanceTest",
+            typed_schema=typed_schema,
+            **options,
+        )
+        return result.lazy().collect()
+
+    inferred_df = run(False)
+    typed_df = run(True)
+
+    assert typed_df.shape == inferred_df.shape
+    assert typed_df.schema["tank_id"] == pl.Int32
+    assert typed_df["stress_score"][0] == pytest.approx(inferred_df["stress_score"][0], rel=1e-6)
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("streaming", [False, True], ids=["in_memory", "streaming"])
+def test_aquarium_pipeline_partitioned_output(tmp_path, monkey_wandb_run, sensors_df, tank_info_df, streaming):
+    sensor_file = tmp_path / "sensors.parquet"
+    sensors_df.write_parquet(sensor_file)
+    info_file = tmp_path / "tank_info.parquet"
+    tank_info_df.write_parquet(info_file)
+
+    def run(output, output_format=None):
+        result = run_full_pipeline(
+            input_csv=str(sensor_file),
+            tank_info_csv=str(info_file),
+            output_csv=str(output),
+            output_format=output_format,
+            project_name="AcceptanceTest",
+            streaming=streaming,
+        )
+        return result.lazy().collect()
+
+    expected_df = run(tmp_path / "results.parquet")
+    partitioned_df = run(tmp_path / "results", output_format="partitioned")
+
+    manifest = read_manifest(tmp_path / "results")
+    assert manifest["num_rows"] == expected_df.height
+    assert {tuple(entry["partition"].values()) for entry in manifest["files"]} == {
+        (1, "2025-01-01"),
+        (2, "2025-01-01"),
+    }
+    sort_keys = ["time", "fish_species"]
+    assert partitioned_df.sort(sort_keys).equals(expected_df.sort(sort_keys))
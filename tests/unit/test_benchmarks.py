@@ -0,0 +1,33 @@
+from benchmarks.run_benchmarks import compare, run_case
+
+
+def test_run_case():
+    case = run_case("stress_sorted", rows=500, tanks=5, repeat=2)
+
+    assert case["benchmark"] == "stress_sorted"
+    assert len(case["times_s"]) == 2
+    assert case["wall_time_s"] == min(case["times_s"])
+    assert case["peak_rss_mb"] > 0
+    assert run_case("stress_pairwise", rows=10**9, tanks=5, repeat=1) is None
+
+
+def test_compare_flags_regressions():
+    def case(name, wall_time_s, peak_rss_mb=100.0):
+        return {"benchmark": name, "rows": 1000, "tanks": 10, "threads": 1, "wall_time_s": wall_time_s, "peak_rss_mb": peak_rss_mb}
+
+    baseline = {"cases": [case("stress_sorted", 1.0), case("transformer_lazy", 1.0), case("pipeline", 1.0)]}
+    results = {
+        "cases": [
+            case("stress_sorted", 1.05),
+            case("transformer_lazy", 1.5),
+            case("pipeline", 0.5, peak_rss_mb=200.0),
+            case("stress_grouped", 9.0),
+        ]
+    }
+
+    regressions = compare(baseline, results, tolerance=0.1)
+    assert [(r["case"][0], r["metric"]) for r in regressions] == [
+        ("transformer_lazy", "wall_time_s"),
+        ("pipeline", "peak_rss_mb"),
+    ]
+    assert regressions[0]["ratio"] == 1.5
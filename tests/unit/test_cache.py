@@ -0,0 +1,181 @@
+import os
+from unittest.mock import Mock
+
+import numba
+import numpy as np
+import polars as pl
+
+from aquarium_adventures.cache import (
+    StageCache,
+    analyzer_fingerprint,
+    dataframe_fingerprint,
+    file_fingerprint,
+)
+from aquarium_adventures.computations import AquariumHPCComputations
+from aquarium_adventures.pipeline import AquariumPipeline
+from aquarium_adventures.transformations import AquariumTransformer
+
+
+def counting(analyzer):
+    analyzer.analyze_data = Mock(wraps=analyzer.analyze_data)
+    return analyzer
+
+
+def test_pipeline_resumes_from_cache(tmp_path, sensors_df, tank_info_df_fish_species_split):
+    cache = StageCache(tmp_path / "cache")
+    transformer = AquariumTransformer(tank_info_df_fish_species_split, execution="lazy")
+    hpc = AquariumHPCComputations()
+    expected = AquariumPipeline([transformer, hpc]).run(sensors_df)
+
+    transformer, hpc = counting(transformer), counting(hpc)
+    pipeline = AquariumPipeline([transformer, hpc], cache=cache)
+    assert pipeline.run(sensors_df).equals(expected)
+    assert [stage.cached for stage in pipeline.last_report.stages] == [False, False]
+
+    out_df = pipeline.run(sensors_df)
+    assert out_df.equals(expected)
+    assert transformer.analyze_data.call_count == 1
+    assert hpc.analyze_data.call_count == 1
+    assert [stage.cached for stage in pipeline.last_report.stages] == [True, True]
+    assert pipeline.last_report.stages[-1].output_rows == expected.height
+
+    # A different configuration only reruns the stages that depend on it.
+    other_hpc = counting(AquariumHPCComputations(engine="pairwise"))
+    AquariumPipeline([transformer, other_hpc], cache=cache).run(sensors_df)
+    assert transformer.analyze_data.call_count == 1
+    assert other_hpc.analyze_data.call_count == 1
+
+    pipeline.run(sensors_df, use_cache=False)
+    assert hpc.analyze_data.call_count == 2
+
+    cache.invalidate()
+    pipeline.run(sensors_df)
+    assert transformer.analyze_data.call_count == 3
+
+
+def test_cache_lru_eviction(tmp_path, sensors_df):
+    cache = StageCache(tmp_path, max_bytes=10**9)
+    for key in ["a", "b", "c"]:
+        cache.put(key, sensors_df)
+    entry_size = cache.path("a").stat().st_size
+
+    for age, key in enumerate(["b", "a", "c"]):
+        os.utime(cache.path(key), ns=(10**9 * age, 10**9 * age))
+    cache.get("b")
+
+    cache.max_bytes = 2 * entry_size
+    cache.put("d", sensors_df)
+
+    assert "d" in cache and "b" in cache
+    assert "a" not in cache and "c" not in cache
+    assert cache.size_bytes() <= cache.max_bytes
+    assert cache.get("a") is None
+
+
+def test_cache_side_outputs(tmp_path, sensors_df):
+    cache = StageCache(tmp_path / "cache")
+    cache.put("a", sensors_df, {"0.table": sensors_df.head(1)})
+    cache.put("b", sensors_df)
+
+    assert cache.get_side_outputs("a")["0.table"].equals(sensors_df.head(1))
+    assert cache.get_side_outputs("b") == {}
+
+    # The entry and its side outputs are evicted together.
+    os.utime(cache.path("a"), ns=(0, 0))
+    cache.max_bytes = cache.path("b").stat().st_size
+    cache.evict(keep="b")
+    assert "a" not in cache and "b" in cache
+    assert cache.get_side_outputs("a") == {}
+
+
+def test_fingerprints(tmp_path, sensors_df):
+    assert dataframe_fingerprint(sensors_df) == dataframe_fingerprint(sensors_df.clone())
+    assert dataframe_fingerprint(sensors_df) != dataframe_fingerprint(sensors_df.head(2))
+
+    assert analyzer_fingerprint(AquariumTransformer()) == analyzer_fingerprint(AquariumTransformer())
+    assert analyzer_fingerprint(AquariumTransformer()) != analyzer_fingerprint(
+        AquariumTransformer(pl.DataFrame({"tank_id": [1], "fish_species": [["Koi"]]}))
+    )
+
+    class WarmTransformer(AquariumTransformer):
+        STANDARD_TEMPERATURE = 28.0
+
+    assert analyzer_fingerprint(WarmTransformer()) != analyzer_fingerprint(AquariumTransformer())
+    assert analyzer_fingerprint(AquariumHPCComputations(group_by=[pl.col("tank_id")])) == analyzer_fingerprint(
+        AquariumHPCComputations(group_by=[pl.col("tank_id")])
+    )
+
+    def squared_pair(pH_i, temp_i, quantity_i, pH_j, temp_j, quantity_j):
+        return (pH_i - pH_j) ** 2
+
+    def cubed_pair(pH_i, temp_i, quantity_i, pH_j, temp_j, quantity_j):
+        return abs(pH_i - pH_j) ** 3
+
+    assert analyzer_fingerprint(
+        AquariumHPCComputations(engine="tiled", pair_function=numba.njit(squared_pair))
+    ) == analyzer_fingerprint(AquariumHPCComputations(engine="tiled", pair_function=numba.njit(squared_pair)))
+    assert analyzer_fingerprint(
+        AquariumHPCComputations(engine="tiled", pair_function=numba.njit(squared_pair))
+    ) != analyzer_fingerprint(AquariumHPCComputations(engine="tiled", pair_function=numba.njit(cubed_pair)))
+
+    path = tmp_path / "sensors.tsv"
+    path.write_text("tank_id\n1\n")
+    content = file_fingerprint(path, content_hash=True)
+    stat = file_fingerprint(path)
+    path.write_text("tank_id\n2\n")
+    assert file_fingerprint(path, content_hash=True) != content
+    os.utime(path, ns=(1, 1))
+    assert file_fingerprint(path) != stat
+
+
+def scaled_pair(pH_i, temp_i, quantity_i, pH_j, temp_j, quantity_j):
+    return PAIR_SCALE * abs(pH_i - pH_j)
+
+
+PAIR_SCALE = 1.0
+
+
+def test_function_fingerprints(monkeypatch):
+    def fingerprint(pair_function):
+        return analyzer_fingerprint(AquariumHPCComputations(engine="tiled", pair_function=pair_function))
+
+    def make_pair(scale):
+        def pair(pH_i, temp_i, quantity_i, pH_j, temp_j, quantity_j):
+            return scale * abs(pH_i - pH_j)
+
+        return numba.njit(pair)
+
+    assert fingerprint(make_pair(1.0)) == fingerprint(make_pair(1.0))
+    assert fingerprint(make_pair(1.0)) != fingerprint(make_pair(100.0))
+
+    def sin_pair(pH_i, temp_i, quantity_i, pH_j, temp_j, quantity_j):
+        return np.sin(pH_i - pH_j)
+
+    def cos_pair(pH_i, temp_i, quantity_i, pH_j, temp_j, quantity_j):
+        return np.cos(pH_i - pH_j)
+
+    assert fingerprint(numba.njit(sin_pair)) != fingerprint(numba.njit(cos_pair))
+
+    before = fingerprint(numba.njit(scaled_pair))
+    monkeypatch.setattr(f"{__name__}.PAIR_SCALE", 2.0)
+    assert fingerprint(numba.njit(scaled_pair)) != before
+
+
+def test_unreliable_fingerprint_skips_cache(tmp_path, sensors_df):
+    class Opaque:
+        pass
+
+    # Only identified by its address, like a closure over such an object.
+    hpc = AquariumHPCComputations()
+    hpc.options = Opaque()
+    assert analyzer_fingerprint(hpc) is None
+
+    transformer = counting(AquariumTransformer())
+    hpc = counting(hpc)
+    cache = StageCache(tmp_path / "cache")
+    pipeline = AquariumPipeline([transformer, hpc], cache=cache)
+    pipeline.run(sensors_df)
+    pipeline.run(sensors_df)
+    assert transformer.analyze_data.call_count == 1
+    assert hpc.analyze_data.call_count == 2
+    assert len(list((tmp_path / "cache").iterdir())) == 1
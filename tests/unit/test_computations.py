@@ -1,11 +1,18 @@
 import math
 
+import numba
+import numpy as np
 import polars as pl
+import pytest
 from numba import _dispatcher
 
 from aquarium_adventures.computations import (
+    AquariumCrossTankComputations,
     AquariumHPCComputations,
+    StreamingStressAccumulator,
+    StressEstimate,
     pairwise_stress_function,
+    sorted_stress_function,
 )
 
 
@@ -41,3 +48,288 @@ def test_hpc_computations_class():
     assert "stress_score" in df_out.columns
     assert df_out["stress_score"][0] == 2.2
     assert df_out["stress_score"][1] == 2.2
+
+
+def test_sorted_stress_small():
+    val = sorted_stress_function(
+        np.array([7.0, 7.2]), np.array([25.0, 26.0]), np.array([500.0, 500.0])
+    )
+    assert math.isclose(val, 2.2, abs_tol=1e-7)
+
+
+def test_sorted_stress_matches_pairwise():
+    rng = np.random.default_rng(0)
+    n = 300
+    pH = rng.uniform(6.5, 8.0, n).round(2)
+    temp = rng.uniform(22.0, 28.0, n).round(2)
+    cap = rng.integers(200, 1000, n).astype(np.float64)
+    pH[::17] = np.nan
+    temp[::23] = np.nan
+    cap[::10] = np.nan
+
+    expected = pairwise_stress_function(pH, temp, cap)
+    assert math.isclose(sorted_stress_function(pH, temp, cap), expected, rel_tol=1e-9)
+
+
+def test_sorted_stress_edge_cases():
+    empty = np.array([], dtype=np.float64)
+    assert sorted_stress_function(empty, empty, empty) == 0.0
+
+    nan = np.array([np.nan, np.nan])
+    assert sorted_stress_function(nan, nan, nan) == 0.0
+
+
+def test_hpc_computations_engines(sensors_df):
+    assert AquariumHPCComputations().engine == "sorted"
+
+    sorted_out = AquariumHPCComputations().analyze_data(sensors_df)
+    pairwise_out = AquariumHPCComputations(engine="pairwise").analyze_data(sensors_df)
+    assert math.isclose(
+        sorted_out["stress_score"][0], pairwise_out["stress_score"][0], rel_tol=1e-12
+    )
+
+    with pytest.raises(ValueError):
+        AquariumHPCComputations(engine="quadratic")
+
+
+def test_grouped_stress_per_tank():
+    df_input = pl.DataFrame(
+        {
+            "tank_id": [2, 1, 2, 1, 3],
+            "pH": [7.5, 7.0, 7.1, 7.2, 6.9],
+            "temp": [24.5, 25.0, 26.5, 26.0, 25.0],
+            "quantity_liters": [1000, 500, 800, 500, None],
+        }
+    )
+
+    hpc = AquariumHPCComputations(group_by="tank_id")
+    df_out = hpc.analyze_data(df_input)
+
+    assert hpc.output_column == "stress_score_per_tank_id"
+    assert df_out["tank_id"].to_list() == df_input["tank_id"].to_list()
+    scores = dict(zip(df_out["tank_id"], df_out["stress_score_per_tank_id"]))
+    assert math.isclose(scores[1], 2.2, abs_tol=1e-7)
+    assert scores[3] == 0.0
+
+    tank_2 = df_input.filter(pl.col("tank_id") == 2)
+    expected = AquariumHPCComputations().analyze_data(tank_2)["stress_score"][0]
+    assert math.isclose(scores[2], expected, rel_tol=1e-12)
+
+
+def test_grouped_stress_engines_agree():
+    rng = np.random.default_rng(1)
+    n = 400
+    df_input = pl.DataFrame(
+        {
+            "tank_id": rng.integers(1, 8, n),
+            "time": [f"2025-01-0{d}" for d in rng.integers(1, 4, n)],
+            "pH": rng.uniform(6.5, 8.0, n),
+            "temp": rng.uniform(22.0, 28.0, n),
+            "quantity_liters": rng.integers(200, 1000, n),
+        }
+    ).with_columns(
+        pl.when(pl.int_range(pl.len()) % 9 == 0)
+        .then(None)
+        .otherwise(pl.col("quantity_liters"))
+        .alias("quantity_liters")
+    )
+    keys = ["tank_id", pl.col("time").alias("day")]
+
+    sorted_out = AquariumHPCComputations(group_by=keys).analyze_data(df_input)
+    pairwise_out = AquariumHPCComputations(
+        engine="pairwise", group_by=keys
+    ).analyze_data(df_input)
+
+    column = "stress_score_per_tank_id_day"
+    np.testing.assert_allclose(
+        sorted_out[column].to_numpy(), pairwise_out[column].to_numpy(), rtol=1e-9
+    )
+
+
+def test_streaming_accumulator_matches_batch(tmp_path):
+    rng = np.random.default_rng(2)
+    n = 500
+    pH = rng.uniform(6.5, 8.0, n).round(2)
+    temp = rng.uniform(22.0, 28.0, n).round(2)
+    cap = rng.integers(200, 1000, n).astype(np.float64)
+    cap[::10] = np.nan
+
+    accumulator = StreamingStressAccumulator()
+    assert accumulator.stress_score == 0.0
+    for start in range(0, 300, 37):
+        stop = min(start + 37, 300)
+        score = accumulator.update(pH[start:stop], temp[start:stop], cap[start:stop])
+        expected = pairwise_stress_function(pH[:stop], temp[:stop], cap[:stop])
+        assert math.isclose(score, expected, rel_tol=1e-9)
+
+    snapshot = tmp_path / "stress.npz"
+    accumulator.snapshot(snapshot)
+    restored = StreamingStressAccumulator.restore(snapshot)
+    assert restored.stress_score == accumulator.stress_score
+
+    df_rest = pl.DataFrame({"pH": pH[300:], "temp": temp[300:], "quantity_liters": cap[300:]})
+    score = restored.update_from_df(df_rest)
+    assert math.isclose(score, pairwise_stress_function(pH, temp, cap), rel_tol=1e-9)
+
+
+@pytest.mark.parametrize("engine", ["sorted", "pairwise"])
+def test_float32_stress_precision(engine):
+    rng = np.random.default_rng(7)
+    n = 2_000
+    quantity = rng.integers(200, 1000, n, endpoint=True).astype(np.float64)
+    quantity[rng.random(n) < 0.1] = np.nan
+    df = pl.DataFrame(
+        {
+            "pH": rng.uniform(6.5, 8.0, n).round(2),
+            "temp": rng.uniform(22.0, 28.0, n).round(2),
+            "quantity_liters": quantity,
+        }
+    ).with_columns(pl.col("quantity_liters").fill_nan(None))
+    df32 = df.cast(pl.Float32)
+
+    computations = AquariumHPCComputations(engine=engine)
+    expected = computations.analyze_data(df)["stress_score"][0]
+    result_df = computations.analyze_data(df32)
+
+    # The kernel reads the Float32 buffers as they are.
+    assert result_df.schema["pH"] == pl.Float32
+    # Float32 inputs carry about 7 significant digits; the pair sums are accumulated in
+    # Float64, so the score stays within 1e-6 relative error (about 1e-8 measured).
+    assert result_df["stress_score"][0] == pytest.approx(expected, rel=1e-6)
+
+
+def test_tiled_engine_matches_pairwise():
+    rng = np.random.default_rng(11)
+    n = 2_500
+    pH_vals = rng.uniform(6.5, 8.0, n)
+    temp_vals = rng.uniform(22.0, 28.0, n)
+    quantity_vals = rng.integers(200, 1000, n, endpoint=True).astype(np.float64)
+    quantity_vals[rng.random(n) < 0.1] = np.nan
+    pH_vals[rng.random(n) < 0.05] = np.nan
+    expected = pairwise_stress_function(pH_vals, temp_vals, quantity_vals)
+
+    for parallel in (True, False):
+        computations = AquariumHPCComputations(engine="tiled", parallel=parallel)
+        # Several full and partial tiles.
+        computations.TILE_SIZE = 512
+        assert math.isclose(
+            computations.compute_stress(pH_vals, temp_vals, quantity_vals), expected, rel_tol=1e-12
+        )
+
+    empty = np.array([])
+    assert AquariumHPCComputations(engine="tiled").compute_stress(empty, empty, empty) == 0.0
+
+
+def test_tiled_engine_custom_pair_function(sensors_df):
+    @numba.njit(error_model="numpy")
+    def squared_pH_penalty(pH_i, temp_i, quantity_i, pH_j, temp_j, quantity_j):
+        return (pH_i - pH_j) ** 2 * (500.0 / quantity_i + 500.0 / quantity_j)
+
+    result_df = AquariumHPCComputations(
+        engine="tiled", pair_function=squared_pH_penalty, parallel=False
+    ).analyze_data(sensors_df)
+
+    # Only the readings 0 and 2 have all values, each pair is counted in both orders.
+    expected = 2 * (7.5 - 7.0) ** 2 * (500 / 500 + 500 / 1000) / 3**2
+    assert result_df["stress_score"][0] == pytest.approx(expected)
+
+    grouped_df = AquariumHPCComputations(engine="tiled", group_by="tank_id").analyze_data(sensors_df)
+    sorted_df = AquariumHPCComputations(group_by="tank_id").analyze_data(sensors_df)
+    assert grouped_df["stress_score_per_tank_id"].to_list() == pytest.approx(
+        sorted_df["stress_score_per_tank_id"].to_list()
+    )
+
+    with pytest.raises(ValueError):
+        AquariumHPCComputations(pair_function=squared_pH_penalty)
+
+
+@pytest.mark.parametrize("dense", [True, False])
+@pytest.mark.parametrize("decimals", [2, 15])
+def test_cross_tank_stress_matrix(dense, decimals):
+    rng = np.random.default_rng(4)
+    n = 600
+    df = pl.DataFrame(
+        {
+            "tank_id": rng.integers(1, 6, n, endpoint=True),
+            "pH": rng.uniform(6.5, 8.0, n).round(decimals),
+            "temp": rng.uniform(22.0, 28.0, n).round(decimals),
+            "quantity_liters": pl.Series(rng.integers(200, 1000, n).astype(float)).set(
+                pl.Series(rng.random(n) < 0.1), None
+            ),
+        }
+    )
+    computations = AquariumCrossTankComputations()
+    if not dense:
+        computations.DENSE_MAX_ENTRIES = 0
+    assert computations.analyze_data(df) is df
+    tank_ids, cells = computations.compute_matrix(df)
+    matrix = computations.square_matrix(cells)
+    assert tank_ids.tolist() == [1, 2, 3, 4, 5, 6]
+    assert computations.stress_matrix.height == 6 * 7 // 2
+    np.testing.assert_array_equal(matrix, matrix.T)
+
+    def raw_stress(tank_df):
+        # Sum of the pair stresses, as pairwise_stress_function divides it by n^2.
+        return pairwise_stress_function(
+            tank_df["pH"].to_numpy(),
+            tank_df["temp"].to_numpy(),
+            tank_df["quantity_liters"].to_numpy(),
+        ) * tank_df.height**2
+
+    tanks = {tank_id: df.filter(pl.col("tank_id") == tank_id) for tank_id in tank_ids}
+    for i, a in enumerate(tank_ids):
+        assert matrix[i, i] == pytest.approx(raw_stress(tanks[a]) / tanks[a].height ** 2)
+        for j in range(i + 1, len(tank_ids)):
+            b = tank_ids[j]
+            union = pl.concat([tanks[a], tanks[b]])
+            cross = (raw_stress(union) - raw_stress(tanks[a]) - raw_stress(tanks[b])) / 2
+            assert matrix[i, j] == pytest.approx(cross / (tanks[a].height * tanks[b].height))
+
+
+def test_approximate_engine_matches_exact():
+    rng = np.random.default_rng(5)
+    n = 200_000
+    pH_vals = rng.uniform(6.5, 8.0, n).round(2)
+    temp_vals = rng.uniform(22.0, 28.0, n).round(2)
+    quantity_vals = rng.integers(200, 1000, n, endpoint=True).astype(np.float64)
+    quantity_vals[rng.random(n) < 0.1] = np.nan
+    exact = sorted_stress_function(pH_vals, temp_vals, quantity_vals)
+
+    computations = AquariumHPCComputations(engine="approximate", target_rel_error=0.02, seed=1)
+    estimate = computations.estimate_stress(pH_vals, temp_vals, quantity_vals)
+    assert isinstance(estimate, StressEstimate)
+    assert not estimate.exact
+    assert estimate.num_samples >= computations.MIN_SAMPLES
+    assert estimate.relative_error <= 0.02
+    assert estimate.ci_low <= exact <= estimate.ci_high
+    assert computations.last_estimate is estimate
+
+    # The same seed draws the same samples.
+    again = AquariumHPCComputations(engine="approximate", target_rel_error=0.02, seed=1)
+    assert again.compute_stress(pH_vals, temp_vals, quantity_vals) == estimate.stress_score
+
+    # A time budget stops sampling once spent.
+    budgeted = AquariumHPCComputations(
+        engine="approximate", target_rel_error=1e-6, time_budget=1e-3
+    ).estimate_stress(pH_vals, temp_vals, quantity_vals)
+    assert 2 <= budgeted.num_samples < n // AquariumHPCComputations.SAMPLE_SIZE
+
+
+def test_approximate_engine_small_data_is_exact(sensors_df):
+    result_df = AquariumHPCComputations(engine="approximate").analyze_data(sensors_df)
+    expected_df = AquariumHPCComputations().analyze_data(sensors_df)
+    assert result_df["stress_score"].to_list() == expected_df["stress_score"].to_list()
+    assert result_df["stress_score_ci_low"].to_list() == expected_df["stress_score"].to_list()
+    assert result_df["stress_score_ci_high"].to_list() == expected_df["stress_score"].to_list()
+
+    grouped_df = AquariumHPCComputations(engine="approximate", group_by="tank_id").analyze_data(
+        sensors_df
+    )
+    assert grouped_df["stress_score_per_tank_id_ci_high"].to_list() == pytest.approx(
+        grouped_df["stress_score_per_tank_id"].to_list()
+    )
+
+    with pytest.raises(ValueError):
+        AquariumHPCComputations(engine="approximate", target_rel_error=0)
+    with pytest.raises(ValueError):
+        AquariumHPCComputations(engine="approximate", confidence=1.5)
@@ -0,0 +1,62 @@
+import polars as pl
+import pytest
+
+from data_generator import (
+    SENSOR_SCHEMA,
+    generate_sensor_data,
+    generate_species_list,
+    generate_tank_info,
+    iter_sensor_chunks,
+    tank_rng,
+    write_chunks,
+)
+
+
+def test_sensor_data_is_reproducible_across_workers():
+    serial = generate_sensor_data(num_tanks=10, num_readings=2_500, seed=7, chunk_size=1_000)
+    parallel = generate_sensor_data(num_tanks=10, num_readings=2_500, seed=7, chunk_size=1_000, n_jobs=2)
+    other_seed = generate_sensor_data(num_tanks=10, num_readings=2_500, seed=8, chunk_size=1_000)
+
+    assert serial.equals(parallel)
+    assert not serial.equals(other_seed)
+
+
+def test_sensor_data_distributions():
+    df = generate_sensor_data(num_tanks=10, num_readings=20_000, seed=1, chunk_size=6_000)
+
+    assert df.schema == pl.Schema(SENSOR_SCHEMA)
+    assert df.height == 20_000
+    assert df["tank_id"].min() == 1 and df["tank_id"].max() == 10
+    assert 6.5 <= df["pH"].min() and df["pH"].max() <= 8.0
+    assert 22.0 <= df["temp"].min() and df["temp"].max() <= 28.0
+    assert 200 <= df["quantity_liters"].min() and df["quantity_liters"].max() <= 1000
+    assert df["quantity_liters"].null_count() / df.height == pytest.approx(0.1, abs=0.01)
+    assert df["time"].min() == "2025-01-01 00:00:00"
+    assert df["time"].max() == "2025-01-11 23:00:00"
+
+
+def test_tank_info():
+    rng = tank_rng(3)
+    species = generate_species_list(50, rng)
+    tank_info = generate_tank_info(num_tanks=20, species_list=species, rng=rng)
+
+    assert len(set(species)) == 50
+    assert tank_info["tank_id"].to_list() == list(range(1, 21))
+    split = tank_info["fish_species"].str.split(",")
+    assert (split.list.len() == 5).all()
+    assert (split.list.n_unique() == 5).all()
+    assert tank_info["capacity_liters"].is_between(1000, 1800).all()
+    rng = tank_rng(3)
+    assert tank_info.equals(generate_tank_info(20, generate_species_list(50, rng), rng))
+
+
+@pytest.mark.parametrize("file_format,read", [("csv", lambda p: pl.read_csv(p, separator="\t")), ("parquet", pl.read_parquet), ("ipc", pl.read_ipc)])
+def test_write_chunks(tmp_path, file_format, read):
+    if file_format != "csv":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"sensors.{file_format}"
+    chunks = iter_sensor_chunks(num_tanks=5, num_readings=1_000, seed=2, chunk_size=300)
+
+    assert write_chunks(chunks, path, file_format) == 1_000
+    expected = generate_sensor_data(num_tanks=5, num_readings=1_000, seed=2, chunk_size=300)
+    assert read(path).equals(expected)
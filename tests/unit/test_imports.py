@@ -0,0 +1,21 @@
+import subprocess
+import sys
+
+
+def test_heavy_dependencies_are_imported_lazily():
+    code = (
+        "import sys, aquarium_adventures.main; "
+        "print(','.join(m for m in ('numba', 'wandb', 'joblib') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "", f"Imported eagerly: {result.stdout.strip()}"
+
+
+def test_kernels_load_on_first_use():
+    from numba import _dispatcher
+
+    from aquarium_adventures import computations, kernels
+
+    assert computations.sorted_stress_function is kernels.sorted_stress_function
+    assert isinstance(computations.pairwise_stress_function, _dispatcher.Dispatcher)
@@ -0,0 +1,108 @@
+import json
+import sqlite3
+import threading
+import time
+
+import polars as pl
+
+from aquarium_adventures.computations import AquariumHPCComputations
+from aquarium_adventures.metrics import (
+    AsyncMetricsLogger,
+    JSONLSink,
+    MetricsSink,
+    SQLiteSink,
+    pipeline_metrics,
+)
+from aquarium_adventures.pipeline import AquariumPipeline
+from aquarium_adventures.transformations import AquariumTransformer
+
+
+class ListSink(MetricsSink):
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def write(self, records):
+        self.batches.append(records)
+
+    def close(self):
+        self.closed = True
+
+
+class BlockingSink(MetricsSink):
+    def __init__(self):
+        self.release = threading.Event()
+
+    def write(self, records):
+        self.release.wait()
+
+
+class FailingSink(MetricsSink):
+    def open(self, run_id):
+        raise ConnectionError("no network")
+
+    def write(self, records):
+        raise AssertionError("never opened")
+
+
+def test_logger_batches_records():
+    sink = ListSink()
+    metrics_logger = AsyncMetricsLogger([sink, FailingSink()], batch_size=4, flush_interval_s=10)
+    for i in range(10):
+        metrics_logger.log({"value": i})
+
+    assert metrics_logger.close(timeout=5)
+    assert sink.closed
+    assert [len(batch) for batch in sink.batches] == [4, 4, 2]
+    assert [record["value"] for batch in sink.batches for record in batch] == list(range(10))
+    assert [record["step"] for batch in sink.batches for record in batch] == list(range(10))
+    assert len(metrics_logger.errors) == 1
+
+
+def test_logger_close_respects_deadline():
+    sink = BlockingSink()
+    metrics_logger = AsyncMetricsLogger([sink], flush_interval_s=0)
+    metrics_logger.log({"value": 1})
+
+    start = time.monotonic()
+    assert not metrics_logger.close(timeout=0.2)
+    assert time.monotonic() - start < 1
+    sink.release.set()
+
+
+def test_local_sinks(tmp_path):
+    jsonl_path = tmp_path / "metrics.jsonl"
+    sqlite_path = tmp_path / "metrics.sqlite"
+    metrics_logger = AsyncMetricsLogger([JSONLSink(jsonl_path), SQLiteSink(sqlite_path)])
+    metrics_logger.log({"stress_score": 2.2, "rows": 3})
+    metrics_logger.log({"stress_score": 2.4})
+    assert metrics_logger.close()
+
+    records = [json.loads(line) for line in jsonl_path.read_text().splitlines()]
+    assert [record["stress_score"] for record in records] == [2.2, 2.4]
+    assert all(record["run_id"] == metrics_logger.run_id for record in records)
+
+    with sqlite3.connect(sqlite_path) as connection:
+        rows = connection.execute("SELECT step, name, value FROM metrics ORDER BY step, name").fetchall()
+    assert rows == [(0, "rows", 3), (0, "stress_score", 2.2), (1, "stress_score", 2.4)]
+
+
+def test_pipeline_logs_metrics(sensors_df):
+    sink = ListSink()
+    metrics_logger = AsyncMetricsLogger([sink])
+    pipeline = AquariumPipeline(
+        [AquariumTransformer(execution="lazy"), AquariumHPCComputations(group_by="tank_id"), AquariumHPCComputations()],
+        metrics_logger=metrics_logger,
+    )
+    pipeline.run(sensors_df)
+    assert metrics_logger.close()
+
+    (record,) = sink.batches[0]
+    assert record["rows"] == 3
+    assert "stress_score" in record
+    assert {"stress_score_per_tank_id/1", "stress_score_per_tank_id/2"} <= record.keys()
+    assert "stage/AquariumTransformer/wall_time_s" in record
+
+
+def test_pipeline_metrics_without_stress():
+    assert pipeline_metrics(pl.DataFrame({"tank_id": [1]})) == {"rows": 1, "columns": 1}
@@ -0,0 +1,98 @@
+import polars as pl
+import pytest
+
+from aquarium_adventures.partitioned import (
+    MANIFEST_NAME,
+    PartitionedParquetWriter,
+    read_manifest,
+    scan_partitioned,
+    write_partitioned,
+)
+
+
+@pytest.fixture()
+def readings_df():
+    yield pl.DataFrame(
+        {
+            "tank_id": [1, 1, 2, 2, 1, None],
+            "time": [
+                "2025-01-01 00:00",
+                "2025-01-02 01:00",
+                "2025-01-01 00:30",
+                "2025-01-01 05:00",
+                "2025-01-01 06:00",
+                "2025-01-03 00:00",
+            ],
+            "pH": [7.0, 7.2, 7.5, 7.1, 6.9, 7.3],
+        }
+    )
+
+
+def test_write_partitioned(tmp_path, readings_df):
+    manifest = write_partitioned(readings_df, tmp_path / "dataset")
+
+    assert manifest == read_manifest(tmp_path / "dataset")
+    assert manifest["num_rows"] == readings_df.height
+    assert manifest["partition_by"] == ["tank_id", "date"]
+    partitions = {tuple(entry["partition"].values()): entry for entry in manifest["files"]}
+    assert sorted(partitions, key=str) == sorted(
+        [(1, "2025-01-01"), (1, "2025-01-02"), (2, "2025-01-01"), (None, "2025-01-03")], key=str
+    )
+
+    entry = partitions[(1, "2025-01-01")]
+    assert entry["path"].startswith("tank_id=1/date=2025-01-01/")
+    assert entry["num_rows"] == 2
+    assert entry["statistics"]["pH"] == {"min": 6.9, "max": 7.0, "null_count": 0}
+    assert pl.read_parquet(tmp_path / "dataset" / entry["path"]).columns == readings_df.columns
+
+    sort_keys = ["time"]
+    assert scan_partitioned(tmp_path / "dataset").collect().sort(sort_keys).equals(
+        readings_df.sort(sort_keys)
+    )
+
+
+def test_scan_partitioned_prunes_files(tmp_path, readings_df):
+    write_partitioned(readings_df, tmp_path / "dataset")
+
+    tank_1 = scan_partitioned(tmp_path / "dataset", tank_ids=[1]).collect()
+    assert sorted(tank_1["time"].to_list()) == ["2025-01-01 00:00", "2025-01-01 06:00", "2025-01-02 01:00"]
+
+    day_2 = scan_partitioned(tmp_path / "dataset", start_date="2025-01-02", end_date="2025-01-02").collect()
+    assert day_2["time"].to_list() == ["2025-01-02 01:00"]
+
+    nothing = scan_partitioned(tmp_path / "dataset", tank_ids=[9]).collect()
+    assert nothing.height == 0
+    assert nothing.columns == readings_df.columns
+
+
+def test_writer_buffers_batches(tmp_path, readings_df):
+    readings_df = readings_df.with_columns(pl.col("time").str.to_datetime())
+    with PartitionedParquetWriter(tmp_path / "dataset", buffer_rows=4, max_pending=1) as writer:
+        for batch in readings_df.iter_slices(2):
+            writer.write(batch)
+
+    manifest = writer.manifest
+    assert manifest["num_rows"] == readings_df.height
+    # Two flushes: the first four rows, then the last two.
+    assert len(manifest["files"]) == 5
+    dataset = scan_partitioned(tmp_path / "dataset").collect()
+    assert dataset.sort("time").equals(readings_df.sort("time"))
+
+    with pytest.raises(FileExistsError):
+        PartitionedParquetWriter(tmp_path / "dataset")
+
+
+def test_writer_failure_leaves_no_manifest(tmp_path, monkeypatch, readings_df):
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(pl.DataFrame, "write_parquet", fail)
+    writer = PartitionedParquetWriter(tmp_path / "dataset")
+    writer.write(readings_df)
+    with pytest.raises(RuntimeError) as error:
+        writer.close()
+
+    assert isinstance(error.value.__cause__, OSError)
+    assert not (tmp_path / "dataset" / MANIFEST_NAME).exists()
+    with pytest.raises(FileNotFoundError):
+        read_manifest(tmp_path / "dataset")
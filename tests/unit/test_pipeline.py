@@ -1,4 +1,7 @@
+import json
+
 import polars as pl
+import pytest
 
 import wandb
 from aquarium_adventures.computations import AquariumHPCComputations
@@ -42,3 +45,41 @@ def test_log_wandb(monkey_wandb_run):
 
     assert wandb.run == monkey_wandb_run, "wandb.init() should be called"
     assert any("stress_score" in d for d in monkey_wandb_run.logs), "No 'stress_score' logs found"
+
+
+def test_n_stage_pipeline_report(sensors_df):
+    class DropTimeAnalyzer:
+        def analyze_data(self, df):
+            return df.drop("time", strict=False)
+
+    pipeline = AquariumPipeline(
+        [AquariumTransformer(execution="lazy"), DropTimeAnalyzer(), AquariumHPCComputations(), DropTimeAnalyzer()]
+    )
+    df_out, report = pipeline.run(sensors_df, return_report=True)
+
+    assert pipeline.last_report is report
+    assert "stress_score" in df_out.columns and "time" not in df_out.columns
+    assert [stage.name for stage in report.stages] == [
+        "AquariumTransformer",
+        "DropTimeAnalyzer[1]",
+        "AquariumHPCComputations",
+        "DropTimeAnalyzer[3]",
+    ]
+
+    transformer_stage, drop_stage = report.stages[0], report.stages[1]
+    assert (transformer_stage.input_rows, transformer_stage.input_columns) == (3, 5)
+    assert (transformer_stage.output_rows, transformer_stage.output_columns) == (3, 8)
+    assert (drop_stage.input_columns, drop_stage.output_columns) == (8, 7)
+    assert all(stage.wall_time_s >= 0 and stage.cpu_time_s >= 0 for stage in report.stages)
+
+    report_dict = json.loads(report.to_json())
+    assert report_dict == report.to_dict()
+    assert len(report_dict["stages"]) == 4
+    assert report_dict["wall_time_s"] == pytest.approx(sum(s["wall_time_s"] for s in report_dict["stages"]))
+    assert {"peak_rss_delta_mb", "output_rows", "output_columns"} <= report_dict["stages"][2].keys()
+
+
+def test_empty_pipeline(sensors_df):
+    pipeline = AquariumPipeline([])
+    assert pipeline.run(sensors_df) is sensors_df
+    assert pipeline.last_report.stages == []
@@ -0,0 +1,153 @@
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import polars as pl
+import pytest
+
+from aquarium_adventures.computations import AquariumHPCComputations
+from aquarium_adventures.partitioned import write_partitioned
+from aquarium_adventures.query import INDEX_NAME, AquariumQueryStore, main
+
+
+@pytest.fixture()
+def readings_df():
+    rng = np.random.default_rng(0)
+    n = 500
+    yield pl.DataFrame(
+        {
+            "tank_id": rng.integers(1, 6, n),
+            "time": pl.datetime_range(
+                datetime(2025, 1, 1), datetime(2025, 1, 1, 8, 19), "1m", eager=True
+            ).shuffle(seed=0),
+            "pH": rng.uniform(6.5, 8.0, n).round(2),
+            "temp": rng.uniform(22.0, 28.0, n).round(2),
+            "quantity_liters": rng.integers(100, 1000, n),
+        }
+    ).with_columns(pl.col("time").cast(pl.Datetime("ms")))
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch, readings_df):
+    # Small blocks, so that queries read several blocks and slices of them.
+    monkeypatch.setattr(AquariumQueryStore, "BLOCK_ROWS", 7)
+    yield AquariumQueryStore.build(readings_df, tmp_path / "store")
+
+
+@pytest.mark.parametrize(
+    "tanks, start, end",
+    [
+        (None, None, None),
+        (3, None, None),
+        ([1, 4], "2025-01-01 02:00", "2025-01-01 03:30"),
+        (None, datetime(2025, 1, 1, 7), None),
+        ([2], "2025-01-01 01:13", "2025-01-01 01:13"),
+        ([9], None, None),
+        (None, "2026-01-01", None),
+    ],
+)
+def test_query_matches_filter(store, readings_df, tanks, start, end):
+    expected = readings_df
+    if tanks is not None:
+        expected = expected.filter(pl.col("tank_id").is_in(np.atleast_1d(tanks).tolist()))
+    if start is not None:
+        expected = expected.filter(pl.col("time") >= _as_datetime(start))
+    if end is not None:
+        expected = expected.filter(pl.col("time") <= _as_datetime(end))
+
+    result = store.query(tanks, start, end)
+    assert result.equals(expected.sort(["tank_id", "time"]))
+
+
+def _as_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def test_query_columns(store):
+    result = store.query([1], columns=["time", "pH"])
+    assert result.columns == ["time", "pH"]
+    assert result["time"].is_sorted()
+    assert store.query([9], columns=["pH"]).columns == ["pH"]
+
+
+def test_summaries(store, readings_df):
+    summaries = store.summaries()
+    assert summaries["tank_id"].to_list() == [1, 2, 3, 4, 5]
+    assert summaries["num_readings"].sum() == readings_df.height
+
+    tank_df = readings_df.filter(pl.col("tank_id") == 2)
+    summary = store.summaries(2).row(0, named=True)
+    assert summary["num_readings"] == tank_df.height
+    assert summary["first_time"] == tank_df["time"].min()
+    assert summary["last_time"] == tank_df["time"].max()
+    assert summary["avg_pH"] == pytest.approx(tank_df["pH"].mean())
+    assert summary["stress_score"] == pytest.approx(
+        AquariumHPCComputations().analyze_data(tank_df)["stress_score"][0]
+    )
+
+
+def test_build_from_files(tmp_path, readings_df):
+    path = tmp_path / "readings.parquet"
+    readings_df.with_columns(pl.col("time").dt.to_string("%Y-%m-%d %H:%M")).write_parquet(path)
+    write_partitioned(readings_df, tmp_path / "partitioned")
+
+    expected = AquariumQueryStore.build(readings_df, tmp_path / "store").query()
+    for source in (path, tmp_path / "partitioned"):
+        store = AquariumQueryStore.build(source, tmp_path / "store")
+        assert store.query().equals(expected)
+    assert not (tmp_path / "store" / "_staging").exists()
+
+
+def test_build_skips_rows_without_tank_or_time(tmp_path, readings_df):
+    nulls_df = readings_df.with_columns(
+        tank_id=pl.when(pl.int_range(pl.len()) % 50 == 1).then(None).otherwise("tank_id"),
+        time=pl.when(pl.int_range(pl.len()) % 50 == 0).then(None).otherwise("time"),
+    )
+    store = AquariumQueryStore.build(nulls_df, tmp_path / "store")
+
+    expected = nulls_df.drop_nulls(["tank_id", "time"]).sort(["tank_id", "time"])
+    assert store.query().equals(expected)
+    assert store.summaries()["num_readings"].sum() == readings_df.height - 20
+
+
+def test_build_refuses_unsafe_targets(tmp_path, readings_df):
+    path = tmp_path / "store" / "readings.parquet"
+    path.parent.mkdir()
+    readings_df.write_parquet(path)
+    with pytest.raises(ValueError):
+        AquariumQueryStore.build(path, tmp_path / "store")
+    with pytest.raises(FileExistsError):
+        AquariumQueryStore.build(readings_df, tmp_path / "store")
+    assert pl.read_parquet(path).equals(readings_df)
+
+
+def test_failed_build_keeps_previous_store(tmp_path, monkeypatch, readings_df):
+    store = AquariumQueryStore.build(readings_df.head(100), tmp_path / "store")
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(AquariumQueryStore, "_write_tank", crash)
+    with pytest.raises(RuntimeError):
+        AquariumQueryStore.build(readings_df, tmp_path / "store")
+    assert AquariumQueryStore(store.directory).query().height == 100
+    assert [path.name for path in tmp_path.iterdir()] == ["store"]
+
+
+def test_store_version(store):
+    with sqlite3.connect(store.directory / INDEX_NAME) as connection:
+        connection.execute("UPDATE meta SET value = '0' WHERE key = 'version'")
+    with pytest.raises(ValueError):
+        AquariumQueryStore(store.directory)
+    with pytest.raises(FileNotFoundError):
+        AquariumQueryStore(store.directory / "missing")
+
+
+def test_cli(tmp_path, capsys, readings_df):
+    path = tmp_path / "readings.parquet"
+    readings_df.write_parquet(path)
+
+    main(["build", str(path), str(tmp_path / "store")])
+    assert "500 readings" in capsys.readouterr().out
+    main(["query", str(tmp_path / "store"), "--tank", "1", "--columns", "time,pH"])
+    assert "pH" in capsys.readouterr().out
@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+
+import joblib
+import numba
+import pytest
+
+from aquarium_adventures.computations import AquariumHPCComputations
+from aquarium_adventures.pipeline import AquariumPipeline
+from aquarium_adventures.runtime import (
+    CORES_ENV_VAR,
+    RuntimeConfig,
+    default_num_cores,
+    get_runtime_config,
+    register_joblib_backend,
+)
+from aquarium_adventures.transformations import AquariumTransformer
+
+
+def test_default_num_cores(monkeypatch):
+    monkeypatch.setenv(CORES_ENV_VAR, "6")
+    assert default_num_cores() == 6
+    assert RuntimeConfig().num_cores == 6
+
+    monkeypatch.setenv(CORES_ENV_VAR, "0")
+    with pytest.raises(ValueError):
+        default_num_cores()
+    monkeypatch.setenv(CORES_ENV_VAR, "many")
+    with pytest.raises(ValueError):
+        default_num_cores()
+
+    monkeypatch.delenv(CORES_ENV_VAR)
+    assert default_num_cores() >= 1
+
+
+def test_core_budget_split():
+    config = RuntimeConfig(num_cores=8)
+    assert config.joblib_workers(3) == 3
+    assert config.threads_per_worker(3) == 2
+
+    small = RuntimeConfig(num_cores=2)
+    assert small.joblib_workers(3) == 2
+    assert small.threads_per_worker(2) == 1
+
+    with pytest.raises(ValueError):
+        RuntimeConfig(num_cores=0)
+
+
+def test_activate_limits_numba_threads():
+    previous_threads = numba.get_num_threads()
+    config = RuntimeConfig(num_cores=1)
+    with config.activate():
+        assert get_runtime_config() is config
+        assert numba.get_num_threads() == 1
+    assert get_runtime_config() is not config
+    assert numba.get_num_threads() == previous_threads
+
+
+def _worker_thread_pools(_):
+    import polars as pl
+
+    return pl.thread_pool_size(), numba.config.NUMBA_NUM_THREADS
+
+
+def test_joblib_workers_share_the_budget():
+    with RuntimeConfig(num_cores=6).activate():
+        pools = joblib.Parallel(n_jobs=3, backend=register_joblib_backend())(
+            joblib.delayed(_worker_thread_pools)(i) for i in range(3)
+        )
+    assert pools == [(2, 2)] * 3
+
+
+def test_environment_sizes_polars_pool():
+    env = {**os.environ, CORES_ENV_VAR: "3"}
+    env.pop("POLARS_MAX_THREADS", None)
+    output = subprocess.run(
+        [sys.executable, "-c", "import aquarium_adventures, polars; print(polars.thread_pool_size())"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output.strip() == "3"
+
+
+def test_pipeline_report_records_runtime(sensors_df):
+    pipeline = AquariumPipeline(
+        [AquariumTransformer(execution="lazy"), AquariumHPCComputations()],
+        runtime=RuntimeConfig(num_cores=1),
+    )
+    _, report = pipeline.run(sensors_df, return_report=True)
+
+    assert report.runtime["num_cores"] == 1
+    assert report.runtime["numba_threads"] == 1
+    assert report.runtime["polars_threads"] >= 1
+    assert report.runtime["joblib_workers"] == 1
+    assert report.to_dict()["runtime"] == report.runtime
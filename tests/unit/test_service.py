@@ -0,0 +1,94 @@
+import threading
+
+import polars as pl
+import pytest
+
+from aquarium_adventures.computations import AquariumHPCComputations
+from aquarium_adventures.pipeline import AquariumPipeline
+from aquarium_adventures.service import AquariumClient, AquariumService, ServiceError
+from aquarium_adventures.storage import read_table, write_table
+from aquarium_adventures.transformations import AquariumTransformer
+
+
+@pytest.fixture()
+def service(tmp_path):
+    with AquariumService(tmp_path / "aquarium.sock", warm=False) as service:
+        yield service
+
+
+def test_service_runs_file_jobs(tmp_path, service, sensors_df, tank_info_df):
+    write_table(sensors_df, tmp_path / "sensors.arrow")
+    write_table(tank_info_df, tmp_path / "tank_info.tsv")
+    expected_df = AquariumPipeline(
+        [
+            AquariumTransformer(tank_info_df.with_columns(pl.col("fish_species").str.split(","))),
+            AquariumHPCComputations(),
+        ]
+    ).run(sensors_df)
+
+    client = AquariumClient(service.socket_path)
+    assert client.ping()
+    summary = client.run(
+        tmp_path / "sensors.arrow",
+        tank_info=tmp_path / "tank_info.tsv",
+        output=tmp_path / "out.parquet",
+    )
+
+    assert summary["rows"] == expected_df.height
+    assert summary["stress_score"] == pytest.approx(expected_df["stress_score"][0])
+    assert read_table(tmp_path / "out.parquet").height == expected_df.height
+    assert client.stats()["tank_info_tables"] == 1
+
+
+def test_service_runs_ipc_jobs(service, sensors_df):
+    expected_df = AquariumPipeline([AquariumTransformer(), AquariumHPCComputations()]).run(sensors_df)
+
+    summary, result_df = AquariumClient(service.socket_path).run(df=sensors_df, return_frame=True)
+
+    assert summary["rows"] == sensors_df.height
+    assert result_df.sort("time").equals(expected_df.sort("time"))
+
+
+def test_service_reports_errors(tmp_path, service):
+    client = AquariumClient(service.socket_path)
+    with pytest.raises(ServiceError, match="FileNotFoundError"):
+        client.run(tmp_path / "missing.arrow")
+    with pytest.raises(ServiceError, match="Unknown op"):
+        client.request({"op": "explode"})
+    # The service keeps serving after a failed job.
+    assert client.ping()
+
+
+def test_service_rejects_jobs_beyond_its_queue(tmp_path, sensors_df):
+    release = threading.Event()
+    started = threading.Event()
+
+    with AquariumService(tmp_path / "busy.sock", max_workers=1, max_pending=0, warm=False) as service:
+        run_job = service.run_job
+
+        def blocking_run_job(header, payload=b""):
+            started.set()
+            release.wait(10)
+            return run_job(header, payload)
+
+        service.run_job = blocking_run_job
+        client = AquariumClient(service.socket_path)
+        first = threading.Thread(target=client.run, kwargs={"df": sensors_df})
+        first.start()
+        assert started.wait(10)
+
+        with pytest.raises(ServiceError) as error:
+            client.run(df=sensors_df)
+        assert error.value.status == "busy"
+
+        release.set()
+        first.join(10)
+        assert client.stats()["jobs_rejected"] == 1
+        assert client.stats()["jobs_run"] == 1
+
+
+def test_service_shutdown(tmp_path):
+    service = AquariumService(tmp_path / "stop.sock", warm=False).start()
+    AquariumClient(service.socket_path).shutdown()
+    service.wait()
+    assert not service.socket_path.exists()
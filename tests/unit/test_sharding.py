@@ -0,0 +1,114 @@
+import math
+
+import numpy as np
+import polars as pl
+import pytest
+
+from aquarium_adventures.cache import analyzer_fingerprint
+from aquarium_adventures.computations import AquariumHPCComputations, sorted_stress_function
+from aquarium_adventures.sharding import (
+    AquariumShardedComputations,
+    ProcessPoolShardExecutor,
+    SerialExecutor,
+    ShardExecutor,
+    StressPartial,
+    split_frame,
+    stress_partial_from_shard,
+)
+
+
+def random_readings(n, seed=0):
+    rng = np.random.default_rng(seed)
+    pH = rng.uniform(6.5, 8.0, n).round(2)
+    temp = rng.uniform(22.0, 28.0, n).round(2)
+    quantity = rng.integers(200, 1000, n, endpoint=True).astype(np.float64)
+    quantity[rng.random(n) < 0.1] = np.nan
+    return pH, temp, quantity
+
+
+def test_merged_partials_match_batch():
+    pH, temp, quantity = random_readings(3_000)
+    expected = sorted_stress_function(pH, temp, quantity)
+
+    bounds = [0, 0, 17, 1_200, 1_201, 3_000]
+    partials = [
+        StressPartial.from_arrays(pH[start:end], temp[start:end], quantity[start:end])
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+    assert math.isclose(StressPartial.merge_all(partials).stress_score, expected, rel_tol=1e-12)
+    # Merging is order-independent.
+    assert math.isclose(
+        StressPartial.merge_all(partials[::-1]).stress_score, expected, rel_tol=1e-12
+    )
+    merged = partials[0]
+    for partial in partials[1:]:
+        merged = merged.merge(partial)
+    assert math.isclose(merged.stress_score, expected, rel_tol=1e-12)
+    assert merged.num_readings == 3_000
+    assert StressPartial.merge_all([]).stress_score == 0.0
+
+
+def test_partial_save_load(tmp_path):
+    pH, temp, quantity = random_readings(500)
+    partial = StressPartial.from_arrays(pH, temp, quantity)
+    partial.save(tmp_path / "shard.npz")
+
+    restored = StressPartial.load(tmp_path / "shard.npz")
+    other = StressPartial.from_arrays(pH[:10], temp[:10], quantity[:10])
+
+    assert restored.stress_score == partial.stress_score
+    assert restored.merge(other).stress_score == partial.merge(other).stress_score
+
+
+def test_sharded_computations_match_hpc(sensors_df):
+    expected = AquariumHPCComputations().analyze_data(sensors_df)
+
+    for num_shards in (1, 2, 5):
+        result_df = AquariumShardedComputations(num_shards=num_shards).analyze_data(sensors_df)
+        assert result_df.columns == expected.columns
+        assert math.isclose(result_df["stress_score"][0], expected["stress_score"][0], rel_tol=1e-12)
+
+    assert sum(shard.height for shard in split_frame(sensors_df, 5)) == sensors_df.height
+    assert analyzer_fingerprint(AquariumShardedComputations()) == analyzer_fingerprint(
+        AquariumShardedComputations(executor=SerialExecutor())
+    )
+    with pytest.raises(ValueError):
+        AquariumShardedComputations(num_shards=0)
+
+
+def test_custom_executor(sensors_df):
+    class RecordingExecutor(ShardExecutor):
+        def __init__(self):
+            self.shards = []
+
+        def map(self, function, shards):
+            self.shards += shards
+            return [function(shard) for shard in shards]
+
+    executor = RecordingExecutor()
+    AquariumShardedComputations(executor=executor, num_shards=3).analyze_data(sensors_df)
+
+    assert len(executor.shards) == 3
+
+
+@pytest.mark.slow
+def test_process_pool_executor_on_files(tmp_path):
+    pH, temp, quantity = random_readings(2_000, seed=1)
+    df = pl.DataFrame({"pH": pH, "temp": temp, "quantity_liters": quantity}).with_columns(
+        pl.col("quantity_liters").fill_nan(None)
+    )
+    paths = []
+    for i, shard in enumerate(split_frame(df, 3)):
+        paths.append(tmp_path / f"shard_{i}.parquet")
+        shard.write_parquet(paths[-1])
+
+    executor = ProcessPoolShardExecutor(max_workers=2)
+    try:
+        stress_score = AquariumShardedComputations(executor=executor).compute_stress(paths)
+    finally:
+        executor.close()
+
+    expected = StressPartial.merge_all(stress_partial_from_shard(path) for path in paths)
+    assert math.isclose(stress_score, expected.stress_score, rel_tol=1e-12)
+    assert math.isclose(stress_score, sorted_stress_function(pH, temp, quantity), rel_tol=1e-12)
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from aquarium_adventures.state import TankAggregateState
+
+
+def test_state_aggregates_and_merges(sensors_df):
+    state = TankAggregateState.from_df(sensors_df.head(2)).merge(
+        TankAggregateState.from_df(sensors_df.tail(1))
+    )
+    assert state.table.equals(TankAggregateState.from_df(sensors_df).table)
+    assert state.num_readings == 3
+    assert state.table["quantity_liters_null_count"].to_list() == [1, 0]
+
+    per_tank = state.per_tank_columns()
+    assert per_tank["tank_num_readings"].to_list() == [2, 1]
+    assert per_tank["avg_pH_per_tank"].to_list() == pytest.approx([7.1, 7.5])
+
+
+def test_state_save_load(tmp_path, sensors_df):
+    path = tmp_path / "state.npz"
+    assert TankAggregateState.load(path).num_readings == 0
+
+    state = TankAggregateState.from_df(sensors_df)
+    state.save(path)
+    assert TankAggregateState.load(path).table.equals(state.table)
+    assert list(tmp_path.iterdir()) == [path]
+
+    np.savez(path, version=TankAggregateState.FORMAT_VERSION + 1)
+    with pytest.raises(ValueError):
+        TankAggregateState.load(path)
+
+
+def test_state_survives_crash_mid_save(tmp_path, monkeypatch, sensors_df):
+    path = tmp_path / "state.npz"
+    TankAggregateState.from_df(sensors_df.head(2)).save(path)
+
+    def crash(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr("aquarium_adventures.state.os.replace", crash)
+    with pytest.raises(KeyboardInterrupt):
+        TankAggregateState.from_df(sensors_df).save(path)
+
+    assert TankAggregateState.load(path).num_readings == 2
+    assert TankAggregateState.load(path).table["tank_id"].to_list() == [1]
@@ -0,0 +1,103 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from aquarium_adventures.storage import (
+    SENSOR_SCHEMA,
+    TANK_INFO_SCHEMA,
+    apply_schema,
+    convert,
+    detect_format,
+    main,
+    read_table,
+    scan_table,
+    write_table,
+)
+
+
+def test_detect_format():
+    assert detect_format("data/sensors.tsv") == "csv"
+    assert detect_format("data/sensors.parquet") == "parquet"
+    assert detect_format("data/sensors.arrow") == "ipc"
+    assert detect_format("data/sensors.data", "ipc") == "ipc"
+
+    with pytest.raises(ValueError):
+        detect_format("data/sensors.data")
+    with pytest.raises(ValueError):
+        detect_format("data/sensors.tsv", "xlsx")
+
+
+@pytest.mark.parametrize("name", ["sensors.tsv", "sensors.parquet", "sensors.arrow"])
+def test_round_trip(tmp_path, sensors_df, name):
+    path = tmp_path / name
+    write_table(sensors_df, path)
+
+    assert read_table(path).equals(sensors_df)
+    assert scan_table(path).collect().equals(sensors_df)
+
+
+def test_ipc_read_is_zero_copy(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "sensors.arrow"
+    write_table(pl.DataFrame({"pH": np.linspace(6.5, 8.0, 1_000)}), path)
+
+    pH_vals = read_table(path)["pH"].to_numpy()
+    assert not pH_vals.flags.writeable, "Memory-mapped buffers should be read-only"
+
+
+def test_convert(tmp_path, sensors_df, tank_info_df):
+    sensors_tsv = tmp_path / "sensors.tsv"
+    tank_info_tsv = tmp_path / "tank_info.tsv"
+    write_table(sensors_df, sensors_tsv)
+    write_table(tank_info_df, tank_info_tsv)
+
+    destination = convert(sensors_tsv, tmp_path / "converted.arrow")
+    assert read_table(destination).equals(sensors_df)
+
+    out_dir = tmp_path / "columnar"
+    out_dir.mkdir()
+    main([str(sensors_tsv), str(tank_info_tsv), "-o", str(out_dir), "-f", "parquet"])
+    assert read_table(out_dir / "sensors.parquet").equals(sensors_df)
+    assert read_table(out_dir / "tank_info.parquet").equals(tank_info_df)
+
+
+@pytest.mark.parametrize("name", ["sensors.tsv", "sensors.parquet", "sensors.arrow"])
+def test_read_typed_schema(tmp_path, sensors_df, name):
+    path = tmp_path / name
+    write_table(sensors_df, path)
+
+    typed_df = read_table(path, schema=SENSOR_SCHEMA)
+
+    assert typed_df.schema == pl.Schema(SENSOR_SCHEMA)
+    assert typed_df["time"].dt.hour().to_list() == [0, 1, 0]
+    assert typed_df["quantity_liters"].null_count() == 1
+    assert scan_table(path, schema=SENSOR_SCHEMA).collect().equals(typed_df)
+
+
+def test_typed_schema_halves_memory_per_row():
+    n = 10_000
+    sensors_df = pl.DataFrame(
+        {
+            "tank_id": np.arange(n) % 100,
+            "time": ["2025-01-01 12:00:00"] * n,
+            "pH": np.full(n, 7.25),
+            "temp": np.full(n, 25.5),
+            "quantity_liters": np.full(n, 500),
+        }
+    )
+
+    typed_df = apply_schema(sensors_df, SENSOR_SCHEMA)
+
+    assert typed_df.estimated_size() * 2 <= sensors_df.estimated_size()
+
+
+def test_apply_tank_info_schema(tank_info_df):
+    typed_df = apply_schema(tank_info_df, TANK_INFO_SCHEMA)
+
+    assert dict(typed_df.schema) == TANK_INFO_SCHEMA
+    assert typed_df["fish_species"][1].cast(pl.String).to_list() == [
+        "FantasticZebrafish",
+        "VelvetLoach",
+        "SereneTang",
+    ]
+    assert apply_schema(typed_df, TANK_INFO_SCHEMA).equals(typed_df)
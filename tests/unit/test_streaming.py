@@ -0,0 +1,62 @@
+import math
+
+import numpy as np
+import polars as pl
+
+from aquarium_adventures.computations import AquariumHPCComputations, pairwise_stress_function
+from aquarium_adventures.streaming import AquariumStreamingPipeline
+from aquarium_adventures.transformations import AquariumTransformer
+
+
+def test_streaming_pipeline_matches_in_memory(monkey_joblib, tmp_path, sensors_df, tank_info_df_fish_species_split):
+    output_csv = tmp_path / "out.tsv"
+    pipeline = AquariumStreamingPipeline(tank_info_df_fish_species_split, memory_budget_mb=1)
+    stress_score = pipeline.run(sensors_df.lazy(), output_csv)
+
+    expected = AquariumHPCComputations().analyze_data(
+        AquariumTransformer(tank_info_df_fish_species_split).analyze_data(sensors_df)
+    )
+    streamed = pl.read_csv(output_csv, separator="\t")
+
+    assert math.isclose(stress_score, expected["stress_score"][0], rel_tol=1e-12)
+    assert streamed.columns == expected.columns
+    sort_by = ["tank_id", "time", "fish_species"]
+    streamed = streamed.sort(sort_by)
+    expected = expected.sort(sort_by)
+    for column in ["tank_num_readings", "fish_species_num_readings", "capacity_liters"]:
+        assert streamed[column].to_list() == expected[column].to_list()
+    for column in ["avg_pH_per_tank", "temperature_deviation_scaled", "stress_score"]:
+        np.testing.assert_allclose(
+            streamed[column].to_numpy(), expected[column].to_numpy(), rtol=1e-12
+        )
+
+
+def test_streaming_stress_matches_pairwise(tmp_path):
+    rng = np.random.default_rng(3)
+    n = 2_000
+    sensors = pl.DataFrame(
+        {
+            "tank_id": rng.integers(1, 20, n),
+            "pH": rng.uniform(6.5, 8.0, n).round(2),
+            "temp": rng.uniform(22.0, 28.0, n).round(2),
+            "quantity_liters": rng.integers(200, 1000, n),
+        }
+    ).with_columns(
+        pl.when(pl.int_range(pl.len()) % 10 == 0)
+        .then(None)
+        .otherwise(pl.col("quantity_liters"))
+        .alias("quantity_liters")
+    )
+    input_csv = tmp_path / "sensors.tsv"
+    sensors.write_csv(input_csv, separator="\t")
+
+    _, stress_score = AquariumStreamingPipeline().collect_aggregates(
+        pl.scan_csv(input_csv, separator="\t")
+    )
+
+    expected = pairwise_stress_function(
+        sensors["pH"].to_numpy(),
+        sensors["temp"].to_numpy(),
+        sensors["quantity_liters"].cast(pl.Float64).to_numpy(),
+    )
+    assert math.isclose(stress_score, expected, rel_tol=1e-9)
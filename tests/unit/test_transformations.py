@@ -66,3 +66,86 @@ def test_add_temperature_deviation(sensors_df, sensors_df_without_quantities):
     assert out_df["temperature_deviation"][1] == 0.0
     assert out_df["temperature_deviation"][2] == 1.5
     assert "temperature_deviation_scaled" not in out_df.columns
+
+
+def test_lazy_execution_matches_joblib(monkey_joblib, sensors_df, tank_info_df_fish_species_split):
+    parallel_mock, _ = monkey_joblib
+
+    joblib_df = AquariumTransformer(tank_info_df_fish_species_split).analyze_data(sensors_df)
+    parallel_mock.reset_mock()
+    lazy_df = AquariumTransformer(tank_info_df_fish_species_split, execution="lazy").analyze_data(sensors_df)
+
+    parallel_mock.assert_not_called()
+    sort_by = ["tank_id", "time", "fish_species"]
+    assert lazy_df.columns == joblib_df.columns
+    assert lazy_df.sort(sort_by).equals(joblib_df.sort(sort_by))
+
+
+def test_lazy_execution_without_quantities(sensors_df_without_quantities):
+    out_df = AquariumTransformer(execution="lazy").analyze_data(sensors_df_without_quantities)
+
+    assert out_df["tank_num_readings"].to_list() == [2, 2, 1]
+    assert out_df["avg_pH_per_tank"].to_list() == [7.1, 7.1, 7.5]
+    assert out_df["temperature_deviation"].to_list() == [1.0, 0.0, 1.5]
+
+    with pytest.raises(ValueError):
+        AquariumTransformer(execution="threads")
+
+
+def test_compact_species_mode(sensors_df, tank_info_df_fish_species_split):
+    exploded = AquariumTransformer(tank_info_df_fish_species_split, execution="lazy").analyze_data(sensors_df)
+    transformer = AquariumTransformer(tank_info_df_fish_species_split, execution="lazy", species_mode="compact")
+    assert transformer.fish_species_table is None
+    out_df = transformer.analyze_data(sensors_df)
+
+    assert out_df.height == sensors_df.height
+    assert out_df["time"].to_list() == sensors_df["time"].to_list()
+    assert out_df.schema["fish_species"] == pl.List(pl.Categorical)
+    assert "fish_species_num_readings" not in out_df.columns
+    assert out_df["fish_species"][0].cast(pl.String).to_list() == ["VelvetLoach", "MarvelousMolly", "EtherealSeahorse"]
+
+    species_table = transformer.fish_species_table.with_columns(pl.col("fish_species").cast(pl.String))
+    expected = exploded.select("fish_species", "fish_species_num_readings").unique()
+    assert species_table.sort("fish_species").equals(expected.sort("fish_species"))
+
+    with pytest.raises(ValueError):
+        AquariumTransformer(species_mode="wide")
+    with pytest.raises(AttributeError):
+        AquariumTransformer(species_mode="compact").add_fish_species_compact(sensors_df)
+
+
+@pytest.mark.parametrize("species_mode", ["explode", "compact"])
+def test_incremental_update_matches_full_run(tmp_path, sensors_df, tank_info_df_fish_species_split, species_mode):
+    more_rows = pl.DataFrame(
+        {
+            "tank_id": [2, 3, 1],
+            "time": ["2025-01-02 00:00", "2025-01-02 01:00", "2025-01-02 00:30"],
+            "pH": [None, 6.9, 7.4],
+            "temp": [27.0, 25.5, 26.5],
+            "quantity_liters": [800, 600, None],
+        }
+    )
+    history = pl.concat([sensors_df, more_rows]).with_row_index("row")
+    reference = AquariumTransformer(
+        tank_info_df_fish_species_split, execution="lazy", species_mode=species_mode
+    )
+    expected = reference.analyze_data(history).filter(pl.col("row") >= sensors_df.height)
+
+    transformer = AquariumTransformer(
+        tank_info_df_fish_species_split,
+        species_mode=species_mode,
+        state_path=tmp_path / "tank_state.npz",
+    )
+    transformer.update(history.head(sensors_df.height))
+    out_df = transformer.update(history.tail(more_rows.height))
+
+    sort_keys = ["row", "fish_species"] if species_mode == "explode" else ["row"]
+    assert out_df.columns == expected.columns
+    assert out_df.sort(sort_keys).equals(expected.sort(sort_keys))
+    if species_mode == "compact":
+        assert transformer.fish_species_table.sort("fish_species").equals(
+            reference.fish_species_table.sort("fish_species")
+        )
+
+    with pytest.raises(AttributeError):
+        AquariumTransformer().update(sensors_df)
@@ -0,0 +1,96 @@
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import polars as pl
+
+import numba.pycc
+
+from aquarium_adventures import computations, kernels
+from aquarium_adventures.computations import AquariumHPCComputations, aot_kernel
+from aquarium_adventures.warmup import AOT_KERNELS, build_aot, kernel_signatures, warmup
+
+
+def test_warmup_compiles_explicit_signatures():
+    timings = warmup(dtypes=(np.float32,), parallel=(False,), readonly=(False,))
+
+    assert set(timings) == {
+        "serial_pairwise_stress_function[float32]",
+        "sorted_stress_function[float32]",
+        "serial_grouped_stress_function[float32]",
+        "serial_tiled_stress_function[float32]",
+        "serial_windowed_stress_function[float32]",
+    }
+    for name, (dispatcher, args, is_parallel) in kernel_signatures(np.float32).items():
+        if not is_parallel:
+            assert args in dispatcher.signatures, f"{name} was not compiled"
+
+
+def test_serial_kernels_match_parallel(sensors_df):
+    for engine in AquariumHPCComputations.ENGINES:
+        parallel = AquariumHPCComputations(engine=engine).analyze_data(sensors_df)
+        serial = AquariumHPCComputations(engine=engine, parallel=False).analyze_data(sensors_df)
+        assert math.isclose(serial["stress_score"][0], parallel["stress_score"][0], rel_tol=1e-12)
+
+        parallel = AquariumHPCComputations(engine=engine, group_by="tank_id").analyze_data(sensors_df)
+        serial = AquariumHPCComputations(engine=engine, group_by="tank_id", parallel=False).analyze_data(sensors_df)
+        assert serial.equals(parallel)
+
+
+def test_aot_kernel_dispatch(monkeypatch):
+    calls = []
+
+    def fake_sorted(*arrays):
+        calls.append(arrays)
+        return 1.5
+
+    monkeypatch.setattr(
+        computations, "_aot_kernels", SimpleNamespace(sorted_stress_function_float64=fake_sorted)
+    )
+    f8 = np.array([7.0, 7.2])
+    f4 = f8.astype(np.float32)
+    strided = np.array([7.0, 0.0, 7.2, 0.0])[::2]
+
+    assert aot_kernel("sorted_stress_function", f8, f8, f8) is fake_sorted
+    assert aot_kernel("sorted_stress_function", f4, f4, f4) is None
+    assert aot_kernel("sorted_stress_function", f8, f4, f8) is None
+    assert aot_kernel("sorted_stress_function", strided, strided, strided) is None
+    assert aot_kernel("serial_pairwise_stress_function", f8, f8, f8) is None
+
+    df = pl.DataFrame({"pH": [7.0, 7.2], "temp": [25.0, 26.0], "quantity_liters": [500.0, 500.0]})
+    assert AquariumHPCComputations().analyze_data(df)["stress_score"][0] == 1.5
+    assert len(calls) == 1
+
+    monkeypatch.setattr(computations, "_aot_kernels", None)
+    assert aot_kernel("sorted_stress_function", f8, f8, f8) is None
+
+
+def test_build_aot_exports_kernels(tmp_path, monkeypatch):
+    exports = {}
+
+    class FakeCC:
+        def __init__(self, name):
+            self.name = name
+            self.output_file = f"{name}.so"
+
+        def export(self, name, signature):
+            def register(function):
+                exports[name] = (signature, function)
+                return function
+
+            return register
+
+        def compile(self):
+            exports["compiled"] = self.output_dir
+
+    monkeypatch.setattr(numba.pycc, "CC", FakeCC)
+    path = build_aot(tmp_path)
+
+    assert path == tmp_path / "_aot_kernels.so"
+    assert exports.pop("compiled") == str(tmp_path)
+    assert set(exports) == {
+        f"{name}_{dtype}" for name in AOT_KERNELS for dtype in ("float32", "float64")
+    }
+    signature, function = exports["sorted_stress_function_float32"]
+    assert signature == "f8(f4[::1], f4[::1], f4[::1])"
+    assert function is kernels.sorted_stress_function.py_func
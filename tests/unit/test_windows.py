@@ -0,0 +1,74 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from aquarium_adventures.computations import pairwise_stress_function
+from aquarium_adventures.windows import AquariumWindowedAnalyzer
+
+
+def brute_force_window(df, row, hours):
+    window_df = df.filter(
+        (pl.col("tank_id") == row["tank_id"])
+        & (pl.col("time") <= row["time"])
+        & (pl.col("time") > row["time"] - pl.duration(hours=hours))
+    )
+    stress = pairwise_stress_function(
+        *(window_df[name].cast(pl.Float64).to_numpy() for name in ("pH", "temp", "quantity_liters"))
+    )
+    return window_df.height, window_df["pH"].mean(), stress
+
+
+def test_windowed_matches_recomputation():
+    rng = np.random.default_rng(3)
+    n = 300
+    pH = rng.uniform(6.5, 8.0, n).round(2)
+    pH[rng.random(n) < 0.05] = np.nan
+    quantity = rng.integers(200, 1000, n, endpoint=True).astype(np.float64)
+    quantity[rng.random(n) < 0.1] = np.nan
+    df = pl.DataFrame(
+        {
+            "tank_id": rng.integers(1, 4, n),
+            "time": np.datetime64("2025-01-01", "ms")
+            + rng.integers(0, 48 * 60, n).astype("timedelta64[m]"),
+            "pH": pH,
+            "temp": rng.uniform(22.0, 28.0, n).round(2),
+            "quantity_liters": quantity,
+        }
+    ).with_columns(pl.col("pH", "quantity_liters").fill_nan(None))
+
+    out_df = AquariumWindowedAnalyzer().analyze_data(df)
+
+    assert out_df.select(df.columns).equals(df)
+    for row in out_df.iter_rows(named=True):
+        for window, hours in (("1h", 1), ("6h", 6), ("24h", 24)):
+            count, avg_pH, stress = brute_force_window(df, row, hours)
+            assert row[f"tank_num_readings_{window}"] == count
+            assert row[f"avg_pH_per_tank_{window}"] == pytest.approx(avg_pH, abs=1e-9)
+            assert row[f"stress_score_per_tank_{window}"] == pytest.approx(stress, abs=1e-9)
+
+
+def test_windowed_parses_time_and_shares_timestamps(sensors_df):
+    df = sensors_df.with_columns(
+        pl.Series("time", ["2025-01-01 00:00", "2025-01-01 00:00", None])
+    )
+
+    out_df = AquariumWindowedAnalyzer(windows="90m", parallel=False).analyze_data(df)
+
+    # Readings with the same timestamp are all in each other's window.
+    assert out_df["tank_num_readings_90m"].to_list() == [2, 2, None]
+    assert out_df["avg_pH_per_tank_90m"].to_list()[:2] == pytest.approx([7.1, 7.1])
+    assert out_df["stress_score_per_tank_90m"][2] is None
+    # The second reading has no quantity, so there is no valid pair.
+    assert out_df["stress_score_per_tank_90m"].to_list()[:2] == [0.0, 0.0]
+
+
+def test_window_lengths():
+    assert AquariumWindowedAnalyzer.window_ms("1h") == 3_600_000
+    assert AquariumWindowedAnalyzer.window_ms("1d12h") == 129_600_000
+    assert AquariumWindowedAnalyzer.window_ms("500ms") == 500
+
+    for window in ["", "1x", "h", "0h", "1h "]:
+        with pytest.raises(ValueError):
+            AquariumWindowedAnalyzer(windows=[window])
+    with pytest.raises(ValueError):
+        AquariumWindowedAnalyzer(windows=[])